@@ -0,0 +1,7 @@
+"""Benchmarks of pifoam's own overhead.
+
+Run with `python -m benchmarks -o results.json` from the repository root and compare two runs with
+`python -m benchmarks.compare old.json new.json`. OpenFOAM is not needed: the orchestration benchmarks
+put the stand-in applications of `benchmarks/standins` first on the PATH.
+"""
+from benchmarks.core import benchmark, registry, measure, run_benchmarks
@@ -0,0 +1,19 @@
+import argparse
+import json
+import sys
+from benchmarks.core import run_benchmarks, sizes
+
+parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark pifoam's own overhead.")
+parser.add_argument("-o", "--output", help="JSON file for the results. Defaults to stdout.")
+parser.add_argument("-s", "--size", choices=sorted(sizes), default="small", help="Problem size. Defaults to small.")
+parser.add_argument("-k", "--pattern", default="*", help="Shell pattern selecting benchmarks by name.")
+parser.add_argument("--work-dir", help="Scratch directory. Defaults to a temporary directory.")
+args = parser.parse_args()
+
+report = run_benchmarks(args.size, args.pattern, args.work_dir)
+if args.output is None:
+    json.dump(report, sys.stdout, indent=1)
+    print()
+else:
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=1)
@@ -0,0 +1,54 @@
+"""Compare two benchmark reports: `python -m benchmarks.compare old.json new.json`."""
+import argparse
+import json
+
+
+def timings(results:dict, prefix:str = "")->dict[str, float]:
+    """Flatten the median times of a report, e.g. {"orchestration.solve": 1.2}."""
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            if "median" in value:
+                flat[f"{prefix}{name}"] = value["median"]
+            else:
+                flat.update(timings(value, f"{prefix}{name}."))
+    return flat
+
+
+def compare(old:dict, new:dict, threshold:float = 0.1)->list[tuple[str, float, float, float, str]]:
+    """Ratios of the median times of two reports.
+
+    Args:
+        old (dict): The reference report.
+        new (dict): The report to compare.
+        threshold (float, optional): Relative change reported as a regression or an improvement. Defaults to 0.1.
+    Returns:
+        list[tuple[str, float, float, float, str]]: (name, old median, new median, new/old, change) of the timings in
+            both reports. The change is "slower" or "faster" when the ratio differs from 1 by more than `threshold`, else "".
+    """
+    old_times, new_times = timings(old["results"]), timings(new["results"])
+    rows = []
+    for name in old_times:
+        if name not in new_times:
+            continue
+        ratio = new_times[name]/old_times[name] if old_times[name] > 0 else float("inf")
+        change = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        rows.append((name, old_times[name], new_times[name], ratio, change))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1, help="Relative change flagged. Defaults to 0.1.")
+    args = parser.parse_args()
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    if old.get("size") != new.get("size"):
+        print(f"warning: comparing size {old.get('size')} with {new.get('size')}")
+    print(f"{'benchmark':40s} {'old [s]':>10s} {'new [s]':>10s} {'ratio':>7s}")
+    for name, t_old, t_new, ratio, change in compare(old, new, args.threshold):
+        print(f"{name:40s} {t_old:10.4f} {t_new:10.4f} {ratio:7.2f}  {change}".rstrip())
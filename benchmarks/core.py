@@ -0,0 +1,88 @@
+import fnmatch
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+registry = {}
+"""dict[str, callable]: Registered benchmarks, `benchmark(work_dir, size)->dict`."""
+
+sizes = {
+    "small": {"n_cells": 100_000, "n_patches": 200, "n_stl_regions": 50, "n_renders": 200, "n_steps": 20, "mesh": (100, 50, 1), "repeat": 3},
+    "large": {"n_cells": 2_000_000, "n_patches": 5_000, "n_stl_regions": 2_000, "n_renders": 2_000, "n_steps": 100, "mesh": (400, 200, 4), "repeat": 5},
+}
+"""dict[str, dict]: Problem sizes of the benchmarks."""
+
+
+def benchmark(func:callable)->callable:
+    """Register a benchmark under the name of the function."""
+    registry[func.__name__] = func
+    return func
+
+
+def measure(func:callable, repeat:int = 3, setup:callable = None)->dict[str, any]:
+    """Time a function.
+
+    Args:
+        func (callable): The function to time.
+        repeat (int, optional): Number of timed calls. Defaults to 3.
+        setup (callable, optional): Function called before each call, outside the timing. Defaults to None.
+    Returns:
+        dict[str, any]: "min", "median" and "max" in seconds and the list of "times".
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "max": max(times), "times": times}
+
+
+def git_revision()->str|None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(size:str = "small", pattern:str = "*", work_dir:str = None)->dict[str, any]:
+    """Run the registered benchmarks.
+
+    Args:
+        size (str, optional): "small" or "large". Defaults to "small".
+        pattern (str, optional): Shell pattern selecting benchmarks by name. Defaults to "*".
+        work_dir (str, optional): Scratch directory. Defaults to a temporary directory which is removed afterwards.
+    Returns:
+        dict[str, any]: The environment ("revision", "python", "numpy", "platform", "size") and the "results" of each benchmark.
+    """
+    from benchmarks import suites
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "size": size,
+        "results": {},
+    }
+    scratch = tempfile.mkdtemp(prefix="pifoam-bench-") if work_dir is None else work_dir
+    try:
+        for name, func in registry.items():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            case_dir = f"{scratch}/{name}"
+            os.makedirs(case_dir, exist_ok=True)
+            print(f"{name} ...", file=sys.stderr, flush=True)
+            report["results"][name] = func(case_dir, sizes[size])
+            shutil.rmtree(case_dir, ignore_errors=True)
+    finally:
+        if work_dir is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return report
@@ -0,0 +1,204 @@
+"""Stand-ins for the OpenFOAM binaries used by the benchmarks.
+
+They read the same dictionaries, print logs in the format of the real applications and write
+output files of realistic size, so pifoam's orchestration can be timed without an OpenFOAM install.
+"""
+import math
+import os
+import numpy as np
+from pifoam import utils
+from pifoam.io.foamFile import read_foamFile
+from pifoam.io.field import render_field, field_values
+from pifoam.io.polyMesh import polyMesh
+
+
+def case_dir(args:list[str])->str:
+    return args[args.index("-case") + 1] if "-case" in args else "."
+
+
+def banner(application:str, case:str)->None:
+    print("/*---------------------------------------------------------------------------*\\")
+    print("| =========                 |                                                 |")
+    print("| \\\\      /  F ield         | OpenFOAM: The Open Source CFD Toolbox           |")
+    print("\\*---------------------------------------------------------------------------*/")
+    print(f"Exec   : {application} -case {case}")
+    print(f"Case   : {os.path.abspath(case)}")
+    print("nProcs : 1\n")
+    print("Create time\n")
+
+
+def binary_list(values:np.ndarray, dtype:str)->bytes:
+    values = np.ascontiguousarray(values, dtype=dtype)
+    return f"{len(values)}\n(".encode() + values.tobytes() + b")\n"
+
+
+def binary_header(cls:str, name:str)->bytes:
+    header = {"version": 2.0, "format": "binary", "arch": '"LSB;label=32;scalar=64"', "class": cls, "location": '"constant/polyMesh"', "object": name}
+    return utils.format_dict(header, "FoamFile").encode()
+
+
+def box_mesh(lo:np.ndarray, hi:np.ndarray, n:tuple[int, int, int], patches:dict[str, int])->dict[str, bytes]:
+    """Binary polyMesh files of a uniform box, with faces ordered like blockMesh.
+
+    Args:
+        lo (np.ndarray): Lower corner.
+        hi (np.ndarray): Upper corner.
+        n (tuple[int, int, int]): Number of cells in each direction.
+        patches (dict[str, int]): Patch names and the box side they cover: 2*axis for the lower side, 2*axis+1 for the upper.
+    Returns:
+        dict[str, bytes]: Content of points, faces, owner, neighbour and boundary.
+    """
+    nx, ny, nz = n
+    axes = [np.linspace(lo[i], hi[i], n[i] + 1) for i in range(3)]
+    points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).transpose(2, 1, 0, 3).reshape(-1, 3)
+
+    def pid(i, j, k):
+        return i + (nx + 1)*(j + (ny + 1)*k)
+
+    def cid(i, j, k):
+        return i + nx*(j + ny*k)
+
+    def face(axis, i, j, k):
+        # Quadrilateral at the lower side of point (i, j, k) along `axis`, oriented towards +axis.
+        d = [np.eye(3, dtype=np.int64)[a] for a in range(3)]
+        u, v = d[(axis + 1) % 3], d[(axis + 2) % 3]
+        corners = [(0, 0), (1, 0), (1, 1), (0, 1)]
+        return np.stack([pid(i + a*u[0] + b*v[0], j + a*u[1] + b*v[1], k + a*u[2] + b*v[2]) for a, b in corners], axis=-1)
+
+    K, J, I = np.meshgrid(np.arange(nz), np.arange(ny), np.arange(nx), indexing="ij")
+    I, J, K = I.ravel(), J.ravel(), K.ravel()
+    faces, owner, neighbour = [], [], []
+    for axis, m in enumerate((I < nx - 1, J < ny - 1, K < nz - 1)):
+        shift = np.eye(3, dtype=np.int64)[axis]
+        faces.append(face(axis, I[m] + shift[0], J[m] + shift[1], K[m] + shift[2]))
+        owner.append(cid(I[m], J[m], K[m]))
+        neighbour.append(cid(I[m] + shift[0], J[m] + shift[1], K[m] + shift[2]))
+    faces, owner, neighbour = np.concatenate(faces), np.concatenate(owner), np.concatenate(neighbour)
+    order = np.lexsort((neighbour, owner))
+    faces, owner, neighbour = [faces[order]], [owner[order]], neighbour[order]
+
+    boundary = []
+    start = len(neighbour)
+    for name, side in patches.items():
+        axis, upper = divmod(side, 2)
+        m = (I, J, K)[axis] == (n[axis] - 1 if upper else 0)
+        shift = np.eye(3, dtype=np.int64)[axis]*upper
+        f = face(axis, I[m] + shift[0], J[m] + shift[1], K[m] + shift[2])
+        faces.append(f if upper else f[:, ::-1])
+        owner.append(cid(I[m], J[m], K[m]))
+        boundary.append(f"{name}\n{{\n\ttype\tpatch;\n\tnFaces\t{len(f)};\n\tstartFace\t{start};\n}}\n")
+        start += len(f)
+    faces, owner = np.concatenate(faces), np.concatenate(owner)
+
+    offsets = np.arange(len(faces) + 1)*4
+    header = utils.foam_header("polyBoundaryMesh", '"constant/polyMesh"', "boundary")
+    return {
+        "points": binary_header("vectorField", "points") + binary_list(points, "<f8"),
+        "faces": binary_header("faceCompactList", "faces") + binary_list(offsets, "<i4") + binary_list(faces.ravel(), "<i4"),
+        "owner": binary_header("labelList", "owner") + binary_list(owner, "<i4"),
+        "neighbour": binary_header("labelList", "neighbour") + binary_list(neighbour, "<i4"),
+        "boundary": (header + f"{len(boundary)}\n(\n" + "".join(boundary) + ")\n").encode(),
+    }
+
+
+_sides = {"east": 0, "west": 1, "south": 2, "north": 3, "bottom": 4, "top": 5}
+
+
+def blockMesh(args:list[str])->int:
+    case = case_dir(args)
+    banner("blockMesh", case)
+    d = read_foamFile(f"{case}/system/blockMeshDict")
+    vertices = np.array(d["vertices"], dtype=np.float64)*float(d.get("scale", 1.0))
+    n = d["blocks"][2]
+    boundary = d["boundary"]
+    patches = {boundary[i]: _sides[boundary[i]] for i in range(0, len(boundary), 2)}
+    print(f"Creating block mesh from \"system/blockMeshDict\"\nCreating blocks\nCreating patches\n")
+    files = box_mesh(vertices.min(axis=0), vertices.max(axis=0), n, patches)
+    os.makedirs(f"{case}/constant/polyMesh", exist_ok=True)
+    for name, content in files.items():
+        with open(f"{case}/constant/polyMesh/{name}", "wb") as file:
+            file.write(content)
+    print(f"Mesh Information\n----------------\n  nPoints: {(n[0] + 1)*(n[1] + 1)*(n[2] + 1)}\n  nCells: {n[0]*n[1]*n[2]}\n")
+    print("End\n")
+    return 0
+
+
+def snappyHexMesh(args:list[str])->int:
+    case = case_dir(args)
+    banner("snappyHexMesh", case)
+    read_foamFile(f"{case}/system/snappyHexMeshDict")
+    mesh = polyMesh(case)
+    for stage in ("Refinement phase", "Morphing phase", "Layer addition phase"):
+        print(f"\n{stage}\n{'-'*len(stage)}\n")
+        for i in range(3):
+            print(f"Iteration {i}\nMarked for refinement 0 cells.\n")
+    print(f"Writing mesh to time constant\nFinished meshing in = 0 s.\nMesh nCells: {mesh.n_cells}\nEnd\n")
+    return 0
+
+
+def log_step(step:int, t:float)->str:
+    """Log of one icoFoam time step with residuals decaying over the run."""
+    r = math.exp(-step/20.0)
+    lines = [
+        f"Time = {t:.6g}\n",
+        f"Courant Number mean: {0.1*(1 - r):.6g} max: {0.6*(1 - r) + 0.1:.6g}",
+        f"smoothSolver:  Solving for Ux, Initial residual = {r:.6g}, Final residual = {r*1e-6:.6g}, No Iterations {int(5 + 10*r)}",
+        f"smoothSolver:  Solving for Uy, Initial residual = {0.5*r:.6g}, Final residual = {r*1e-6:.6g}, No Iterations {int(5 + 8*r)}",
+    ]
+    for corrector in range(2):
+        lines.append(f"DICPCG:  Solving for p, Initial residual = {r/(1 + corrector):.6g}, Final residual = {r*1e-3:.6g}, No Iterations {int(20 + 15*r)}")
+        lines.append(f"time step continuity errors : sum local = {r*1e-4:.6g}, global = {r*1e-19:.6g}, cumulative = {-r*1e-19:.6g}")
+    lines.append(f"ExecutionTime = {0.01*step:.6g} s  ClockTime = {step//100} s\n\n")
+    return "\n".join(lines)
+
+
+def icoFoam(args:list[str])->int:
+    """Time loop printing icoFoam's log and writing U and p at every write time."""
+    case = case_dir(args)
+    banner("icoFoam", case)
+    control = read_foamFile(f"{case}/system/controlDict")
+    delta_t, end_time = float(control["deltaT"]), float(control["endTime"])
+    write_interval = int(control.get("writeInterval", 1))
+    write_format = control.get("writeFormat", "ascii")
+    precision = int(control.get("writePrecision", 6))
+    n_cells = polyMesh(case).n_cells
+
+    fields = {}
+    for name in ("U", "p"):
+        with open(f"{case}/0/{name}", "rb") as file:
+            raw = file.read()
+        field = read_foamFile(f"{case}/0/{name}")
+        n_comp = 3 if name == "U" else 1
+        fields[name] = {
+            "class": field["FoamFile"]["class"],
+            "dimensions": "[" + " ".join(str(v) for v in field["dimensions"]) + "]",
+            "values": np.array(field_values(field["internalField"], n_cells, n_comp), dtype=np.float64),
+            "boundary": raw[raw.find(b"boundaryField"):],
+        }
+    rng = np.random.default_rng(0)
+    n_steps = int(round(end_time/delta_t))
+    print("Reading transportProperties\n\nReading field p\n\nReading field U\n\nStarting time loop\n")
+    control_mtime = os.stat(f"{case}/system/controlDict").st_mtime_ns
+    for step in range(1, n_steps + 1):
+        t = step*delta_t
+        r = math.exp(-step/20.0)
+        print(log_step(step, t), end="")
+        # runTimeModifiable: stopAt writeNow ends the run after writing this step.
+        stop = False
+        mtime = os.stat(f"{case}/system/controlDict").st_mtime_ns
+        if mtime != control_mtime:
+            control_mtime = mtime
+            stop = read_foamFile(f"{case}/system/controlDict").get("stopAt") == "writeNow"
+        if step % write_interval == 0 or step == n_steps or stop:
+            name = f"{t:.6g}"
+            os.makedirs(f"{case}/{name}", exist_ok=True)
+            for field_name, field in fields.items():
+                values = field["values"] + (1.0 - r)*rng.standard_normal(field["values"].shape)
+                content = render_field(name, field_name, field["class"], field["dimensions"], values, {}, write_format, precision)
+                content = content[:content.rfind(b"boundaryField")] + field["boundary"]
+                with open(f"{case}/{name}/{field_name}", "wb") as file:
+                    file.write(content)
+        if stop:
+            break
+    print("End\n")
+    return 0
@@ -0,0 +1,181 @@
+import os
+import shutil
+import time
+import numpy as np
+import pifoam
+from pifoam import utils
+from pifoam.io.field import render_field
+from pifoam.io.resultStore import resultWatcher
+from pifoam.io.solverLog import read_log
+from pifoam.system.blockMeshDict import render_blockMeshDict, write_blockMeshDict
+from benchmarks.core import benchmark, measure
+
+standins_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standins")
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+box_types = {"top": "empty", "bottom": "empty", "north": "wall", "south": "wall", "east": "patch", "west": "patch"}
+
+
+def write_stl(path:str, n_triangles:int)->None:
+    """Write an ascii STL of a cylinder surface with about `n_triangles` facets."""
+    n_theta = max(8, int(np.sqrt(n_triangles/2)))
+    n_z = max(1, n_triangles//(2*n_theta))
+    theta = np.linspace(0.0, 2*np.pi, n_theta + 1)
+    z = np.linspace(4.0, 7.0, n_z + 1)
+    T, Z = np.meshgrid(theta, z, indexing="ij")
+    P = np.stack([0.5*np.cos(T), 0.5*np.sin(T), Z], axis=-1)
+    a, b, c, d = P[:-1, :-1], P[1:, :-1], P[1:, 1:], P[:-1, 1:]
+    triangles = np.concatenate([np.stack([a, b, c], axis=2).reshape(-1, 3, 3), np.stack([a, c, d], axis=2).reshape(-1, 3, 3)])
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True) + 1e-300
+    facet = "facet normal %g %g %g\n outer loop\n  vertex %g %g %g\n  vertex %g %g %g\n  vertex %g %g %g\n endloop\nendfacet\n"
+    values = np.concatenate([normals, triangles.reshape(-1, 9)], axis=1)
+    with open(path, "w") as file:
+        file.write("solid cylinder\n")
+        file.write((facet*len(values)) % tuple(values.ravel().tolist()))
+        file.write("endsolid cylinder\n")
+
+
+def make_case(work_dir:str, size:dict, mesh:tuple[int, int, int] = (250, 100, 1), n_stl_regions:int = 1)->pifoam.application.icoFoam:
+    stl = f"{work_dir}/cylinder.stl"
+    if not os.path.isfile(stl):
+        write_stl(stl, size["n_cells"]//4)
+    regions = {"cylinder": "wall"} if n_stl_regions == 1 else {f"region{i}": "wall" for i in range(n_stl_regions)}
+    blockmesh_props = {"scale": 1.0, "x_range": (-10, 40), "y_range": (-10, 10), "z_range": (5, 6), "x_num": mesh[0], "y_num": mesh[1], "z_num": mesh[2]}
+    mesher = pifoam.mesh.snappyHexMesh({**box_types, **regions}, stlFile=stl, blockmesh_props=blockmesh_props, locationInMesh=(39, 0, 5.5))
+    case = pifoam.application.icoFoam(f"{work_dir}/case", mesher, {"p": 0, "U": (0, 0, 0)}, nu=0.001)
+    for name in case.boundaryConditions["U"]:
+        case.set_boundaryCondition("U", name, "fixedValue" if name == "east" else "zeroGradient", "uniform (1 0 0)" if name == "east" else None)
+        case.set_boundaryCondition("p", name, "fixedValue" if name == "west" else "zeroGradient", "uniform 0" if name == "west" else None)
+    return case
+
+
+@benchmark
+def format_dict_large(work_dir:str, size:dict)->dict:
+    """Serialize a boundaryField with many patches."""
+    data = {f"patch{i}": {"type": "fixedValue", "value": "uniform (1 0 0)", "inletValue": "uniform (0 0 0)"} for i in range(size["n_patches"]*10)}
+    result = measure(lambda: utils.format_dict(data, "boundaryField"), size["repeat"])
+    result["n_entries"] = len(data)
+    return result
+
+
+@benchmark
+def render_field_ascii(work_dir:str, size:dict)->dict:
+    values = np.random.default_rng(0).standard_normal((size["n_cells"], 3))
+    result = measure(lambda: render_field("0", "U", "volVectorField", "[0 1 -1 0 0 0 0]", values, {}, "ascii"), size["repeat"])
+    result["n_cells"] = size["n_cells"]
+    return result
+
+
+@benchmark
+def render_field_binary(work_dir:str, size:dict)->dict:
+    values = np.random.default_rng(0).standard_normal((size["n_cells"], 3))
+    result = measure(lambda: render_field("0", "U", "volVectorField", "[0 1 -1 0 0 0 0]", values, {}, "binary"), size["repeat"])
+    result["n_cells"] = size["n_cells"]
+    return result
+
+
+@benchmark
+def setup_cold(work_dir:str, size:dict)->dict:
+    """coreFoam.setup() of a new case with nonuniform initial fields and many STL regions."""
+    case = make_case(work_dir, size, n_stl_regions=size["n_stl_regions"])
+    case.phys_values_init["U"] = np.random.default_rng(0).standard_normal((size["n_cells"], 3))
+    case.phys_values_init["p"] = np.random.default_rng(1).standard_normal(size["n_cells"])
+    clean = lambda: shutil.rmtree(case.case_dir, ignore_errors=True)
+    result = measure(case.setup, size["repeat"], setup=clean)
+    result["n_cells"] = size["n_cells"]
+    result["n_patches"] = len(case.boundaryConditions["U"])
+    return result
+
+
+@benchmark
+def setup_unchanged(work_dir:str, size:dict)->dict:
+    """coreFoam.setup() again with nothing changed: every file is skipped."""
+    case = make_case(work_dir, size, n_stl_regions=size["n_stl_regions"])
+    case.phys_values_init["U"] = np.random.default_rng(0).standard_normal((size["n_cells"], 3))
+    case.setup()
+    return measure(case.setup, size["repeat"])
+
+
+@benchmark
+def snappyHexMesh_write(work_dir:str, size:dict)->dict:
+    """snappyHexMesh.write() with a large STL and many surface regions."""
+    case = make_case(work_dir, size, n_stl_regions=size["n_stl_regions"])
+    clean = lambda: shutil.rmtree(case.case_dir, ignore_errors=True)
+    result = measure(lambda: case.mesher.write(case.case_dir), size["repeat"], setup=clean)
+    result["stl_bytes"] = os.path.getsize(case.mesher.stlFile)
+    return result
+
+
+@benchmark
+def write_blockMeshDict_repeated(work_dir:str, size:dict)->dict:
+    """`n_renders` calls of render_blockMeshDict and of write_blockMeshDict into the same case."""
+    args = (1.0, (-10, 40), (-10, 10), (5, 6), 250, 100, 1, box_types)
+    render = measure(lambda: [render_blockMeshDict(*args) for _ in range(size["n_renders"])], size["repeat"])
+    write = measure(lambda: [write_blockMeshDict(work_dir, *args) for _ in range(size["n_renders"])], size["repeat"])
+    return {"render": render, "write": write, "n_calls": size["n_renders"]}
+
+
+@benchmark
+def read_field_ascii(work_dir:str, size:dict)->dict:
+    values = np.random.default_rng(0).standard_normal((size["n_cells"], 3))
+    with open(f"{work_dir}/U", "wb") as file:
+        file.write(render_field("0", "U", "volVectorField", "[0 1 -1 0 0 0 0]", values, {}, "ascii"))
+    result = measure(lambda: pifoam.io.read_field(f"{work_dir}/U"), size["repeat"])
+    result["bytes"] = os.path.getsize(f"{work_dir}/U")
+    return result
+
+
+@benchmark
+def read_log_large(work_dir:str, size:dict)->dict:
+    """Parse an icoFoam log of `n_cells`/10 time steps written by the stand-in."""
+    from benchmarks.standins import standin
+    step = standin.log_step(1, 0.01)
+    n_steps = size["n_cells"]//10
+    with open(f"{work_dir}/log", "w") as file:
+        file.write("".join(standin.log_step(i, 0.01*i) for i in range(1, n_steps + 1)))
+    result = measure(lambda: read_log(f"{work_dir}/log"), size["repeat"])
+    result["n_lines"] = n_steps*step.count("\n")
+    return result
+
+
+@benchmark
+def orchestration(work_dir:str, size:dict)->dict:
+    """End to end: setup, blockMesh and snappyHexMesh, icoFoam, and ingestion of the time directories."""
+    env_path = os.environ.get("PATH", "")
+    env_pythonpath = os.environ.get("PYTHONPATH")
+    os.environ["PATH"] = f"{standins_dir}{os.pathsep}{env_path}"
+    os.environ["PYTHONPATH"] = repo_dir if env_pythonpath is None else f"{repo_dir}{os.pathsep}{env_pythonpath}"
+    stages = {"setup": [], "mesh": [], "solve": [], "ingest": []}
+    try:
+        for _ in range(size["repeat"]):
+            shutil.rmtree(f"{work_dir}/case", ignore_errors=True)
+            case = make_case(work_dir, size, mesh=size["mesh"])
+            case.set_controlDict("deltaT", 0.01)
+            case.set_controlDict("endTime", 0.01*size["n_steps"])
+            case.set_controlDict("writeInterval", max(1, size["n_steps"]//10))
+            log = pifoam.io.solverLog()
+            for stage, func in (("setup", case.setup), ("mesh", case.create_mesh)):
+                start = time.perf_counter()
+                func()
+                stages[stage].append(time.perf_counter() - start)
+            watcher = resultWatcher(case.case_dir, f"{case.case_dir}/results", purge=True, interval=0.05)
+            start = time.perf_counter()
+            with watcher:
+                returncode = case.run(log=log)
+                solved = time.perf_counter()
+            stages["solve"].append(solved - start)
+            stages["ingest"].append(time.perf_counter() - solved)
+            if returncode != 0 or log.n_steps != size["n_steps"]:
+                raise RuntimeError(f"Stand-in run failed with exit code {returncode} after {log.n_steps} steps.")
+    finally:
+        os.environ["PATH"] = env_path
+        if env_pythonpath is None:
+            os.environ.pop("PYTHONPATH", None)
+        else:
+            os.environ["PYTHONPATH"] = env_pythonpath
+    result = {stage: {"min": min(t), "median": float(np.median(t)), "max": max(t), "times": t} for stage, t in stages.items()}
+    result["n_cells"] = int(np.prod(size["mesh"]))
+    result["n_steps"] = size["n_steps"]
+    result["n_stored"] = len(watcher.store)
+    return result
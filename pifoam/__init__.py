@@ -1 +1 @@
-from pifoam import application, mesh, utils
\ No newline at end of file
+from pifoam import application, mesh, utils, io, trace
\ No newline at end of file
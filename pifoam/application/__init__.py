@@ -1 +1,6 @@
-from pifoam.application.icoFoam import icoFoam
\ No newline at end of file
+from pifoam.application.icoFoam import icoFoam
+from pifoam.application.sweep import sweep
+from pifoam.application.stationarity import stationarityMonitor, stationarity
+from pifoam.application.functionObjects import probes, forces, forceCoeffs, fieldAverage, surfaces, residuals
+from pifoam.application.cache import resultCache
+from pifoam.application.autotune import solverTuner
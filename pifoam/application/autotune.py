@@ -0,0 +1,221 @@
+import copy
+import json
+import math
+import os
+import shutil
+import numpy as np
+from pifoam.io.solverLog import solverLog
+from pifoam.io.polyMesh import read_n_cells
+
+_tolerance_keys = ("tolerance", "relTol", "maxIter", "minIter")
+
+
+def solver_entry(entry:dict[str, any])->dict[str, any]:
+    """Solver entry of fvSolution without its tolerances."""
+    return {k: v for k, v in entry.items() if k not in _tolerance_keys}
+
+
+def pressure_candidates(n_cells:int)->dict[str, dict[str, any]]:
+    """Linear solvers tried for the pressure equation.
+
+    Args:
+        n_cells (int): Number of cells of the mesh, which sets the coarsest GAMG levels tried.
+    Returns:
+        dict[str, dict[str, any]]: Solver entries without tolerances, keyed on a short name.
+    """
+    candidates = {"PCG-DIC": {"solver": "PCG", "preconditioner": "DIC"}}
+    coarsest = sorted({10, 100, max(10, int(round(math.sqrt(n_cells)/10))*10)})
+    for smoother in ("GaussSeidel", "DICGaussSeidel", "DIC"):
+        for n in coarsest:
+            candidates[f"GAMG-{smoother}-{n}"] = {"solver": "GAMG", "smoother": smoother, "nCellsInCoarsestLevel": n,
+                                                "agglomerator": "faceAreaPair", "mergeLevels": 1, "cacheAgglomeration": "true"}
+    return candidates
+
+
+def velocity_candidates()->dict[str, dict[str, any]]:
+    """Linear solvers tried for the momentum equation, without tolerances."""
+    return {
+        "smoothSolver-symGaussSeidel": {"solver": "smoothSolver", "smoother": "symGaussSeidel"},
+        "smoothSolver-GaussSeidel": {"solver": "smoothSolver", "smoother": "GaussSeidel"},
+        "PBiCGStab-DILU": {"solver": "PBiCGStab", "preconditioner": "DILU"},
+    }
+
+
+class solverTuner:
+    """Choose the fastest linear solvers of a case by timing a few time steps of each candidate.
+
+    The pressure solver is tuned first (PCG/DIC and GAMG with several smoothers and coarsest levels), then the
+    momentum solver with the winning pressure solver. Each candidate runs `n_steps` time steps in a scratch
+    clone of the case, sharing its mesh. Its cost is the median ExecutionTime per step after `warmup` steps,
+    which leaves out one-off costs such as the GAMG agglomeration. A candidate is only kept if the initial
+    residuals of every solved field stay within `residual_rtol` of those of the current solvers of the case,
+    so a solver reaching its tolerance less accurately cannot win by doing less work.
+
+    Winners are recorded per application, number of processors and mesh size class (cell counts within a
+    factor of 2), and reused without trials for cases of the same class.
+
+        tuner = solverTuner("solvers.json")
+        case.setup(); case.create_mesh()
+        tuner.tune(case, "scratch")
+        case.setup()
+        case.run()
+
+    Attributes:
+        path (str): JSON file where the winners are kept. None keeps them in memory.
+        n_steps (int): Time steps of each trial run.
+        warmup (int): First steps of each trial left out of the timing.
+        residual_rtol (float): Tolerance on the initial residuals relative to the reference solvers.
+        pressure (str): Name of the pressure field in fvSolution.
+        velocity (str): Name of the velocity field in fvSolution.
+        winners (dict[str, dict]): "p", "U" (solver entries), "seconds_per_step" and "n_cells" of the winner
+            of each size class, keyed on `key`.
+    """
+    def __init__(self,
+                path:str = None,
+                n_steps:int = 10,
+                warmup:int = 2,
+                residual_rtol:float = 0.1,
+                pressure:str = "p",
+                velocity:str = "U",
+                )->None:
+        assert n_steps > warmup, "The trials need steps after the warmup."
+        self.path = path
+        self.n_steps = n_steps
+        self.warmup = warmup
+        self.residual_rtol = residual_rtol
+        self.pressure = pressure
+        self.velocity = velocity
+        self.winners = {}
+        if self.path is not None and os.path.isfile(self.path):
+            with open(self.path) as file:
+                self.winners = json.load(file)
+
+    def key(self, case:any, n_cells:int)->str:
+        """Size class of a case, e.g. "icoFoam/np4/2^17" for 131072 to 262143 cells."""
+        return f"{case.application}/np{case.n_procs}/2^{int(math.log2(max(n_cells, 1)))}"
+
+    def save(self)->None:
+        if self.path is None:
+            return
+        with open(f"{self.path}.pifoam-tmp", "w") as file:
+            json.dump(self.winners, file, indent=1)
+        os.replace(f"{self.path}.pifoam-tmp", self.path)
+
+    def with_solvers(self, case:any, solvers:dict[str, dict])->dict[str, dict]:
+        """fvSolution_props of the case with the given solver entries, keeping their tolerances."""
+        props = copy.deepcopy(case.fvSolution_props)
+        for field, entry in solvers.items():
+            tolerances = {k: v for k, v in props["solvers"][field].items() if k in _tolerance_keys}
+            props["solvers"][field] = {**entry, **tolerances}
+        return props
+
+    def trial(self, case:any, case_dir:str, solvers:dict[str, dict])->dict[str, any]:
+        """Run a few time steps of the case with other solvers.
+
+        Args:
+            case (coreFoam): The case, with its mesh.
+            case_dir (str): Directory of the scratch clone. It is removed afterwards.
+            solvers (dict[str, dict]): Solver entries replacing those of the case, keyed on the field.
+        Returns:
+            dict[str, any]: "returncode", "seconds_per_step" (inf if the run failed) and "residuals", the
+                initial residuals of each field (n_steps,).
+        """
+        start = float(case.control_props.get("startTime", 0))
+        deltaT = float(case.control_props["deltaT"])
+        trial = case.clone(case_dir, startFrom="startTime", endTime=start + self.n_steps*deltaT,
+                        writeControl="timeStep", writeInterval=self.n_steps)
+        try:
+            trial.result_cache = None
+            trial.functions = {}
+            trial.fvSolution_props = self.with_solvers(case, solvers)
+            trial.setup()
+            log = solverLog()
+            returncode = trial.run(reconstruct=False, log=log)
+        finally:
+            shutil.rmtree(case_dir, ignore_errors=True)
+        return self.result(returncode, log)
+
+    def result(self, returncode:int, log:solverLog)->dict[str, any]:
+        """Cost and residuals of a trial run, as returned by `trial`."""
+        times = log.execution_time_per_step()[self.warmup:]
+        result = {"returncode": returncode, "seconds_per_step": float("inf"),
+                "residuals": {field: log.residuals(field)["initial"] for field in log.fields}}
+        if returncode == 0 and log.n_steps >= self.n_steps:
+            result["seconds_per_step"] = float(np.median(times))
+        return result
+
+    def matches(self, result:dict[str, any], reference:dict[str, any])->bool:
+        """Whether the residuals of a trial are as low as those of the reference."""
+        for field, initial in reference["residuals"].items():
+            candidate = result["residuals"].get(field)
+            if candidate is None or len(candidate) < len(initial):
+                return False
+            n = len(initial)
+            if not np.all(candidate[:n] <= initial*(1 + self.residual_rtol) + 1e-300):
+                return False
+        return True
+
+    def select(self,
+            case:any,
+            scratch_dir:str,
+            field:str,
+            candidates:dict[str, dict],
+            solvers:dict[str, dict],
+            trials:list[dict],
+            )->tuple[str, float]:
+        """Time the candidates of one field and keep the fastest one matching the reference residuals.
+
+        Returns:
+            tuple[str, float]: Name of the winner (None if the current solver is the fastest) and its time per step.
+        """
+        reference = self.trial(case, f"{scratch_dir}/{field}-reference", solvers)
+        if reference["returncode"] != 0:
+            raise ValueError(f"The trial run of {case.case_dir} with its own solvers failed ({reference['returncode']}).")
+        best, best_time = None, reference["seconds_per_step"]
+        trials.append({"field": field, "name": "reference", "seconds_per_step": best_time, "valid": True})
+        current = solver_entry(case.fvSolution_props["solvers"][field])
+        for name, entry in candidates.items():
+            if entry == current:
+                continue
+            result = self.trial(case, f"{scratch_dir}/{field}-{name}", {**solvers, field: entry})
+            valid = result["returncode"] == 0 and self.matches(result, reference)
+            trials.append({"field": field, "name": name, "seconds_per_step": result["seconds_per_step"], "valid": valid})
+            if valid and result["seconds_per_step"] < best_time:
+                best, best_time = name, result["seconds_per_step"]
+        return best, best_time
+
+    def tune(self, case:any, scratch_dir:str, force:bool = False)->dict[str, any]:
+        """Find the fastest solvers of a case and set them in its `fvSolution_props`.
+
+        The case must have its mesh. Call `setup()` afterwards to write the new fvSolution.
+
+        Args:
+            case (coreFoam): The case to tune.
+            scratch_dir (str): Directory under which the trial clones are created.
+            force (bool, optional): Whether to run the trials even if the size class has a winner. Defaults to False.
+        Returns:
+            dict[str, any]: "solvers" (the entries set in the case), "key", "cached" and "trials", a list of
+                "field", "name", "seconds_per_step" and "valid" for each trial run.
+        Raises:
+            ValueError: If the trial run of the case with its own solvers fails.
+        """
+        n_cells = read_n_cells(case.case_dir)
+        key = self.key(case, n_cells)
+        trials = []
+        cached = key in self.winners and not force
+        if cached:
+            solvers = {field: self.winners[key][field] for field in (self.pressure, self.velocity) if field in self.winners[key]}
+        else:
+            os.makedirs(scratch_dir, exist_ok=True)
+            solvers = {}
+            seconds = None
+            current = case.fvSolution_props["solvers"]
+            for field, candidates in ((self.pressure, pressure_candidates(n_cells)), (self.velocity, velocity_candidates())):
+                if field not in current:
+                    continue
+                name, seconds = self.select(case, scratch_dir, field, candidates, solvers, trials)
+                solvers[field] = solver_entry(current[field]) if name is None else candidates[name]
+            self.winners[key] = {**solvers, "seconds_per_step": seconds, "n_cells": n_cells}
+            self.save()
+        case.fvSolution_props = self.with_solvers(case, solvers)
+        return {"solvers": solvers, "key": key, "cached": cached, "trials": trials}
@@ -0,0 +1,309 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+
+
+class resultCache:
+    """Persistent store of solver results, keyed on the complete configuration of a case.
+
+    The key hashes every file written by `setup()` and by the mesher (including the STL), the name of the
+    application and the OpenFOAM version. A hit restores the time directories, postProcessing and the solver
+    log recorded by an identical run instead of running the solver again. Unlike `meshCache`, which
+    only skips meshing, this never pays twice for the same solution.
+
+    Files are stored once under `blobs/` by the sha256 of their content, so results sharing files (e.g.
+    unchanged fields) are deduplicated. An SQLite index records the files of each entry. Every restored file
+    is checked against its hash: an entry with a damaged or missing file is dropped and counted as a miss.
+    The least recently used entries are evicted when the blobs grow beyond `max_bytes`.
+
+    Only runs starting from the initial conditions (`startFrom startTime`, or a case without results yet)
+    and written in reconstructed form are cached, since the output of restarts depends on files outside
+    the configuration.
+
+    Attributes:
+        cache_dir (str): Directory holding the index and the blobs.
+        max_bytes (int): Size limit of the blobs in bytes. None means unlimited.
+        hits (int): Number of cache hits.
+        misses (int): Number of cache misses.
+    """
+    def __init__(self, cache_dir:str, max_bytes:int = None)->None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(f"{self.cache_dir}/blobs", exist_ok=True)
+        with self.connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, application TEXT, created REAL, "
+                    "last_used REAL, size INTEGER, files TEXT, log TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER, refs INTEGER)")
+
+    @contextlib.contextmanager
+    def connect(self)->sqlite3.Connection:
+        """Open the index for one transaction, committed on success and rolled back on error, then closed."""
+        db = sqlite3.connect(f"{self.cache_dir}/index.sqlite", timeout=60.0)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def blob_path(self, digest:str)->str:
+        return f"{self.cache_dir}/blobs/{digest[:2]}/{digest}"
+
+    def key(self, case:any, reconstruct:bool = True)->str|None:
+        """Compute the cache key of a case.
+
+        Args:
+            case (coreFoam): The application, after `setup()`.
+            reconstruct (bool, optional): Whether a parallel run is reconstructed. Defaults to True.
+        Returns:
+            str|None: The hex digest of the configuration, or None if the run cannot be cached.
+        """
+        start_from = str(case.control_props.get("startFrom", "startTime"))
+        restart = start_from != "startTime" and any(name != "postProcessing" for name in self.result_dirs(case.case_dir))
+        if restart or (case.n_procs > 1 and not reconstruct):
+            return None
+        files = case.case_files()
+        files[":application"] = case.application
+        files[":version"] = f"{os.environ.get('WM_PROJECT', '')} {os.environ.get('WM_PROJECT_VERSION', '')}"
+        h = hashlib.sha256()
+        for path in sorted(files):
+            content = files[path]
+            h.update(path.encode())
+            h.update(b"\0")
+            h.update(content.encode() if isinstance(content, str) else content)
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def contains(self, key:str)->bool:
+        with self.connect() as db:
+            return db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def result_dirs(self, case_dir:str)->list[str]:
+        """Directories holding the results of a case: the time directories other than 0 and postProcessing."""
+        names = []
+        for name in sorted(os.listdir(case_dir)) if os.path.isdir(case_dir) else []:
+            if not os.path.isdir(f"{case_dir}/{name}") or name == "0":
+                continue
+            try:
+                float(name)
+            except ValueError:
+                if name != "postProcessing":
+                    continue
+            names.append(name)
+        return names
+
+    def output_files(self, case_dir:str)->list[str]:
+        """Paths of the result files of a case, relative to `case_dir`."""
+        paths = []
+        for top in self.result_dirs(case_dir):
+            for root, _, files in os.walk(f"{case_dir}/{top}"):
+                paths += [os.path.relpath(os.path.join(root, f), case_dir) for f in files]
+        return sorted(paths)
+
+    def store(self, key:str, case:any, log:str = "")->bool:
+        """Record the results of a finished run and evict old entries.
+
+        Args:
+            key (str): The cache key.
+            case (coreFoam): The application which ran.
+            log (str, optional): The solver stdout. Defaults to "".
+        Returns:
+            bool: False if the run was not recorded, e.g. because its dictionaries were modified while it ran
+                (a `stationarityMonitor` stopping it early).
+        """
+        if self.contains(key):
+            return True
+        system = {"system/controlDict": case.render_controlDict(), "system/fvSchemes": case.render_fvSchemes(),
+                "system/fvSolution": case.render_fvSolution()}
+        for path, content in system.items():
+            with open(f"{case.case_dir}/{path}", "rb") as file:
+                if file.read() != content.encode():
+                    return False
+        files = {path: self.file_digest(f"{case.case_dir}/{path}") for path in self.output_files(case.case_dir)}
+        log_content = log.encode()
+        log_digest = (hashlib.sha256(log_content).hexdigest(), len(log_content))
+        digests = [digest for digest, _ in files.values()] + [log_digest[0]]
+        now = time.time()
+        with self.connect() as db:
+            # The write lock is held until the commit, so `remove` cannot delete a blob between the check of its
+            # existence below and the reference recorded here.
+            db.execute("BEGIN IMMEDIATE")
+            if db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None:
+                # Another process stored the same run first.
+                return True
+            for digest, size in list(files.values()) + [log_digest]:
+                db.execute("INSERT INTO blobs VALUES (?, ?, 0) ON CONFLICT(sha256) DO NOTHING", (digest, size))
+            db.executemany("UPDATE blobs SET refs = refs + 1 WHERE sha256 = ?", [(d,) for d in digests])
+            db.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, case.application, now, now, sum(size for _, size in files.values()),
+                    json.dumps({path: digest for path, (digest, _) in files.items()}), log_digest[0]))
+            for path, (digest, _) in files.items():
+                if not os.path.isfile(self.blob_path(digest)):
+                    with open(f"{case.case_dir}/{path}", "rb") as file:
+                        self.put_bytes(file.read(), digest)
+            self.put_bytes(log_content, log_digest[0])
+        self.evict()
+        return True
+
+    def file_digest(self, path:str)->tuple[str, int]:
+        """The sha256 and the size of a file."""
+        h = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as file:
+            while chunk := file.read(1 << 20):
+                h.update(chunk)
+                size += len(chunk)
+        return h.hexdigest(), size
+
+    def put_bytes(self, content:bytes, digest:str)->None:
+        """Write a blob unless it exists.
+
+        Raises:
+            ValueError: If the content does not match `digest`, e.g. a result file modified since it was hashed.
+        """
+        target = self.blob_path(digest)
+        if os.path.isfile(target):
+            return
+        if hashlib.sha256(content).hexdigest() != digest:
+            raise ValueError(f"The content of blob {digest} changed while it was stored.")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(content)
+        os.replace(tmp, target)
+
+    def read_blob(self, digest:str)->bytes|None:
+        """Content of a blob, or None if it is missing or does not match its hash."""
+        try:
+            with open(self.blob_path(digest), "rb") as file:
+                content = file.read()
+        except OSError:
+            return None
+        return content if hashlib.sha256(content).hexdigest() == digest else None
+
+    def fetch(self, key:str, case_dir:str, log:callable = None, show_log:bool = False)->bool:
+        """Restore the recorded results into the case if they exist and are intact.
+
+        The time directories (other than 0) and postProcessing of the case are replaced by the restored ones.
+        The files are written as copies, so the solver never modifies the blobs in place.
+
+        Args:
+            key (str): The cache key.
+            case_dir (str): The directory of the OpenFOAM case.
+            log (callable, optional): Called with every line of the recorded solver stdout, e.g. a `solverLog`. Defaults to None.
+            show_log (bool, optional): Whether to print the recorded solver stdout. Defaults to False.
+        Returns:
+            bool: True on a cache hit.
+        """
+        with self.connect() as db:
+            row = db.execute("SELECT files, log FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return False
+        files, log_digest = json.loads(row[0]), row[1]
+        staging = f"{case_dir}/.pifoam-restore-{uuid.uuid4().hex}"
+        try:
+            for path, digest in files.items():
+                content = self.read_blob(digest)
+                if content is None:
+                    self.remove(key)
+                    self.misses += 1
+                    return False
+                os.makedirs(os.path.dirname(f"{staging}/{path}"), exist_ok=True)
+                with open(f"{staging}/{path}", "wb") as file:
+                    file.write(content)
+            text = self.read_blob(log_digest)
+            if text is None:
+                self.remove(key)
+                self.misses += 1
+                return False
+            # Results of an earlier run (e.g. later times of a longer one) would be mixed with the restored ones.
+            for top in self.result_dirs(case_dir):
+                shutil.rmtree(f"{case_dir}/{top}", ignore_errors=True)
+            for top in os.listdir(staging) if os.path.isdir(staging) else []:
+                os.rename(f"{staging}/{top}", f"{case_dir}/{top}")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        for line in text.decode(errors="replace").splitlines(keepends=True):
+            if log is not None:
+                log(line)
+            if show_log:
+                print(line, end="")
+        with self.connect() as db:
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return True
+
+    def remove(self, key:str)->None:
+        """Remove an entry and the blobs no other entry uses."""
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT files, log FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            digests = list(json.loads(row[0]).values()) + [row[1]]
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            db.executemany("UPDATE blobs SET refs = refs - 1 WHERE sha256 = ?", [(d,) for d in digests])
+            unused = [d for (d,) in db.execute("SELECT sha256 FROM blobs WHERE refs <= 0")]
+            db.execute("DELETE FROM blobs WHERE refs <= 0")
+            # Deleted before the commit, so a concurrent `store` referencing the blob again writes it anew.
+            for digest in unused:
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    def entries(self)->list[tuple[str, float, int]]:
+        """List the cache entries.
+
+        Returns:
+            list[tuple[str, float, int]]: (key, last use time, size in bytes) ordered from the least recently used.
+        """
+        with self.connect() as db:
+            return db.execute("SELECT key, last_used, size FROM entries ORDER BY last_used").fetchall()
+
+    def size(self)->int:
+        """Total size of the blobs in bytes."""
+        with self.connect() as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self)->None:
+        """Remove the least recently used entries until the blobs fit in `max_bytes`.
+        """
+        if self.max_bytes is None:
+            return
+        for key, _, _ in self.entries():
+            if self.size() <= self.max_bytes:
+                break
+            self.remove(key)
+
+    def verify(self)->list[str]:
+        """Check the hash of every stored file and drop the damaged entries.
+
+        Returns:
+            list[str]: Keys of the removed entries.
+        """
+        with self.connect() as db:
+            rows = db.execute("SELECT key, files, log FROM entries").fetchall()
+        valid = {}
+        damaged = []
+        for key, files, log_digest in rows:
+            for digest in list(json.loads(files).values()) + [log_digest]:
+                if digest not in valid:
+                    valid[digest] = self.read_blob(digest) is not None
+                if not valid[digest]:
+                    damaged.append(key)
+                    break
+        for key in damaged:
+            self.remove(key)
+        return damaged
+
+    def clear(self)->None:
+        for key, _, _ in self.entries():
+            self.remove(key)
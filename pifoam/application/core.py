@@ -1,15 +1,33 @@
+import asyncio
+import copy
+import hashlib
 import os
+import numpy as np
 from pifoam.mesh.core import coreMesher
-from pifoam import utils
-import subprocess
+from pifoam.io.solverLog import solverLog
+from pifoam.io.polyMesh import polyMesh
+from pifoam.io.mapFields import fieldMapper
+from pifoam.application.functionObjects import coreFunctionObject
+from pifoam.application.cache import resultCache
+from pifoam import utils, trace
+from pifoam.system.decomposeParDict import write_decomposeParDict, parallel_command, run_decomposePar, run_decomposePar_async, run_reconstructPar, run_reconstructPar_async
 
 class coreFoam:
     """Abstract class for application
 
     Attributes:
         phys_values (tuple[str]): Physical values for the simulation.
+        phys_values_init (dict[str, any]): Initial value of each physical value. Either a uniform value
+            (scalar or tuple), an array with one value per cell, or a function of the (n_cells, 3) cell centres
+            returning such an array. Functions are evaluated once the mesh exists.
         case_dir (str): Directory for the case files.
         application (str): Name of the application.
+        n_procs (int): Number of processors. The solver runs under mpirun when it is larger than 1.
+        decompose_method (str): Decomposition method for decomposePar.
+        functions (dict[str, coreFunctionObject]): Function objects of the controlDict, keyed on their names.
+        result_cache (resultCache): Store of solver results shared across cases. None disables caching.
+        initial_cache (dict): Cell centres of the mesh and the values of the initial-value functions evaluated
+            on them, reused until `mesh_signature` changes.
     """
     phys_values = None
     application = None
@@ -20,13 +38,22 @@ class coreFoam:
                 control_props:dict = None,
                 fvSchemes_props:dict = None,
                 fvSolution_props:dict = None,
+                n_procs:int = 1,
+                decompose_method:str = "scotch",
+                result_cache:resultCache = None,
                 ) -> None:
         self.case_dir = case_dir
+        self.n_procs = n_procs
+        self.decompose_method = decompose_method
         self.mesher = mesher
         self.control_props = self.default_controlDict() if control_props is None else control_props
         self.fvSchemes_props = self.default_fvSchemes() if fvSchemes_props is None else fvSchemes_props
         self.fvSolution_props = self.default_fvSolution() if fvSolution_props is None else fvSolution_props
-        self.phys_values_init = phys_values_init
+        # Copied, since the same dictionary is often passed to several cases and warm_start replaces its values.
+        self.phys_values_init = dict(phys_values_init)
+        self.initial_cache = None
+        self.functions = {}
+        self.result_cache = result_cache
 
         self.boundaryConditions = {
             phys_v:{
@@ -41,6 +68,86 @@ class coreFoam:
     def set_controlDict(self, category:str, value:any)->None:
         self.control_props[category] = value
 
+    def add_function(self, function_object:coreFunctionObject)->coreFunctionObject:
+        """Add a function object to the controlDict, replacing the one of the same name.
+
+        Args:
+            function_object (coreFunctionObject): e.g. `probes("probes", ["p"], [(1, 0, 0.5)])`.
+        Returns:
+            coreFunctionObject: The function object, whose `read(case_dir)` loads its results.
+        """
+        self.functions[function_object.name] = function_object
+        return function_object
+
+    def set_param(self, name:str, value:any)->None:
+        """Set a controlDict entry or an attribute of the application (e.g. nu).
+
+        Args:
+            name (str): Name of the controlDict entry or attribute.
+            value (any): The new value.
+        """
+        if name in self.control_props:
+            self.set_controlDict(name, value)
+        elif name in self.__dict__ and not isinstance(self.__dict__[name], dict):
+            setattr(self, name, value)
+        else:
+            raise KeyError(f"Unknown parameter '{name}' for {self.application}.")
+
+    def copy(self, case_dir:str, params:dict[str, any] = None, setters:dict[str, callable] = None)->"coreFoam":
+        """Create a copy of the application for another case directory. Nothing is written.
+
+        Args:
+            case_dir (str): Directory for the new case.
+            params (dict[str, any], optional): Parameters of the new case, set with `set_param`. Defaults to None.
+            setters (dict[str, callable], optional): Functions `setter(case, value)` for parameters which
+                `set_param` cannot handle (e.g. an inlet velocity). Defaults to None.
+        Returns:
+            coreFoam: The new application. It shares the mesh and result caches, everything else is copied.
+        """
+        memo = {id(cache): cache for cache in (getattr(self.mesher, "cache", None), self.result_cache) if cache is not None}
+        case = copy.deepcopy(self, memo)
+        case.case_dir = case_dir
+        for name, value in ({} if params is None else params).items():
+            if setters is not None and name in setters:
+                setters[name](case, value)
+            else:
+                case.set_param(name, value)
+        return case
+
+    def clone(self, new_case_dir:str, **overrides)->"coreFoam":
+        """Create a new case from this prepared case, sharing the files which do not change.
+
+        If the mesher inputs are unchanged, constant/polyMesh is hardlinked (or reflinked on copy-on-write
+        filesystems) from this case. constant/triSurface and the initial fields are shared when their content
+        is identical. The initial fields are only shared for serial runs, since reconstructPar rewrites them
+        in place. The dictionaries in system, which may be edited during the run, are always written to the
+        new case, as are processor and time directories never shared. Files are replaced atomically by
+        `utils.write_files`, so rewriting a file of a clone never modifies the other cases.
+
+        Args:
+            new_case_dir (str): Directory for the new case.
+            **overrides: Parameters of the new case, set with `set_param`, e.g. nu=1e-3.
+        Returns:
+            coreFoam: The new case, ready to run if the mesh was shared.
+        """
+        case = self.copy(new_case_dir, overrides)
+        case.create_dir()
+        manifest = utils.read_manifest(self.case_dir)
+        mesh_files = case.mesher.case_files()
+        share_mesh = os.path.isdir(f"{self.case_dir}/constant/polyMesh") and all(
+            path in manifest
+            and manifest[path]["sha256"] == hashlib.sha256(content.encode() if isinstance(content, str) else content).hexdigest()
+            and utils.manifest_matches(self.case_dir, path, manifest[path])
+            for path, content in mesh_files.items()
+        )
+        shared = ("constant/triSurface/",)
+        if share_mesh:
+            utils.link_tree(f"{self.case_dir}/constant/polyMesh", f"{new_case_dir}/constant/polyMesh", reflink=True)
+            if case.n_procs == 1:
+                shared += ("0/",)
+        utils.write_files(new_case_dir, {**case.case_files(include_mesh=False), **mesh_files}, link_from=self.case_dir, shared=shared)
+        return case
+
     def set_boundaryCondition(self, phys_v:str, boundary_n:str, b_type:str, value:str = None)->None:
         self.boundaryConditions[phys_v][boundary_n]["type"] = b_type
         if value is not None:
@@ -60,63 +167,272 @@ class coreFoam:
         """
         os.makedirs(f"{self.case_dir}/constant", exist_ok=True)
         os.makedirs(f"{self.case_dir}/system", exist_ok=True)
-        os.makedirs(f"{self.case_dir}/0", exist_ok=False)
+        os.makedirs(f"{self.case_dir}/0", exist_ok=True)
     
-    def create_mesh(self)->None:
-        self.mesher.run(self.case_dir)
+    def create_mesh(self)->int:
+        returncode = self.mesher.run(self.case_dir)
+        if returncode == 0 and self.initial_values_need_mesh():
+            self.write_initial_conditions()
+        return returncode
+
+    async def create_mesh_async(self, timeout:float = None)->int:
+        """Asynchronous version of `create_mesh`. Cancelling it kills the running OpenFOAM process tree.
+
+        Args:
+            timeout (float, optional): Time limit in seconds for meshing. Defaults to None.
+        Returns:
+            int: The exit code of the mesher.
+        Raises:
+            asyncio.TimeoutError: If meshing did not finish within `timeout`.
+        """
+        returncode = await asyncio.wait_for(self.mesher.run_async(self.case_dir), timeout)
+        if returncode == 0 and self.initial_values_need_mesh():
+            self.write_initial_conditions()
+        return returncode
+
+    def initial_values_need_mesh(self)->bool:
+        return any(callable(v) for v in self.phys_values_init.values())
+
+    def initial_values(self, phys_v:str)->any:
+        """Initial value of a physical value, evaluating functions of the cell centres.
+
+        Args:
+            phys_v (str): Name of the physical value.
+        Returns:
+            any: A uniform value or an array with one value per cell.
+        """
+        value = self.phys_values_init[phys_v]
+        if callable(value):
+            if not os.path.isdir(f"{self.case_dir}/constant/polyMesh"):
+                raise FileNotFoundError(f"Initial value of '{phys_v}' depends on the cell centres but {self.case_dir} has no mesh.")
+            signature = self.mesh_signature()
+            if self.initial_cache is None or self.initial_cache["signature"] != signature:
+                self.initial_cache = {"signature": signature, "cell_centres": polyMesh(self.case_dir).cell_centres, "values": {}}
+            # Functions are evaluated once per mesh, however often the initial conditions are rendered.
+            function, values = self.initial_cache["values"].get(phys_v, (None, None))
+            if function is not value:
+                values = np.asarray(value(self.initial_cache["cell_centres"]))
+                self.initial_cache["values"][phys_v] = (value, values)
+            value = values
+        return value
+
+    def mesh_signature(self)->tuple:
+        """Inode, size and modification time of the polyMesh files, which change whenever the mesh is rewritten."""
+        mesh_dir = f"{self.case_dir}/constant/polyMesh"
+        signature = []
+        for name in sorted(os.listdir(mesh_dir)):
+            stat = os.stat(f"{mesh_dir}/{name}")
+            signature.append((name, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
     
+    def warm_start(self, source_dir:str, time:float = None, fields:list[str] = None, k:int = 4, power:float = 2.0)->fieldMapper:
+        """Initialize the fields from a previous run, which may use a different mesh.
+
+        The fields of the source case are interpolated onto the cell centres of this case once its mesh exists.
+        The boundary conditions of this case are not changed.
+
+        Args:
+            source_dir (str): Directory of the previous case. Parallel runs must be reconstructed.
+            time (float, optional): Time of the source fields. Defaults to the latest time.
+            fields (list[str], optional): Fields to initialize. Defaults to the physical values found in the source.
+            k (int, optional): Number of source cells averaged per cell, 1 for nearest-neighbour mapping. Defaults to 4.
+            power (float, optional): Exponent of the inverse-distance weights. Defaults to 2.0.
+        Returns:
+            fieldMapper: The mapper of the source fields.
+        """
+        mapper = fieldMapper(source_dir, time, k, power)
+        for phys_v in (self.phys_values if fields is None else fields):
+            if phys_v in mapper:
+                self.phys_values_init = {**self.phys_values_init, phys_v: mapper.initial_value(phys_v)}
+            elif fields is not None:
+                raise KeyError(f"No field '{phys_v}' at time {mapper.time} in {source_dir}.")
+        return mapper
+
+    def render_fvSchemes(self)->str:
+        buffer = [utils.foam_header("dictionary", "system", "fvSchemes")]
+        for key, value in self.fvSchemes_props.items():
+            buffer.append(utils.format_dict(value, key))
+        return "".join(buffer)
+
+    def render_fvSolution(self)->str:
+        buffer = [utils.foam_header("dictionary", "system", "fvSolution")]
+        for key, value in self.fvSolution_props.items():
+            buffer.append(utils.format_dict(value, key))
+        return "".join(buffer)
+
+    def render_controlDict(self, overrides:dict[str, any] = None)->str:
+        """Serialize the controlDict file.
+
+        Args:
+            overrides (dict[str, any], optional): Entries replacing the ones of `control_props` in the file only,
+                e.g. {"stopAt": "writeNow"} to end a running case. Defaults to None.
+        Returns:
+            str: The content of the controlDict file.
+        """
+        control_props = self.control_props if overrides is None else {**self.control_props, **overrides}
+        keys = ["startFrom"]
+        if control_props['startFrom'] == "startTime":
+            keys.append("startTime")
+        keys.append("stopAt")
+        # endTime stays in the file when an override stops the run, as the solver keeps reading it.
+        if self.control_props['stopAt'] == "endTime":
+            keys.append("endTime")
+        keys += ["deltaT", "writeControl", "writeInterval", "purgeWrite", "writeFormat", "writePrecision",
+                "writeCompression", "timeFormat", "timePrecision", "runTimeModifiable"]
+        buffer = [utils.foam_header("dictionary", "system", "controlDict"), f"application\t{self.application};\n"]
+        buffer += [f"{key}\t{control_props[key]};\n" for key in keys]
+        if self.functions:
+            buffer.append(utils.format_dict({name: f.entries() for name, f in self.functions.items()}, "functions"))
+        return "".join(buffer)
+
+    def render_transportProperties(self)->str:
+        raise NotImplementedError("Method 'render_transportProperties' must be implemented in subclasses.")
+
+    def render_initial_conditions(self)->dict[str, bytes]:
+        raise NotImplementedError("Method 'render_initial_conditions' must be implemented in subclasses.")
+
+    def case_files(self, include_mesh:bool = True)->dict[str, str|bytes]:
+        """Build the content of every file of the case in memory.
+
+        Args:
+            include_mesh (bool, optional): Whether to include the files written by the mesher. Defaults to True.
+        Returns:
+            dict[str, str|bytes]: Content of each file, keyed on the path relative to the case directory.
+                Initial conditions depending on a missing mesh are left out.
+        """
+        files = {
+            "system/controlDict": self.render_controlDict(),
+            "system/fvSchemes": self.render_fvSchemes(),
+            "system/fvSolution": self.render_fvSolution(),
+            "constant/transportProperties": self.render_transportProperties(),
+        }
+        if not self.initial_values_need_mesh() or os.path.isdir(f"{self.case_dir}/constant/polyMesh"):
+            files.update(self.render_initial_conditions())
+        if include_mesh:
+            files.update(self.mesher.case_files())
+        return files
+
     def write_fvSchemes(self)->None:
-        with open(f"{self.case_dir}/system/fvSchemes", "w") as file:
-            utils.write_format(file, {"version" : 2.0, "format" : "ascii", "class" : "dictionary", "location" : "system", "object" : "fvSchemes"}, "FoamFile")
-            for key, value in self.fvSchemes_props.items():
-                utils.write_format(file, value, key)
+        utils.write_files(self.case_dir, {"system/fvSchemes": self.render_fvSchemes()})
 
     def write_fvSolution(self)->None:
-        with open(f"{self.case_dir}/system/fvSolution", "w") as file:
-            utils.write_format(file, {"version" : 2.0, "format" : "ascii", "class" : "dictionary", "location" : "system", "object" : "fvSolution"}, "FoamFile")
-            for key, value in self.fvSolution_props.items():
-                utils.write_format(file, value, key)
+        utils.write_files(self.case_dir, {"system/fvSolution": self.render_fvSolution()})
     
     def write_controlDict(self)->None:
-        with open(f"{self.case_dir}/system/controlDict", "w") as file:
-            utils.write_format(file, {"version" : 2.0, "format" : "ascii", "class" : "dictionary", "location" : "system", "object" : "controlDict"}, "FoamFile")
-            file.write(f"application\t{self.application};\n")
-            file.write(f"startFrom\t{self.control_props['startFrom']};\n")
-            if self.control_props['startFrom'] == "startTime":
-                file.write(f"startTime\t{self.control_props['startTime']};\n")
-            file.write(f"stopAt\t{self.control_props['stopAt']};\n")
-            if self.control_props['stopAt'] == "endTime":
-                file.write(f"endTime\t{self.control_props['endTime']};\n")
-            file.write(f"deltaT\t{self.control_props['deltaT']};\n")
-            file.write(f"writeControl\t{self.control_props['writeControl']};\n")
-            file.write(f"writeInterval\t{self.control_props['writeInterval']};\n")
-            file.write(f"purgeWrite\t{self.control_props['purgeWrite']};\n")
-            file.write(f"writeFormat\t{self.control_props['writeFormat']};\n")
-            file.write(f"writePrecision\t{self.control_props['writePrecision']};\n")
-            file.write(f"writeCompression\t{self.control_props['writeCompression']};\n")
-            file.write(f"timeFormat\t{self.control_props['timeFormat']};\n")
-            file.write(f"timePrecision\t{self.control_props['timePrecision']};\n")
-            file.write(f"runTimeModifiable\t{self.control_props['runTimeModifiable']};\n")
+        utils.write_files(self.case_dir, {"system/controlDict": self.render_controlDict()})
     
     def write_transportProperties(self)->None:
-        raise NotImplementedError("Method 'write_transportProperties' must be implemented in subclasses.")
+        utils.write_files(self.case_dir, {"constant/transportProperties": self.render_transportProperties()})
     
     def write_initial_conditions(self)->None:
-        raise NotImplementedError("Method 'write_initial_conditions' must be implemented in subclasses.")
-
-    def setup(self)->None:
-        self.create_dir()
-        self.write_fvSchemes()
-        self.write_fvSolution()
-        self.write_controlDict()
-        self.write_transportProperties()
-        self.write_initial_conditions()
+        utils.write_files(self.case_dir, self.render_initial_conditions())
+
+    def setup(self)->bool:
+        """Write the files of the case. Only the files whose content changed are rewritten.
+
+        Returns:
+            bool: Whether the mesh must be (re)generated, i.e. a mesher input changed or there is no mesh yet.
+        """
+        with trace.span("setup", "stage", application=self.application):
+            self.create_dir()
+            mesh_files = self.mesher.case_files()
+            changed = utils.write_files(self.case_dir, {**self.case_files(include_mesh=False), **mesh_files})
+        return any(f in mesh_files for f in changed) or not os.path.isdir(f"{self.case_dir}/constant/polyMesh")
     
-    def run(self, show_log:bool = False)->None:
-        if show_log:
-            subprocess.run([self.application, "-case", self.case_dir])
-        else:
-            subprocess.run([self.application, "-case", self.case_dir], stdout=subprocess.DEVNULL)
+    def run(self, show_log:bool = False, reconstruct:bool = True, log:solverLog = None)->int:
+        """Run the application.
+
+        With a `result_cache`, the results of an identical configuration are restored instead of running the solver.
+
+        Args:
+            show_log (bool, optional): Whether to show the solver log. Defaults to False.
+            reconstruct (bool, optional): Whether to run reconstructPar after a parallel run. Defaults to True.
+            log (solverLog, optional): Parser fed with the solver stdout while it runs. Defaults to None.
+        Returns:
+            int: The exit code of the application.
+        """
+        with trace.span("solve", "stage", self.case_dir, application=self.application, n_procs=self.n_procs) as s:
+            key = None if self.result_cache is None else self.result_cache.key(self, reconstruct)
+            hit = key is not None and self.result_cache.fetch(key, self.case_dir, log, show_log)
+            if hit:
+                returncode = 0
+            else:
+                lines = []
+                returncode = self.run_solver(show_log, reconstruct, self.recorder(key, lines, log))
+                self.finish_run(key, returncode, lines)
+            if s is not None:
+                s.args.update({"returncode": returncode, "cache_hit": hit})
+        if log is not None:
+            log.finish_step()
+        return returncode
+
+    def recorder(self, key:str|None, lines:list[str], log:solverLog)->callable:
+        """Line callback of the solver, also keeping its stdout in `lines` when the run is cached."""
+        if key is None:
+            return log
+        def record(line:str)->None:
+            lines.append(line)
+            if log is not None:
+                log(line)
+        return record
+
+    def finish_run(self, key:str|None, returncode:int, lines:list[str])->None:
+        if returncode == 0 and key is not None:
+            self.result_cache.store(key, self, "".join(lines))
+
+    def run_solver(self, show_log:bool, reconstruct:bool, log:solverLog)->int:
+        command = [self.application, "-case", self.case_dir]
+        if self.n_procs == 1:
+            return utils.run_command(command, show_log, log)
+        write_decomposeParDict(self.case_dir, self.n_procs, self.decompose_method)
+        returncode = run_decomposePar(self.case_dir)
+        if returncode != 0:
+            return returncode
+        returncode = utils.run_command(parallel_command(command, self.n_procs), show_log, log)
+        if returncode == 0 and reconstruct:
+            returncode = run_reconstructPar(self.case_dir)
+        return returncode
+
+    async def run_async(self, show_log:bool = False, reconstruct:bool = True, log:solverLog = None, timeout:float = None)->int:
+        """Asynchronous version of `run`. Cancelling it kills the running OpenFOAM process tree.
+
+        Args:
+            show_log (bool, optional): Whether to show the solver log. Defaults to False.
+            reconstruct (bool, optional): Whether to run reconstructPar after a parallel run. Defaults to True.
+            log (solverLog, optional): Parser fed with the solver stdout while it runs. Defaults to None.
+            timeout (float, optional): Time limit in seconds for the whole run. Defaults to None.
+        Returns:
+            int: The exit code of the application.
+        Raises:
+            asyncio.TimeoutError: If the run did not finish within `timeout`.
+        """
+        async def run(callback:callable)->int:
+            command = [self.application, "-case", self.case_dir]
+            if self.n_procs == 1:
+                return await utils.run_command_async(command, show_log, callback)
+            write_decomposeParDict(self.case_dir, self.n_procs, self.decompose_method)
+            returncode = await run_decomposePar_async(self.case_dir)
+            if returncode != 0:
+                return returncode
+            returncode = await utils.run_command_async(parallel_command(command, self.n_procs), show_log, callback)
+            if returncode == 0 and reconstruct:
+                returncode = await run_reconstructPar_async(self.case_dir)
+            return returncode
+
+        with trace.span("solve", "stage", self.case_dir, application=self.application, n_procs=self.n_procs) as s:
+            key = None if self.result_cache is None else self.result_cache.key(self, reconstruct)
+            hit = key is not None and self.result_cache.fetch(key, self.case_dir, log, show_log)
+            if hit:
+                returncode = 0
+            else:
+                lines = []
+                returncode = await asyncio.wait_for(run(self.recorder(key, lines, log)), timeout)
+                self.finish_run(key, returncode, lines)
+            if s is not None:
+                s.args.update({"returncode": returncode, "cache_hit": hit})
+        if log is not None:
+            log.finish_step()
+        return returncode
 
 
 class coreFoam_steady(coreFoam):
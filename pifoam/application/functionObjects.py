@@ -0,0 +1,269 @@
+import os
+import numpy as np
+from pifoam import utils
+from pifoam.io.field import timeSeries
+from pifoam.io.postProcessing import postProcessingTable
+
+
+def format_entries(entries:dict[str, dict])->str:
+    """Serialize named dictionaries as an OpenFOAM list, e.g. `( U{mean on;} p{mean on;} )`."""
+    return "( " + " ".join(utils.format_dict(value, name, False) for name, value in entries.items()) + " )"
+
+
+class coreFunctionObject:
+    """Function object written into the `functions` block of the controlDict.
+
+    Subclasses define the entries of the function object and read what it writes under
+    postProcessing/<name>, so that quantities are reduced by the solver instead of dumping full fields.
+
+    Attributes:
+        name (str): Name of the function object, i.e. its directory under postProcessing.
+        props (dict[str, any]): Entries of the function object. Extra keyword arguments of the
+            constructors are added as is, e.g. timeStart=10.
+    """
+    type = None
+    libs = None
+    def __init__(self, name:str, writeControl:str = "timeStep", writeInterval:int = 1, **props)->None:
+        self.name = name
+        self.props = {"type": self.type, "libs": f'("{self.libs}")', "writeControl": writeControl, "writeInterval": writeInterval, **props}
+
+    def entries(self)->dict[str, any]:
+        return self.props
+
+    def output_dir(self, case_dir:str)->str:
+        return f"{case_dir}/postProcessing/{self.name}"
+
+    def table(self, case_dir:str, file:str)->postProcessingTable:
+        """Incremental reader of one of the tables written by the function object."""
+        return postProcessingTable(case_dir, self.name, file)
+
+    def find_file(self, case_dir:str, names:tuple[str, ...])->str:
+        """First of `names` written by the function object (file names differ between OpenFOAM versions)."""
+        directory = self.output_dir(case_dir)
+        starts = os.listdir(directory) if os.path.isdir(directory) else []
+        for name in names:
+            if any(os.path.isfile(f"{directory}/{start}/{name}") for start in starts):
+                return name
+        raise FileNotFoundError(f"None of {names} in {directory}.")
+
+    def read(self, case_dir:str)->dict[str, np.ndarray]:
+        raise NotImplementedError("This method should be implemented in subclasses.")
+
+
+class probes(coreFunctionObject):
+    """Values of fields at points.
+
+    Attributes:
+        fields (list[str]): Names of the sampled fields.
+        locations (list[tuple[float, float, float]]): The probe points.
+    """
+    type = "probes"
+    libs = "libsampling.so"
+    def __init__(self, name:str, fields:list[str], locations:list[tuple[float, float, float]], **props)->None:
+        super().__init__(name, **props)
+        self.fields = list(fields)
+        self.locations = [tuple(p) for p in locations]
+        self.props.update({"fields": f"({' '.join(self.fields)})",
+                        "probeLocations": "(" + " ".join(utils.tupleToDict(p) for p in self.locations) + ")"})
+
+    def read(self, case_dir:str)->dict[str, np.ndarray]:
+        """Read the probed values.
+
+        Returns:
+            dict[str, np.ndarray]: "time" (n_times,) and, per field, (n_times, n_probes) or (n_times, n_probes, n_comp).
+        """
+        result = {}
+        for field in self.fields:
+            data = self.table(case_dir, field).read()
+            if data.shape[0] == 0:
+                continue
+            result.setdefault("time", data[:, 0])
+            n_comp = (data.shape[1] - 1)//len(self.locations)
+            values = data[:, 1:].reshape(len(data), len(self.locations), n_comp)
+            result[field] = values[:, :, 0] if n_comp == 1 else values
+        return result
+
+
+class forces(coreFunctionObject):
+    """Pressure and viscous forces and moments on patches.
+
+    Attributes:
+        patches (list[str]): Names of the patches.
+    """
+    type = "forces"
+    libs = "libforces.so"
+    def __init__(self, name:str, patches:list[str], rhoInf:float = 1.0, CofR:tuple[float, float, float] = (0, 0, 0), **props)->None:
+        super().__init__(name, **props)
+        self.patches = list(patches)
+        self.props.update({"patches": f"({' '.join(self.patches)})", "rho": "rhoInf", "rhoInf": rhoInf, "CofR": utils.tupleToDict(CofR)})
+
+    def read(self, case_dir:str)->dict[str, np.ndarray]:
+        """Read the forces and moments.
+
+        Returns:
+            dict[str, np.ndarray]: "time" (n_times,) and "force", "force_pressure", "force_viscous", "moment",
+                "moment_pressure", "moment_viscous" (n_times, 3).
+        """
+        file = self.find_file(case_dir, ("force.dat", "forces.dat"))
+        data = self.table(case_dir, file).read()
+        if data.shape[0] == 0:
+            return {}
+        result = {"time": data[:, 0]}
+        if file == "force.dat":
+            # total, pressure and viscous vectors, with the moments in moment.dat.
+            moments = self.table(case_dir, "moment.dat").read()
+            for key, table in (("force", data), ("moment", moments)):
+                result.update({key: table[:, 1:4], f"{key}_pressure": table[:, 4:7], f"{key}_viscous": table[:, 7:10]})
+            return result
+        # forces.dat: ((pressure) (viscous) [(porous)]) for the forces then the moments.
+        n = (data.shape[1] - 1)//6
+        for i, key in enumerate(("force", "moment")):
+            block = data[:, 1 + 3*n*i:1 + 3*n*(i + 1)].reshape(len(data), n, 3)
+            result.update({key: block.sum(axis=1), f"{key}_pressure": block[:, 0], f"{key}_viscous": block[:, 1]})
+        return result
+
+
+class forceCoeffs(coreFunctionObject):
+    """Drag, lift and moment coefficients of patches.
+
+    Attributes:
+        patches (list[str]): Names of the patches.
+    """
+    type = "forceCoeffs"
+    libs = "libforces.so"
+    def __init__(self,
+                name:str,
+                patches:list[str],
+                magUInf:float,
+                lRef:float,
+                Aref:float,
+                liftDir:tuple[float, float, float] = (0, 1, 0),
+                dragDir:tuple[float, float, float] = (1, 0, 0),
+                pitchAxis:tuple[float, float, float] = (0, 0, 1),
+                CofR:tuple[float, float, float] = (0, 0, 0),
+                rhoInf:float = 1.0,
+                **props,
+                )->None:
+        super().__init__(name, **props)
+        self.patches = list(patches)
+        self.props.update({"patches": f"({' '.join(self.patches)})", "rho": "rhoInf", "rhoInf": rhoInf,
+                        "liftDir": utils.tupleToDict(liftDir), "dragDir": utils.tupleToDict(dragDir),
+                        "pitchAxis": utils.tupleToDict(pitchAxis), "CofR": utils.tupleToDict(CofR),
+                        "magUInf": magUInf, "lRef": lRef, "Aref": Aref})
+
+    def read(self, case_dir:str)->dict[str, np.ndarray]:
+        """Read the coefficients.
+
+        Returns:
+            dict[str, np.ndarray]: "time" and one array per coefficient named as in the file header, e.g. "Cd", "Cl", "Cm".
+        """
+        return self.table(case_dir, self.find_file(case_dir, ("coefficient.dat", "forceCoeffs.dat"))).named()
+
+
+class fieldAverage(coreFunctionObject):
+    """Time averages of fields, written as <field>Mean and <field>Prime2Mean fields at each write time.
+
+    Attributes:
+        fields (list[str]): Names of the averaged fields.
+        prime2Mean (bool): Whether the variances are averaged too.
+    """
+    type = "fieldAverage"
+    libs = "libfieldFunctionObjects.so"
+    def __init__(self, name:str, fields:list[str], prime2Mean:bool = False, base:str = "time", writeControl:str = "writeTime", **props)->None:
+        super().__init__(name, writeControl=writeControl, **props)
+        self.fields = list(fields)
+        self.prime2Mean = prime2Mean
+        self.props.pop("writeInterval")
+        entry = {"mean": "on", "prime2Mean": "on" if prime2Mean else "off", "base": base}
+        self.props["fields"] = format_entries({field: dict(entry) for field in self.fields})
+
+    def read(self, case_dir:str, time:float = None)->dict[str, np.ndarray]:
+        """Read the averaged fields.
+
+        Args:
+            case_dir (str): The directory of the OpenFOAM case.
+            time (float, optional): Time of the averages. Defaults to the latest time directory.
+        Returns:
+            dict[str, np.ndarray]: internalField of <field>Mean (and <field>Prime2Mean) keyed on their names.
+        """
+        series = timeSeries(case_dir)
+        directory = series.latest() if time is None else series.at(time)
+        names = [f"{f}Mean" for f in self.fields] + ([f"{f}Prime2Mean" for f in self.fields] if self.prime2Mean else [])
+        return {name: np.asarray(directory.internalField(name)) for name in names if name in directory}
+
+
+class surfaces(coreFunctionObject):
+    """Fields sampled on cutting planes, written in the raw format.
+
+    Attributes:
+        fields (list[str]): Names of the sampled fields.
+        planes (dict[str, tuple]): (point, normal) of each plane, keyed on the surface name.
+    """
+    type = "surfaces"
+    libs = "libsampling.so"
+    def __init__(self, name:str, fields:list[str], planes:dict[str, tuple], interpolationScheme:str = "cellPoint", **props)->None:
+        super().__init__(name, **props)
+        self.fields = list(fields)
+        self.planes = planes
+        entries = {
+            surface: {"type": "cuttingPlane", "planeType": "pointAndNormal",
+                    "pointAndNormalDict": {"point": utils.tupleToDict(point), "normal": utils.tupleToDict(normal)},
+                    "interpolate": "true"}
+            for surface, (point, normal) in planes.items()
+        }
+        self.props.update({"surfaceFormat": "raw", "interpolationScheme": interpolationScheme,
+                        "fields": f"({' '.join(self.fields)})", "surfaces": format_entries(entries)})
+
+    def read(self, case_dir:str)->dict[str, dict[str, np.ndarray]]:
+        """Read the sampled surfaces.
+
+        Returns:
+            dict[str, dict[str, np.ndarray]]: Per surface, "time" (n_times,), "points" (n_points, 3) and,
+                per field, (n_times, n_points) or (n_times, n_points, n_comp).
+        """
+        directory = self.output_dir(case_dir)
+        times = sorted((d for d in os.listdir(directory) if os.path.isdir(f"{directory}/{d}")), key=float) if os.path.isdir(directory) else []
+        result = {}
+        for surface in self.planes:
+            samples = {"time": [], "points": None, **{field: [] for field in self.fields}}
+            for t in times:
+                found = False
+                for field in self.fields:
+                    path = f"{directory}/{t}/{field}_{surface}.raw"
+                    if not os.path.isfile(path):
+                        continue
+                    data = np.loadtxt(path, comments="#", ndmin=2)
+                    if samples["points"] is None:
+                        samples["points"] = data[:, :3]
+                    values = data[:, 3:]
+                    samples[field].append(values[:, 0] if values.shape[1] == 1 else values)
+                    found = True
+                if found:
+                    samples["time"].append(float(t))
+            result[surface] = {key: np.array(value) if isinstance(value, list) else value for key, value in samples.items()}
+        return result
+
+
+class residuals(coreFunctionObject):
+    """Initial residuals of the solved fields at every time step.
+
+    Use `function_type="solverInfo"` for recent OpenFOAM.com versions.
+
+    Attributes:
+        fields (list[str]): Names of the fields.
+    """
+    type = "residuals"
+    libs = "libutilityFunctionObjects.so"
+    def __init__(self, name:str, fields:list[str], function_type:str = "residuals", **props)->None:
+        super().__init__(name, **props)
+        self.fields = list(fields)
+        self.props.update({"type": function_type, "fields": f"({' '.join(self.fields)})"})
+
+    def read(self, case_dir:str)->dict[str, np.ndarray]:
+        """Read the residuals.
+
+        Returns:
+            dict[str, np.ndarray]: "time" and one array per column named as in the file header, e.g. "p" or
+                "Ux_initial". Steps where a field was not solved hold NaN.
+        """
+        return self.table(case_dir, self.find_file(case_dir, ("residuals.dat", "solverInfo.dat"))).named()
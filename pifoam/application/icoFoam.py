@@ -1,6 +1,8 @@
 from pifoam.application.core import coreFoam_transient
+from pifoam.application.cache import resultCache
 from pifoam.mesh.core import coreMesher
 from pifoam import utils
+from pifoam.io.field import render_field
 
 class icoFoam(coreFoam_transient):
     phys_values = ("p", "U")
@@ -13,8 +15,11 @@ class icoFoam(coreFoam_transient):
                 control_props:dict = None,
                 fvSchemes_props:dict = None,
                 fvSolution_props:dict = None,
+                n_procs:int = 1,
+                decompose_method:str = "scotch",
+                result_cache:resultCache = None,
                 ) -> None:
-        super().__init__(case_dir, mesher, phys_values_init, control_props, fvSchemes_props, fvSolution_props)
+        super().__init__(case_dir, mesher, phys_values_init, control_props, fvSchemes_props, fvSolution_props, n_procs, decompose_method, result_cache)
         self.nu = nu
 
     def default_fvSchemes(self)->dict[dict]:
@@ -37,21 +42,13 @@ class icoFoam(coreFoam_transient):
             "PISO":{"nCorrectors":2, "nNonOrthogonalCorrectors":2}
         }
     
-    def write_transportProperties(self)->None:
-        with open(f"{self.case_dir}/constant/transportProperties", "w") as file:
-            utils.write_format(file, {"version": 2.0, "format": "ascii", "class": "dictionary", "location": "constant", "object": "transportProperties"}, "FoamFile")
-            file.write(f"nu\t{self.nu};")
-    
-    def write_initial_conditions(self)->None:
-        with open(f"{self.case_dir}/0/U", "w") as file:
-            utils.write_format(file, {"version": 2.0, "format": "ascii", "class": "volVectorField", "location": "0", "object": "U"}, "FoamFile")
-            file.write("dimensions\t[0 1 -1 0 0 0 0];\n")
-            file.write(f"internalField\tuniform {utils.tupleToDict(self.phys_values_init['U'])};\n")
+    def render_transportProperties(self)->str:
+        return utils.foam_header("dictionary", "constant", "transportProperties") + f"nu\t{self.nu};"
 
-            utils.write_format(file, self.boundaryConditions["U"], "boundaryField")
-        
-        with open(f"{self.case_dir}/0/p", "w") as file:
-            utils.write_format(file, {"version": 2.0, "format": "ascii", "class": "volScalarField", "location": "0", "object": "p"}, "FoamFile")
-            file.write("dimensions\t[0 2 -2 0 0 0 0];\n")
-            file.write(f"internalField\tuniform {self.phys_values_init['p']};\n")
-            utils.write_format(file, self.boundaryConditions["p"], "boundaryField")
\ No newline at end of file
+    def render_initial_conditions(self)->dict[str, bytes]:
+        write_format = self.control_props["writeFormat"]
+        precision = self.control_props["writePrecision"]
+        return {
+            "0/U": render_field("0", "U", "volVectorField", "[0 1 -1 0 0 0 0]", self.initial_values("U"), self.boundaryConditions["U"], write_format, precision),
+            "0/p": render_field("0", "p", "volScalarField", "[0 2 -2 0 0 0 0]", self.initial_values("p"), self.boundaryConditions["p"], write_format, precision),
+        }
@@ -0,0 +1,230 @@
+import threading
+import numpy as np
+from pifoam import utils
+from pifoam.io.postProcessing import postProcessingTable
+
+
+def dominant_frequency(values:np.ndarray, dt:float)->tuple[float, float]:
+    """Dominant frequency of a uniformly sampled signal, by FFT with a Hann window.
+
+    The peak is refined by parabolic interpolation of the log power spectrum.
+
+    Args:
+        values (np.ndarray): The samples.
+        dt (float): The sampling interval.
+    Returns:
+        tuple[float, float]: The frequency and the fraction of the (non-zero frequency) power in the peak.
+    """
+    n = len(values)
+    power = np.abs(np.fft.rfft((values - values.mean())*np.hanning(n)))**2
+    power[0] = 0.0
+    total = power.sum()
+    if n < 8 or total <= 0.0:
+        return 0.0, 0.0
+    k = int(np.argmax(power[1:])) + 1
+    shift = 0.0
+    if k + 1 < len(power):
+        a, b, c = np.log(power[k - 1:k + 2] + total*1e-30)
+        if a - 2*b + c < 0:
+            shift = 0.5*(a - c)/(a - 2*b + c)
+    # The Hann window spreads a pure tone over three bins.
+    peak = power[max(k - 1, 1):k + 2].sum()/total
+    return (k + shift)/(n*dt), float(peak)
+
+
+def stationarity(times:np.ndarray,
+                values:np.ndarray,
+                min_time:float = 0.0,
+                rtol:float = 0.02,
+                atol:float = 0.0,
+                freq_rtol:float = 0.02,
+                n_blocks:int = 3,
+                block_periods:int = 5,
+                min_samples:int = 64,
+                peak_fraction:float = 0.5,
+                )->dict[str, any]:
+    """Test whether a monitored signal has reached a statistically stationary or periodic state.
+
+    Only the latter half of the signal after `min_time` is resampled uniformly and analysed. It is periodic
+    when one frequency, with at least `block_periods` periods in that half, holds `peak_fraction` of its power. The frequency
+    must then be the same within `freq_rtol` in both halves of the last `n_blocks*block_periods` periods. The signal is stationary when the means and the
+    standard deviations of the last `n_blocks` blocks (of `block_periods` periods each, or splitting the latter
+    half of the signal when it is not periodic) agree within `rtol` times the standard deviation of the signal plus `atol`.
+
+    Args:
+        times (np.ndarray): Sample times.
+        values (np.ndarray): Samples.
+        min_time (float, optional): Start of the analysed part of the signal, skipping the initial transient. Defaults to 0.0.
+        rtol (float, optional): Tolerance on the block means and standard deviations relative to the fluctuation. Defaults to 0.02.
+        atol (float, optional): Absolute tolerance, needed for signals converging to a steady value. Defaults to 0.0.
+        freq_rtol (float, optional): Relative tolerance on the dominant frequency. Defaults to 0.02.
+        n_blocks (int, optional): Number of blocks compared. Defaults to 3.
+        block_periods (int, optional): Periods per block of a periodic signal. Defaults to 5.
+        min_samples (int, optional): Minimum number of samples analysed. Defaults to 64.
+        peak_fraction (float, optional): Fraction of the power in the peak for the signal to be periodic. Defaults to 0.5.
+    Returns:
+        dict[str, any]: "stationary", "periodic", "frequency" (None if not periodic), "mean" and "std" of the
+            last blocks, "time" of the last sample and "span", the duration of the trailing part of the signal
+            which is enough to repeat the analysis of a periodic signal (None if not periodic).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    # The samples are in time order: bisect instead of masking the whole history.
+    start = int(np.searchsorted(times, min_time))
+    times, values = times[start:], values[start:]
+    result = {"stationary": False, "periodic": False, "frequency": None, "mean": None, "std": None,
+            "time": float(times[-1]) if len(times) else None, "span": None}
+    if len(times) < min_samples:
+        return result
+    dt = float(np.median(np.diff(times[len(times)//2 - 1:])))
+    if dt <= 0.0:
+        return result
+    n = int((times[-1] - times[0])/dt) + 1
+
+    def resample(n_samples:int)->np.ndarray:
+        """The last `n_samples` samples of the signal resampled uniformly, interpolating only the part needed."""
+        i = max(int(np.searchsorted(times, times[-1] - (n_samples - 1)*dt)) - 1, 0)
+        return np.interp(times[-1] - dt*np.arange(n_samples - 1, -1, -1), times[i:], values[i:])
+
+    half = resample(n - n//2)
+    frequency, peak = dominant_frequency(half, dt)
+    window = len(half)
+    tail = half
+    # A peak with less than a block of periods in the analysed half is a drift, not an oscillation.
+    if frequency*len(half)*dt >= block_periods and peak >= peak_fraction:
+        window = int(round(n_blocks*block_periods/(frequency*dt)))
+        if window > n:
+            # Not enough periods yet to compare the blocks.
+            return result
+        tail = half[-window:] if window <= len(half) else resample(window)
+        f0, _ = dominant_frequency(tail[:window//2], dt)
+        f1, _ = dominant_frequency(tail[window//2:], dt)
+        frequency, _ = dominant_frequency(tail, dt)
+        if abs(f1 - f0) > freq_rtol*frequency:
+            return result
+        # Twice the compared periods keep the periodicity test of the latter half valid on the trailing part alone.
+        result.update({"periodic": True, "frequency": float(frequency), "span": max(2*window, min_samples)*dt})
+    block = window//n_blocks
+    if block < 2:
+        return result
+    blocks = tail[len(tail) - n_blocks*block:].reshape(n_blocks, block)
+    means, stds = blocks.mean(axis=1), blocks.std(axis=1)
+    tol = rtol*float(blocks.std()) + atol
+    result.update({"mean": float(blocks.mean()), "std": float(blocks.std()),
+                "stationary": bool(np.ptp(means) <= tol and np.ptp(stds) <= tol)})
+    return result
+
+
+class stationarityMonitor:
+    """Stop a transient run once its monitored signals are statistically stationary or periodic.
+
+    The table of a function object (probes, forces, ...) is tailed while the solver runs. Once every
+    monitored column passes `stationarity`, the controlDict of the case is rewritten with `stopAt writeNow`,
+    which the solver picks up thanks to `runTimeModifiable true`. The application itself is not modified,
+    so the next `setup()` restores the original controlDict.
+
+        with stationarityMonitor(case, "forceCoeffs", "coefficient.dat", columns=[2, 3], min_time=5.0) as monitor:
+            case.run()
+        print(monitor.stopped_at, monitor.results)
+
+    Attributes:
+        case (coreFoam): The running application.
+        table (postProcessingTable): The monitored table.
+        columns (list[int]): Indices of the monitored columns (0 is the time). None monitors every column.
+        options (dict): Keyword arguments of `stationarity`.
+        interval (float): Seconds between two reads of the table.
+        results (list[dict]): Latest result of `stationarity` for each monitored column.
+        stopped_at (float): Simulation time at which the run was stopped, or None.
+    """
+    def __init__(self,
+                case:any,
+                name:str,
+                file:str,
+                columns:list[int] = None,
+                interval:float = 1.0,
+                **options,
+                )->None:
+        if str(case.control_props.get("runTimeModifiable")) != "true":
+            raise ValueError("stationarityMonitor needs runTimeModifiable true in the controlDict.")
+        self.case = case
+        self.table = postProcessingTable(case.case_dir, name, file)
+        self.columns = columns
+        self.options = options
+        self.interval = interval
+        self.results = []
+        self.n_rows = 0
+        self.stopped_at = None
+        self.error = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def poll(self, final:bool = False)->bool:
+        """Read the new rows and stop the run if every monitored column is stationary.
+
+        Args:
+            final (bool, optional): Whether the run has ended, so only the results are updated. Defaults to False.
+        Returns:
+            bool: Whether every monitored column is stationary.
+        """
+        data = self.table.read()
+        if data.shape[0] == 0:
+            return False
+        if data.shape[0] != self.n_rows:
+            self.n_rows = data.shape[0]
+            columns = range(1, data.shape[1]) if self.columns is None else self.columns
+            previous = self.results if len(self.results) == len(columns) else [{}]*len(columns)
+            min_time = self.options.get("min_time", 0.0)
+            options = {k: v for k, v in self.options.items() if k != "min_time"}
+            results = []
+            for c, result in zip(columns, previous):
+                # Once periodic, the column is analysed over the trailing periods only rather than its whole history.
+                start = min_time if result.get("span") is None else max(min_time, float(data[-1, 0]) - result["span"])
+                result = stationarity(data[:, 0], data[:, c], min_time=start, **options)
+                if start > min_time and not result["periodic"]:
+                    # The signal changed: go back to the whole history.
+                    result = stationarity(data[:, 0], data[:, c], min_time=min_time, **options)
+                results.append(result)
+            self.results = results
+        stationary = bool(self.results) and all(r["stationary"] for r in self.results)
+        if stationary and not final and self.stopped_at is None:
+            self.stop_run(float(data[-1, 0]))
+        return stationary
+
+    def stop_run(self, time:float)->None:
+        """Make the solver write the current time step and exit."""
+        utils.write_files(self.case.case_dir, {"system/controlDict": self.case.render_controlDict({"stopAt": "writeNow"})})
+        self.stopped_at = time
+
+    def watch(self)->None:
+        try:
+            while not self.stop_event.wait(self.interval):
+                self.poll()
+        except Exception as e:
+            self.error = e
+
+    def start(self)->None:
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def stop(self)->None:
+        """Stop watching and analyse the complete tables.
+
+        Raises:
+            Exception: The error raised while watching in the background, if any.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        self.poll(final=True)
+
+    def __enter__(self)->"stationarityMonitor":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback)->None:
+        self.stop()
@@ -0,0 +1,157 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pifoam.application.core import coreFoam
+
+class coreBudget:
+    """Counting semaphore over processor cores.
+
+    Attributes:
+        n_cores (int): Total number of cores.
+        available (int): Number of cores currently free.
+    """
+    def __init__(self, n_cores:int)->None:
+        self.n_cores = n_cores
+        self.available = n_cores
+        self.condition = threading.Condition()
+
+    def acquire(self, n:int)->None:
+        n = min(n, self.n_cores)
+        with self.condition:
+            self.condition.wait_for(lambda: self.available >= n)
+            self.available -= n
+
+    def release(self, n:int)->None:
+        n = min(n, self.n_cores)
+        with self.condition:
+            self.available += n
+            self.condition.notify_all()
+
+
+def grid_points(grid:dict[str, list])->list[dict[str, any]]:
+    """Expand a parameter grid into the list of its points.
+
+    Args:
+        grid (dict[str, list]): Values of each parameter.
+    Returns:
+        list[dict[str, any]]: One dictionary per point of the Cartesian product.
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[n] for n in names])]
+
+
+def make_case(base:coreFoam, case_dir:str, params:dict[str, any], setters:dict[str, callable] = None)->coreFoam:
+    """Create a copy of the base case with the given parameters.
+
+    Args:
+        base (coreFoam): The base case. It is not modified.
+        case_dir (str): Directory for the new case.
+        params (dict[str, any]): Parameters of the new case.
+        setters (dict[str, callable], optional): Functions `setter(case, value)` for parameters which
+            `coreFoam.set_param` cannot handle (e.g. an inlet velocity). Defaults to None.
+    Returns:
+        coreFoam: The new case.
+    """
+    return base.copy(case_dir, params, setters)
+
+
+def run_case(case:coreFoam, show_log:bool = False)->dict[str, any]:
+    """Set up, mesh and run a case.
+
+    Args:
+        case (coreFoam): The case to run.
+        show_log (bool, optional): Whether to show the solver log. Defaults to False.
+    Returns:
+        dict[str, any]: Result with keys "status", "stage", "returncode", "wall_time" and "error".
+    """
+    result = {"status":"done", "stage":None, "returncode":0, "wall_time":0.0, "error":None}
+    start = time.perf_counter()
+    try:
+        result["stage"] = "setup"
+        case.setup()
+        result["stage"] = "mesh"
+        result["returncode"] = case.create_mesh()
+        if result["returncode"] == 0:
+            result["stage"] = "run"
+            result["returncode"] = case.run(show_log)
+        if result["returncode"] != 0:
+            result["status"] = "failed"
+    except Exception as e:
+        result["status"] = "failed"
+        result["returncode"] = None
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+def sweep(base:coreFoam,
+        grid:dict[str, list],
+        root_dir:str,
+        n_cores:int = None,
+        setters:dict[str, callable] = None,
+        show_log:bool = False,
+        )->list[dict[str, any]]:
+    """Run a parameter sweep around a base case.
+
+    One case directory is created per grid point under `root_dir` and the cases run concurrently
+    while the sum of their processors stays within `n_cores`. A failing case does not stop the others.
+    Completed cases are recorded in `<case_dir>/sweep.json` and skipped when the sweep is run again,
+    so an interrupted sweep resumes where it stopped.
+
+    Args:
+        base (coreFoam): The base case.
+        grid (dict[str, list]): Values of each parameter, e.g. {"nu": [1e-3, 2e-3], "deltaT": [0.1, 0.05]}.
+        root_dir (str): Directory under which the case directories are created.
+        n_cores (int, optional): Total core budget. Defaults to the number of CPUs.
+        setters (dict[str, callable], optional): Functions `setter(case, value)` for parameters which
+            `coreFoam.set_param` cannot handle. Defaults to None.
+        show_log (bool, optional): Whether to show the solver logs. Defaults to False.
+    Returns:
+        list[dict[str, any]]: One row per grid point with keys "case_dir", "params", "status", "stage",
+            "returncode", "wall_time" and "error". "status" is "done", "failed" or "skipped".
+    """
+    n_cores = os.cpu_count() if n_cores is None else n_cores
+    budget = coreBudget(n_cores)
+    os.makedirs(root_dir, exist_ok=True)
+
+    def job(i:int, params:dict[str, any])->dict[str, any]:
+        case_dir = f"{root_dir}/case_{i:05d}"
+        row = {"case_dir":case_dir, "params":params}
+        record = f"{case_dir}/sweep.json"
+        if os.path.isfile(record):
+            with open(record) as file:
+                previous = json.load(file)
+            if previous["params"] != json.loads(json.dumps(params, default=str)):
+                row.update({"status":"failed", "stage":"params", "returncode":None, "wall_time":0.0, "error":f"{case_dir} belongs to a different sweep."})
+                return row
+            if previous["status"] == "done":
+                row.update({key:previous[key] for key in ("stage", "returncode", "wall_time", "error")})
+                row["status"] = "skipped"
+                return row
+        # Leftovers of an interrupted or failed run are discarded.
+        shutil.rmtree(case_dir, ignore_errors=True)
+
+        try:
+            case = make_case(base, case_dir, params, setters)
+        except Exception as e:
+            row.update({"status":"failed", "stage":"params", "returncode":None, "wall_time":0.0, "error":f"{type(e).__name__}: {e}"})
+            return row
+        n_procs = max(case.n_procs, getattr(case.mesher, "n_procs", 1))
+        budget.acquire(n_procs)
+        try:
+            row.update(run_case(case, show_log))
+        finally:
+            budget.release(n_procs)
+        if os.path.isdir(case_dir):
+            with open(record, "w") as file:
+                json.dump(row, file, indent=1, default=str)
+        return row
+
+    points = grid_points(grid)
+    with ThreadPoolExecutor(max_workers=max(1, min(n_cores, len(points)))) as executor:
+        futures = [executor.submit(job, i, params) for i, params in enumerate(points)]
+        return [f.result() for f in futures]
@@ -0,0 +1,8 @@
+from pifoam.io.solverLog import solverLog, read_log
+from pifoam.io.foamFile import read_foamFile
+from pifoam.io.field import read_field, timeSeries
+from pifoam.io.polyMesh import polyMesh
+from pifoam.io.resultStore import resultStore, resultWatcher
+from pifoam.io.mapFields import fieldMapper
+from pifoam.io.postProcessing import postProcessingTable, read_postProcessing
+from pifoam.io.derivedFields import derivedFields, gaussGradient
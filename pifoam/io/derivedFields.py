@@ -0,0 +1,319 @@
+import concurrent.futures
+import numpy as np
+from pifoam.io.field import field_values, timeSeries
+from pifoam.io.foamFile import read_foamFile
+from pifoam.io.polyMesh import polyMesh
+
+_small = 1e-300
+
+
+class gaussGradient:
+    """Sparse Gauss gradient operator of a mesh, built once and applied to many fields.
+
+    grad(phi)_c = sum_f S_f phi_f / V_c, with linear interpolation phi_f = w phi_owner + (1 - w) phi_neighbour
+    on internal faces and the boundary values on boundary faces; faces of empty patches are left out,
+    as in OpenFOAM. The operator is stored as two CSR matrices acting on the cell values and on the
+    boundary face values, with rows `direction*n_cells + cell`. scipy.sparse is used when scipy is
+    installed, a NumPy product otherwise.
+
+    Attributes:
+        mesh (polyMesh): The mesh.
+        weights (np.ndarray): (n_internal_faces,) interpolation weights of the owner cells.
+    """
+    def __init__(self, mesh:polyMesh)->None:
+        self.mesh = mesh
+        n_cells, nif = mesh.n_cells, mesh.n_internal_faces
+        own, nei = mesh.owner[:nif], mesh.neighbour
+        sf, fc, cc = mesh.face_areas, mesh.face_centres, mesh.cell_centres
+        d_own = np.abs(np.einsum("ij,ij->i", sf[:nif], fc[:nif] - cc[own]))
+        d_nei = np.abs(np.einsum("ij,ij->i", sf[:nif], cc[nei] - fc[:nif]))
+        self.weights = d_nei/np.maximum(d_own + d_nei, _small)
+        inv_volume = 1.0/np.maximum(mesh.cell_volumes, _small)
+
+        rows, cols, data = [], [], []
+        w = self.weights
+        for k in range(3):
+            s = sf[:nif, k]
+            rows += [k*n_cells + own, k*n_cells + own, k*n_cells + nei, k*n_cells + nei]
+            cols += [own, nei, own, nei]
+            data += [w*s*inv_volume[own], (1 - w)*s*inv_volume[own], -w*s*inv_volume[nei], -(1 - w)*s*inv_volume[nei]]
+        self.internal = self.sparse(np.concatenate(rows), np.concatenate(cols), np.concatenate(data), (3*n_cells, n_cells))
+
+        b_own = mesh.owner[nif:]
+        included = np.ones(mesh.n_faces - nif, dtype=bool)
+        for patch in mesh.boundary.values():
+            if patch.get("type") == "empty":
+                included[patch["startFace"] - nif:patch["startFace"] - nif + patch["nFaces"]] = False
+        faces = np.flatnonzero(included)
+        rows = np.concatenate([k*n_cells + b_own[faces] for k in range(3)])
+        cols = np.tile(faces, 3)
+        data = np.concatenate([sf[nif + faces, k]*inv_volume[b_own[faces]] for k in range(3)])
+        self.boundary = self.sparse(rows, cols, data, (3*n_cells, mesh.n_faces - nif))
+
+    @staticmethod
+    def sparse(rows:np.ndarray, cols:np.ndarray, data:np.ndarray, shape:tuple[int, int])->any:
+        try:
+            from scipy.sparse import csr_matrix
+            return csr_matrix((data, (rows, cols)), shape=shape)
+        except ImportError:
+            return csrOperator(rows, cols, data, shape)
+
+    def __call__(self, cell_values:np.ndarray, boundary_values:np.ndarray)->np.ndarray:
+        """Apply the operator to a batch of scalar components.
+
+        Args:
+            cell_values (np.ndarray): (n_cells, m) cell values.
+            boundary_values (np.ndarray): (n_boundary_faces, m) boundary face values.
+        Returns:
+            np.ndarray: (3, n_cells, m) gradient, direction first.
+        """
+        grad = self.internal @ cell_values + self.boundary @ boundary_values
+        return np.asarray(grad).reshape(3, self.mesh.n_cells, -1)
+
+
+class csrOperator:
+    """Minimal CSR matrix for products with dense 2D arrays, used without scipy."""
+    def __init__(self, rows:np.ndarray, cols:np.ndarray, data:np.ndarray, shape:tuple[int, int])->None:
+        order = np.argsort(rows, kind="stable")
+        self.rows, self.cols, self.data = rows[order], cols[order], data[order]
+        self.shape = shape
+
+    def __matmul__(self, x:np.ndarray)->np.ndarray:
+        x = x.reshape(self.shape[1], -1)
+        return np.stack([np.bincount(self.rows, weights=self.data*x[self.cols, j], minlength=self.shape[0]) for j in range(x.shape[1])], axis=1)
+
+
+def read_viscosity(case_dir:str)->float:
+    """Kinematic viscosity `nu` of constant/transportProperties, with or without dimensions."""
+    nu = read_foamFile(f"{case_dir}/constant/transportProperties")["nu"]
+    return float(nu[-1] if isinstance(nu, (tuple, list)) else nu)
+
+
+def _init_worker(case_dir:str, nu:float, rho:float)->None:
+    global _worker_engine
+    _worker_engine = derivedFields(case_dir, nu, rho)
+
+
+def _run_worker(method:str, names:list[str], kwargs:dict)->any:
+    return getattr(_worker_engine, method)(names, **kwargs)
+
+
+class derivedFields:
+    """Derived quantities of the fields of a case, evaluated in batches of time directories.
+
+    The mesh and the gradient operator are built once; each batch stacks the fields of several time steps
+    so that the operator is applied to all of them at once.
+
+        engine = derivedFields(case.case_dir)
+        q = engine.evaluate("Q", batch_size=16, workers=4)                       # (n_times, n_cells)
+        coeffs = engine.evaluate("force_coeffs", patches=["cylinder"], magUInf=1.0, lRef=1.0, Aref=0.1)
+
+    Attributes:
+        case_dir (str): Directory of the case.
+        mesh (polyMesh): The mesh of the case.
+        series (timeSeries): Time directories of the case.
+        gradient (gaussGradient): The gradient operator.
+        nu (float): Kinematic viscosity.
+        rho (float): Reference density, as rhoInf of the forces function object.
+    """
+    def __init__(self, case_dir:str, nu:float = None, rho:float = 1.0)->None:
+        self.case_dir = case_dir
+        self.mesh = polyMesh(case_dir)
+        self.series = timeSeries(case_dir)
+        self.gradient = gaussGradient(self.mesh)
+        self.nu = read_viscosity(case_dir) if nu is None else nu
+        self.rho = rho
+        nif = self.mesh.n_internal_faces
+        self.boundary_owner = self.mesh.owner[nif:]
+        self.boundary_normals = self.mesh.face_areas[nif:]/np.maximum(self.mesh.face_area_magnitudes[nif:, None], _small)
+
+    def time_names(self, times:list[float] = None)->list[str]:
+        """Names of the time directories closest to `times`. Defaults to every time directory."""
+        self.series.refresh()
+        if times is None:
+            return list(self.series.names)
+        return [self.series.names[int(np.argmin(np.abs(self.series.times - t)))] for t in times]
+
+    def boundary_values(self, field:dict, cell_values:np.ndarray)->np.ndarray:
+        """Values of a field on every boundary face.
+
+        Patches with a "value" entry use it, noSlip is zero, symmetry planes mirror the owner value and
+        other patches (zeroGradient, empty, ...) take the owner value.
+
+        Args:
+            field (dict): The field file, as read by read_field.
+            cell_values (np.ndarray): (n_cells,) or (n_cells, n_comp) internal values.
+        Returns:
+            np.ndarray: (n_boundary_faces,) or (n_boundary_faces, n_comp) values.
+        """
+        nif = self.mesh.n_internal_faces
+        values = cell_values[self.boundary_owner].copy()
+        n_comp = 1 if values.ndim == 1 else values.shape[1]
+        for name, entry in field.get("boundaryField", {}).items():
+            if name not in self.mesh.boundary or not isinstance(entry, dict):
+                continue
+            patch = self.mesh.boundary[name]
+            faces = slice(patch["startFace"] - nif, patch["startFace"] - nif + patch["nFaces"])
+            kind = entry.get("type")
+            if "value" in entry and kind != "empty":
+                values[faces] = field_values(entry["value"], patch["nFaces"], n_comp)
+            elif kind == "noSlip":
+                values[faces] = 0.0
+            elif kind in ("symmetry", "symmetryPlane") and n_comp == 3:
+                n = self.boundary_normals[faces]
+                values[faces] -= np.einsum("ij,ij->i", values[faces], n)[:, None]*n
+        return values
+
+    def read(self, name:str, names:list[str])->tuple[np.ndarray, np.ndarray]:
+        """Stack a field over time directories.
+
+        Args:
+            name (str): Name of the field.
+            names (list[str]): Names of the time directories.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (n_times, n_cells[, n_comp]) cell values and (n_times, n_boundary_faces[, n_comp]) boundary values.
+        """
+        cells, boundaries = [], []
+        for time_name in names:
+            field = read_foamFile(f"{self.case_dir}/{time_name}/{name}")
+            internal = np.asarray(field["internalField"], dtype=np.float64)
+            n_comp = 1 if field["FoamFile"]["class"].endswith("ScalarField") else 3
+            internal = np.array(field_values(internal, self.mesh.n_cells, n_comp), dtype=np.float64)
+            cells.append(internal)
+            boundaries.append(self.boundary_values(field, internal))
+        return np.stack(cells), np.stack(boundaries)
+
+    def grad(self, names:list[str], field:str = "U")->np.ndarray:
+        """Gradient of a field.
+
+        Args:
+            names (list[str]): Names of the time directories.
+            field (str, optional): Name of the field. Defaults to "U".
+        Returns:
+            np.ndarray: (n_times, n_cells, 3) for a scalar, (n_times, n_cells, 3, 3) for a vector with
+                [..., i, j] = d(field_j)/dx_i as in OpenFOAM.
+        """
+        cells, boundaries = self.read(field, names)
+        n_times = len(names)
+        # Cells first, with the times and components of the batch as columns.
+        c = np.moveaxis(cells, 0, 1).reshape(self.mesh.n_cells, -1)
+        b = np.moveaxis(boundaries, 0, 1).reshape(len(self.boundary_owner), -1)
+        g = self.gradient(c, b).reshape((3, self.mesh.n_cells, n_times) + cells.shape[2:])
+        return np.moveaxis(g, (0, 1, 2), (2, 1, 0))
+
+    def vorticity(self, names:list[str])->np.ndarray:
+        """np.ndarray: (n_times, n_cells, 3) curl of U."""
+        g = self.grad(names, "U")
+        return np.stack([g[..., 1, 2] - g[..., 2, 1], g[..., 2, 0] - g[..., 0, 2], g[..., 0, 1] - g[..., 1, 0]], axis=-1)
+
+    def Q(self, names:list[str])->np.ndarray:
+        """np.ndarray: (n_times, n_cells) Q-criterion, 0.5*(|Omega|^2 - |S|^2) of the velocity gradient."""
+        g = self.grad(names, "U")
+        gt = np.swapaxes(g, -1, -2)
+        omega, strain = 0.5*(g - gt), 0.5*(g + gt)
+        return 0.5*(np.einsum("...ij,...ij->...", omega, omega) - np.einsum("...ij,...ij->...", strain, strain))
+
+    def wall_shear_stress(self, names:list[str], patch:str, U:tuple[np.ndarray, np.ndarray] = None)->np.ndarray:
+        """Kinematic wall shear stress on a patch, as the wallShearStress function object, i.e. the stress
+        (-n) & devReff the wall exerts on the fluid. The viscous force of the fluid on the wall is its opposite.
+
+        Args:
+            names (list[str]): Names of the time directories.
+            patch (str): Name of the wall patch.
+            U (tuple[np.ndarray, np.ndarray], optional): Cell and boundary values of U at these times, as
+                returned by `read`. Defaults to reading them.
+        Returns:
+            np.ndarray: (n_times, n_patch_faces, 3) tangential part of nu*snGrad(U), with the normal
+                pointing out of the domain.
+        """
+        cells, boundaries = self.read("U", names) if U is None else U
+        nif = self.mesh.n_internal_faces
+        p = self.mesh.boundary[patch]
+        faces = slice(p["startFace"] - nif, p["startFace"] - nif + p["nFaces"])
+        owner = self.boundary_owner[faces]
+        n = self.boundary_normals[faces]
+        delta = np.einsum("ij,ij->i", self.mesh.face_centres[nif:][faces] - self.mesh.cell_centres[owner], n)
+        sn_grad = (boundaries[:, faces] - cells[:, owner])/np.maximum(delta, _small)[None, :, None]
+        tangential = sn_grad - np.einsum("tij,ij->ti", sn_grad, n)[..., None]*n
+        return self.nu*tangential
+
+    def forces(self, names:list[str], patches:list[str], CofR:tuple[float, float, float] = (0, 0, 0))->dict[str, np.ndarray]:
+        """Pressure and viscous forces and moments on patches, as the forces function object with rho rhoInf.
+
+        Args:
+            names (list[str]): Names of the time directories.
+            patches (list[str]): Names of the patches.
+            CofR (tuple[float, float, float], optional): Centre of rotation of the moments. Defaults to (0, 0, 0).
+        Returns:
+            dict[str, np.ndarray]: "time" and "force", "force_pressure", "force_viscous", "moment",
+                "moment_pressure", "moment_viscous" (n_times, 3).
+        """
+        _, p_boundary = self.read("p", names)
+        U = self.read("U", names)
+        nif = self.mesh.n_internal_faces
+        result = {key: np.zeros((len(names), 3)) for key in ("force_pressure", "force_viscous", "moment_pressure", "moment_viscous")}
+        for patch in patches:
+            b = self.mesh.boundary[patch]
+            faces = slice(b["startFace"], b["startFace"] + b["nFaces"])
+            sf = self.mesh.face_areas[faces]
+            arm = self.mesh.face_centres[faces] - np.asarray(CofR, dtype=np.float64)
+            pressure = self.rho*p_boundary[:, faces.start - nif:faces.stop - nif, None]*sf
+            viscous = -self.rho*self.wall_shear_stress(names, patch, U)*self.mesh.face_area_magnitudes[faces][None, :, None]
+            result["force_pressure"] += pressure.sum(axis=1)
+            result["force_viscous"] += viscous.sum(axis=1)
+            result["moment_pressure"] += np.cross(arm, pressure).sum(axis=1)
+            result["moment_viscous"] += np.cross(arm, viscous).sum(axis=1)
+        result["force"] = result["force_pressure"] + result["force_viscous"]
+        result["moment"] = result["moment_pressure"] + result["moment_viscous"]
+        result["time"] = np.array([float(n) for n in names])
+        return result
+
+    def force_coeffs(self,
+                    names:list[str],
+                    patches:list[str],
+                    magUInf:float,
+                    lRef:float,
+                    Aref:float,
+                    liftDir:tuple[float, float, float] = (0, 1, 0),
+                    dragDir:tuple[float, float, float] = (1, 0, 0),
+                    pitchAxis:tuple[float, float, float] = (0, 0, 1),
+                    CofR:tuple[float, float, float] = (0, 0, 0),
+                    )->dict[str, np.ndarray]:
+        """Drag, lift and pitch moment coefficients, as the forceCoeffs function object.
+
+        Returns:
+            dict[str, np.ndarray]: "time", "Cd", "Cl" and "Cm" (n_times,).
+        """
+        f = self.forces(names, patches, CofR)
+        q = 0.5*self.rho*magUInf**2*Aref
+        return {"time": f["time"], "Cd": f["force"] @ np.asarray(dragDir, dtype=np.float64)/q,
+                "Cl": f["force"] @ np.asarray(liftDir, dtype=np.float64)/q,
+                "Cm": f["moment"] @ np.asarray(pitchAxis, dtype=np.float64)/(q*lRef)}
+
+    def evaluate(self, quantity:str, times:list[float] = None, batch_size:int = 16, workers:int = 1, pool:str = "thread", **kwargs)->np.ndarray|dict[str, np.ndarray]:
+        """Evaluate a derived quantity over many time directories.
+
+        Args:
+            quantity (str): "grad", "vorticity", "Q", "wall_shear_stress", "forces" or "force_coeffs".
+            times (list[float], optional): Times to evaluate. Defaults to every time directory.
+            batch_size (int, optional): Number of time directories stacked in one batch. Defaults to 16.
+            workers (int, optional): Number of batches evaluated concurrently. Defaults to 1.
+            pool (str, optional): "thread", or "process" to build the engine once in each worker process. Defaults to "thread".
+            **kwargs: Arguments of the quantity, e.g. patch="cylinder".
+        Returns:
+            np.ndarray|dict[str, np.ndarray]: The quantity with the times along the first axis.
+        """
+        assert quantity in ("grad", "vorticity", "Q", "wall_shear_stress", "forces", "force_coeffs"), f"Unknown quantity '{quantity}'."
+        names = self.time_names(times)
+        batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+        if workers <= 1 or len(batches) <= 1:
+            results = [getattr(self, quantity)(batch, **kwargs) for batch in batches]
+        elif pool == "process":
+            with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.case_dir, self.nu, self.rho)) as executor:
+                results = list(executor.map(_run_worker, [quantity]*len(batches), batches, [kwargs]*len(batches)))
+        else:
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                results = list(executor.map(lambda batch: getattr(self, quantity)(batch, **kwargs), batches))
+        if results and isinstance(results[0], dict):
+            return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+        return np.concatenate(results) if results else np.empty(0)
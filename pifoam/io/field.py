@@ -0,0 +1,227 @@
+import os
+import re
+import numpy as np
+from pifoam import utils
+from pifoam.io.foamFile import read_foamFile
+
+_time_name_re = re.compile(r"^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$")
+
+
+def read_field(path:str)->dict:
+    """Read a volScalarField/volVectorField (or any other geometric field) file.
+
+    Binary fields are returned as read-only views of the memory-mapped file, ascii fields are parsed in bulk
+    and compressed fields (`path`.gz) are decompressed.
+
+    Args:
+        path (str): Path to the field file, e.g. "case/0.5/U".
+    Returns:
+        dict: The entries of the file. "internalField" and the "value" entries of "boundaryField" are NumPy arrays:
+            (n,) or (n, n_components) for nonuniform values, () or (n_components,) for uniform values.
+    """
+    return read_foamFile(path)
+
+
+def field_components(field_class:str)->int:
+    """Number of components of a field class, e.g. 3 for "volVectorField".
+    """
+    for name, n_comp in (("SymmTensor", 6), ("SphericalTensor", 1), ("Tensor", 9), ("Vector", 3), ("Scalar", 1)):
+        if name in field_class:
+            return n_comp
+    raise ValueError(f"Unknown field class '{field_class}'.")
+
+
+def field_values(value:np.ndarray, n:int, n_comp:int)->np.ndarray:
+    """Expand a uniform value to `n` elements. Nonuniform values are returned as is.
+
+    Args:
+        value (np.ndarray): Value of an internalField or patch.
+        n (int): The number of cells or faces.
+        n_comp (int): The number of components of the field.
+    Returns:
+        np.ndarray: (n,) or (n, n_comp) array.
+    """
+    value = np.asarray(value)
+    if value.ndim == (0 if n_comp == 1 else 1):
+        return np.broadcast_to(value, (n,) + value.shape)
+    return value
+
+
+def format_values(values:np.ndarray, binary:bool = False, precision:int = 6, chunk:int = 1 << 16)->bytes:
+    """Format a nonuniform list of values in bulk.
+
+    Args:
+        values (np.ndarray): (n,) scalars or (n, n_components) values.
+        binary (bool, optional): Whether to write the raw bytes of the values. Defaults to False.
+        precision (int, optional): Significant digits of ascii values. Defaults to 6.
+        chunk (int, optional): Number of values formatted at once in ascii. Defaults to 65536.
+    Returns:
+        bytes: "nonuniform List<T> n(...)" without the terminating semicolon.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_comp = 1 if values.ndim == 1 else values.shape[1]
+    element = {1:"scalar", 3:"vector", 6:"symmTensor", 9:"tensor"}[n_comp]
+    head = f"nonuniform List<{element}> {len(values)}\n(".encode()
+    if binary:
+        return head + np.ascontiguousarray(values, dtype="<f8").tobytes() + b")"
+    item = " ".join([f"%.{precision}g"]*n_comp)
+    item = (item if n_comp == 1 else f"({item})") + "\n"
+    flat = values.reshape(len(values), n_comp)
+    parts = [head, b"\n"]
+    for start in range(0, len(flat), chunk):
+        block = flat[start:start + chunk]
+        parts.append(((item*len(block)) % tuple(block.ravel().tolist())).encode())
+    parts.append(b")")
+    return b"".join(parts)
+
+
+def render_field(location:str,
+                name:str,
+                field_class:str,
+                dimensions:str,
+                internalField:any,
+                boundaryField:dict,
+                write_format:str = "ascii",
+                precision:int = 6,
+                )->bytes:
+    """Serialize a volScalarField/volVectorField file.
+
+    Args:
+        location (str): Time directory of the field, e.g. "0".
+        name (str): Name of the field, e.g. "U".
+        field_class (str): Class of the field, e.g. "volVectorField".
+        dimensions (str): Dimensions of the field, e.g. "[0 1 -1 0 0 0 0]".
+        internalField (any): A scalar or tuple for a uniform field, or an array with one value per cell.
+        boundaryField (dict): The boundary conditions of each patch.
+        write_format (str, optional): "ascii" or "binary". Defaults to "ascii".
+        precision (int, optional): Significant digits of ascii values. Defaults to 6.
+    Returns:
+        bytes: The content of the field file.
+    """
+    binary = write_format == "binary"
+    header = {"version": 2.0, "format": write_format, "class": field_class, "location": location, "object": name}
+    if binary:
+        header["arch"] = '"LSB;label=32;scalar=64"'
+    if isinstance(internalField, np.ndarray) and internalField.ndim > 0 and not (field_class.endswith("VectorField") and internalField.shape == (3,)):
+        value = format_values(internalField, binary, precision)
+    elif isinstance(internalField, np.ndarray) and internalField.ndim == 0:
+        # e.g. a function of the cell centres returning a constant.
+        value = f"uniform {internalField.item()}".encode()
+    elif isinstance(internalField, (tuple, list, np.ndarray)):
+        value = f"uniform {utils.tupleToDict(internalField)}".encode()
+    else:
+        value = f"uniform {internalField}".encode()
+    return b"".join([
+        utils.format_dict(header, "FoamFile").encode(),
+        f"dimensions\t{dimensions};\n".encode(),
+        b"internalField\t", value, b";\n",
+        utils.format_dict(boundaryField, "boundaryField").encode(),
+    ])
+
+
+def write_field(path:str,
+                field_class:str,
+                dimensions:str,
+                internalField:any,
+                boundaryField:dict,
+                write_format:str = "ascii",
+                precision:int = 6,
+                )->None:
+    """Write a volScalarField/volVectorField file.
+
+    Args:
+        path (str): Path of the file, e.g. "case/0/U".
+        field_class (str): Class of the field, e.g. "volVectorField".
+        dimensions (str): Dimensions of the field, e.g. "[0 1 -1 0 0 0 0]".
+        internalField (any): A scalar or tuple for a uniform field, or an array with one value per cell.
+        boundaryField (dict): The boundary conditions of each patch.
+        write_format (str, optional): "ascii" or "binary". Defaults to "ascii".
+        precision (int, optional): Significant digits of ascii values. Defaults to 6.
+    """
+    location, name = os.path.split(os.path.normpath(path))
+    with open(path, "wb") as file:
+        file.write(render_field(os.path.basename(location), name, field_class, dimensions, internalField, boundaryField, write_format, precision))
+
+
+class timeDirectory:
+    """Fields of one time directory, read lazily on first access.
+
+    Attributes:
+        path (str): Path to the time directory.
+        time (float): The time value.
+        name (str): Name of the directory.
+    """
+    def __init__(self, path:str)->None:
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.time = float(self.name)
+        self.cache = {}
+
+    @property
+    def fields(self)->list[str]:
+        """list[str]: Names of the fields in the directory."""
+        names = []
+        for f in sorted(os.listdir(self.path)):
+            if os.path.isfile(f"{self.path}/{f}"):
+                names.append(f[:-3] if f.endswith(".gz") else f)
+        return names
+
+    def __contains__(self, name:str)->bool:
+        return os.path.isfile(f"{self.path}/{name}") or os.path.isfile(f"{self.path}/{name}.gz")
+
+    def __getitem__(self, name:str)->dict:
+        if name not in self.cache:
+            if name not in self:
+                raise KeyError(f"No field '{name}' in {self.path}.")
+            self.cache[name] = read_field(f"{self.path}/{name}")
+        return self.cache[name]
+
+    def internalField(self, name:str)->np.ndarray:
+        return self[name]["internalField"]
+
+    def release(self)->None:
+        """Drop the fields read so far."""
+        self.cache = {}
+
+    def __repr__(self)->str:
+        return f"timeDirectory({self.path!r})"
+
+
+class timeSeries:
+    """Time directories of a case. Nothing is read until a field of a time directory is accessed,
+    so scanning many time steps costs only a directory listing.
+
+    Attributes:
+        case_dir (str): Directory of the case.
+        names (list[str]): Names of the time directories ordered by time.
+        times (np.ndarray): Time values.
+    """
+    def __init__(self, case_dir:str, include_zero:bool = True)->None:
+        self.case_dir = case_dir
+        self.include_zero = include_zero
+        self.refresh()
+
+    def refresh(self)->None:
+        """Scan the case directory again for time directories."""
+        names = [d for d in os.listdir(self.case_dir) if _time_name_re.match(d) and os.path.isdir(f"{self.case_dir}/{d}")]
+        if not self.include_zero:
+            names = [d for d in names if float(d) != 0.0]
+        self.names = sorted(names, key=float)
+        self.times = np.array([float(d) for d in self.names])
+
+    def __len__(self)->int:
+        return len(self.names)
+
+    def __getitem__(self, index:int)->timeDirectory:
+        return timeDirectory(f"{self.case_dir}/{self.names[index]}")
+
+    def __iter__(self):
+        for name in self.names:
+            yield timeDirectory(f"{self.case_dir}/{name}")
+
+    def at(self, time:float)->timeDirectory:
+        """Time directory closest to `time`."""
+        return self[int(np.argmin(np.abs(self.times - time)))]
+
+    def latest(self)->timeDirectory:
+        return self[-1]
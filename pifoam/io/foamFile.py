@@ -0,0 +1,309 @@
+import gzip
+import mmap
+import os
+import re
+import numpy as np
+
+_skip_re = re.compile(rb"(?:\s+|//[^\n]*|/\*.*?\*/)*", re.DOTALL)
+_token_re = re.compile(rb"[{}();\[\]]|\"[^\"]*\"|[^\s{}();\[\]\"]+")
+_list_re = re.compile(rb"^List<(\w+)>$")
+_number_re = re.compile(rb"^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$")
+_vector_end_re = re.compile(rb"\)\s*\)")
+_parentheses = bytes.maketrans(b"()", b"  ")
+_class_elements = {"labelList":"label", "scalarField":"scalar", "vectorField":"vector", "faceList":"face", "faceCompactList":"label"}
+
+n_components = {"label":1, "scalar":1, "vector":3, "symmTensor":6, "tensor":9, "sphericalTensor":1}
+"""dict[str, int]: Number of components of the OpenFOAM primitive types."""
+
+
+def open_foamFile(path:str)->bytes|mmap.mmap:
+    """Map an OpenFOAM file into memory.
+
+    Uncompressed files are memory-mapped, so binary lists are read without copies.
+    If `path` does not exist, `path`.gz is read and decompressed instead.
+
+    Args:
+        path (str): Path to the file.
+    Returns:
+        bytes|mmap.mmap: The content of the file.
+    """
+    if not os.path.isfile(path) and os.path.isfile(f"{path}.gz"):
+        path = f"{path}.gz"
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as file:
+            return file.read()
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class foamParser:
+    """Recursive-descent parser for OpenFOAM dictionaries.
+
+    Dictionaries become `dict`, numbers become `int`/`float` and small lists become `tuple`.
+    `List<T>` lists are read in bulk into NumPy arrays: ascii lists with a single `np.fromstring`,
+    binary lists as zero-copy views of the buffer.
+
+    Attributes:
+        buf (bytes|mmap.mmap): The content being parsed.
+        pos (int): Current position in `buf`.
+        binary (bool): Whether the file is written in binary format.
+        label_dtype (np.dtype): Data type of binary labels.
+        scalar_dtype (np.dtype): Data type of binary scalars.
+        element (str): Element type of bare lists, derived from the class of the file.
+    """
+    def __init__(self, buf:bytes|mmap.mmap)->None:
+        self.buf = buf
+        self.pos = 0
+        self.binary = False
+        self.label_dtype = np.dtype("<i4")
+        self.scalar_dtype = np.dtype("<f8")
+        self.element = None
+
+    def set_header(self, header:dict)->None:
+        """Configure the parser from the FoamFile header.
+
+        Args:
+            header (dict): The parsed FoamFile dictionary.
+        """
+        self.binary = header.get("format") == "binary"
+        self.element = _class_elements.get(header.get("class"))
+        arch = str(header.get("arch", ""))
+        endian = ">" if "MSB" in arch else "<"
+        label = re.search(r"label=(\d+)", arch)
+        scalar = re.search(r"scalar=(\d+)", arch)
+        self.label_dtype = np.dtype(f"{endian}i{int(label.group(1))//8 if label else 4}")
+        self.scalar_dtype = np.dtype(f"{endian}f{int(scalar.group(1))//8 if scalar else 8}")
+
+    def skip(self)->None:
+        self.pos = _skip_re.match(self.buf, self.pos).end()
+
+    def peek(self)->bytes|None:
+        self.skip()
+        m = _token_re.match(self.buf, self.pos)
+        return None if m is None else m.group()
+
+    def next(self)->bytes|None:
+        self.skip()
+        m = _token_re.match(self.buf, self.pos)
+        if m is None:
+            return None
+        self.pos = m.end()
+        return m.group()
+
+    def expect(self, token:bytes)->None:
+        t = self.next()
+        if t != token:
+            raise ValueError(f"Expected '{token.decode()}' but found '{t.decode() if t else 'EOF'}' at byte {self.pos}.")
+
+    def parse_dict(self, top:bool = False)->dict:
+        """Parse dictionary entries until the closing brace (or the end of the file if `top`).
+        """
+        d = {}
+        while True:
+            t = self.peek()
+            if t is None:
+                if top:
+                    return d
+                raise ValueError("Unexpected end of file in dictionary.")
+            if t == b"}":
+                if top:
+                    raise ValueError(f"Unexpected '}}' at byte {self.pos}.")
+                self.next()
+                return d
+            if t == b";":
+                self.next()
+                continue
+            if top and d and _number_re.match(t):
+                # Bare lists after the header, e.g. in points or owner files.
+                d.setdefault(None, []).append(self.parse_list(self.element))
+                continue
+            key = self.next().decode().strip('"')
+            if key.startswith("#"):
+                # Directives such as #include or #inputMode are kept as strings.
+                end = self.buf.find(b"\n", self.pos)
+                end = len(self.buf) if end < 0 else end
+                d[key] = bytes(self.buf[self.pos:end]).decode().strip()
+                self.pos = end
+                continue
+            if self.peek() == b"{":
+                self.next()
+                d[key] = self.parse_dict()
+                if key == "FoamFile":
+                    self.set_header(d[key])
+            else:
+                d[key] = self.parse_entry()
+        return d
+
+    def parse_entry(self)->any:
+        """Parse the value of an entry up to the terminating semicolon."""
+        values = []
+        while self.peek() != b";":
+            if self.peek() is None:
+                raise ValueError("Unexpected end of file in entry.")
+            values.append(self.parse_value())
+        self.next()
+        if len(values) == 1:
+            return values[0]
+        if len(values) == 2 and values[0] in ("uniform", "nonuniform"):
+            return np.asarray(values[1]) if values[0] == "uniform" else values[1]
+        return tuple(values)
+
+    def parse_value(self)->any:
+        self.skip()
+        start = self.pos
+        t = self.next()
+        if t == b"(":
+            return self.parse_tuple()
+        if t == b"[":
+            dims = []
+            while self.peek() != b"]":
+                dims.append(self.parse_value())
+            self.next()
+            return tuple(dims)
+        if t == b"{":
+            return self.parse_dict()
+        m = _list_re.match(t)
+        if m is not None:
+            return self.parse_list(m.group(1).decode())
+        if _number_re.match(t):
+            if self.peek() in (b"(", b"{"):
+                # Counted list without a type, e.g. "3(0 1 2)".
+                self.pos = start
+                return self.parse_list(None)
+            return to_number(t)
+        return t.decode().strip('"')
+
+    def parse_tuple(self)->tuple:
+        values = []
+        while self.peek() != b")":
+            if self.peek() is None:
+                raise ValueError("Unexpected end of file in list.")
+            values.append(self.parse_value())
+        self.next()
+        return tuple(values)
+
+    def parse_list(self, element:str|None)->np.ndarray|tuple|dict:
+        """Parse a counted list `N(...)` or `N{value}` in bulk.
+
+        Args:
+            element (str|None): The element type, e.g. "vector". None for untyped lists, which are
+                read as labels or scalars when flat and as generic tuples otherwise.
+        Returns:
+            np.ndarray|tuple|dict: (N,) or (N, n_components) array, a tuple for non-numeric elements
+                or a dict for a list of named dictionaries.
+        """
+        n = int(self.next())
+        t = self.next()
+        if t == b"{":
+            value = self.parse_value()
+            self.expect(b"}")
+            return np.full((n,) + np.shape(value), value)
+        if t != b"(":
+            raise ValueError(f"Expected list of length {n} at byte {self.pos}.")
+
+        untyped = element is None
+        if element == "face":
+            return self.parse_faces(n)
+        if untyped:
+            # Decide from the first element: anything but plain numbers falls back to generic parsing.
+            if n == 0:
+                self.expect(b")")
+                return np.empty(0)
+            if self.binary:
+                element = "label"
+            else:
+                start = self.pos
+                first = self.next()
+                nested = self.peek() in (b"(", b"{")
+                self.pos = start
+                if nested or not _number_re.match(first):
+                    values = self.parse_tuple()
+                    if len(values) == 2*n and all(isinstance(v, dict) for v in values[1::2]):
+                        # Dictionary entries, e.g. the patches of a polyBoundaryMesh.
+                        return dict(zip(values[::2], values[1::2]))
+                    if len(values) != n:
+                        raise ValueError(f"Expected {n} elements but found {len(values)}.")
+                    return values
+                element = "scalar"
+        if element not in n_components:
+            values = self.parse_tuple()
+            if len(values) != n:
+                raise ValueError(f"Expected {n} elements but found {len(values)}.")
+            return values
+
+        n_comp = n_components[element]
+        dtype = self.label_dtype if element == "label" else self.scalar_dtype
+        shape = (n,) if n_comp == 1 else (n, n_comp)
+        if self.binary:
+            arr = np.frombuffer(self.buf, dtype=dtype, count=n*n_comp, offset=self.pos).reshape(shape)
+            self.pos += arr.nbytes
+            self.expect(b")")
+            return arr
+
+        if n == 0:
+            self.expect(b")")
+            return np.empty(shape, dtype=dtype)
+        if n_comp == 1:
+            end = self.buf.find(b")", self.pos)
+            close = end + 1
+        else:
+            m = _vector_end_re.search(self.buf, self.pos)
+            end, close = m.start() + 1, m.end()
+        text = self.buf[self.pos:end]
+        if n_comp > 1:
+            text = text.translate(_parentheses)
+        if untyped and not any(c in text for c in (b".", b"e", b"E", b"n", b"N")):
+            element = "label"
+        arr = np.fromstring(text, dtype=np.int64 if element == "label" else np.float64, sep=" ")
+        if arr.size != n*n_comp:
+            raise ValueError(f"Expected {n*n_comp} values in list but found {arr.size}.")
+        self.pos = close
+        return arr.reshape(shape)
+
+    def parse_faces(self, n:int)->tuple[np.ndarray, np.ndarray]:
+        """Parse the body of an ascii faceList, e.g. "4(0 1 2 3) 3(4 5 6))", in bulk.
+
+        Args:
+            n (int): The number of faces.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: CSR layout, offsets (n+1,) and the flat point labels.
+        """
+        if n == 0:
+            self.expect(b")")
+            return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+        m = _vector_end_re.search(self.buf, self.pos)
+        text = self.buf[self.pos:m.start() + 1]
+        self.pos = m.end()
+        # Each face becomes "size labels... -1", so the -1 markers delimit the faces.
+        flat = np.fromstring(text.replace(b"(", b" ").replace(b")", b" -1 "), dtype=np.int64, sep=" ")
+        ends = np.flatnonzero(flat == -1)
+        if len(ends) != n:
+            raise ValueError(f"Expected {n} faces but found {len(ends)}.")
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        keep = np.ones(len(flat), dtype=bool)
+        keep[starts] = False
+        keep[ends] = False
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(flat[starts], out=offsets[1:])
+        return offsets, flat[keep]
+
+
+def to_number(t:bytes)->int|float:
+    try:
+        return int(t)
+    except ValueError:
+        return float(t)
+
+
+def read_foamFile(path:str)->dict:
+    """Read an OpenFOAM file.
+
+    Args:
+        path (str): Path to the file. Compressed files (`path`.gz) are found automatically.
+    Returns:
+        dict: The entries of the file. Bare lists following the header (e.g. in constant/polyMesh files)
+            are stored in a list under the key None.
+    """
+    return foamParser(open_foamFile(path)).parse_dict(top=True)
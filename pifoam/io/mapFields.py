@@ -0,0 +1,184 @@
+import numpy as np
+from pifoam.io.field import field_values, timeSeries
+from pifoam.io.polyMesh import polyMesh
+
+
+class pointIndex:
+    """Spatial index answering k-nearest neighbour queries on a set of points.
+
+    scipy's cKDTree is used when scipy is installed. Otherwise the points are binned on a uniform grid
+    holding a few points per bin, and each query only measures the points of the surrounding bins.
+    Queries whose k-th neighbour may lie outside the searched bins (e.g. points outside the source domain)
+    are searched again in a larger block, so the result is exact in both cases.
+
+    Attributes:
+        points (np.ndarray): (n, 3) indexed points.
+    """
+    def __init__(self, points:np.ndarray, points_per_bin:float = 2.0)->None:
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        try:
+            from scipy.spatial import cKDTree
+            self.tree = cKDTree(self.points)
+        except ImportError:
+            self.tree = None
+            self.build_grid(points_per_bin)
+
+    def build_grid(self, points_per_bin:float)->None:
+        n = max(len(self.points), 1)
+        self.lo = self.points.min(axis=0) if len(self.points) else np.zeros(3)
+        extent = (self.points.max(axis=0) if len(self.points) else np.ones(3)) - self.lo
+        # Bin width from the point density over the non-degenerate directions (2D meshes are one cell thick).
+        dims = extent > 0
+        h = 1.0
+        while dims.any():
+            h = (np.prod(extent[dims])*points_per_bin/n)**(1.0/dims.sum())
+            flat = dims & (extent < h)
+            if not flat.any():
+                break
+            dims &= ~flat
+        self.h = h
+        self.shape = np.maximum(np.ceil(extent/self.h).astype(np.int64), 1)
+        bins = self.bin_ids(np.clip(self.cell(self.points), 0, self.shape - 1))
+        self.order = np.argsort(bins, kind="stable")
+        self.bin_offsets = np.zeros(np.prod(self.shape) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(bins, minlength=np.prod(self.shape)), out=self.bin_offsets[1:])
+
+    def cell(self, x:np.ndarray)->np.ndarray:
+        return np.floor((x - self.lo)/self.h).astype(np.int64)
+
+    def bin_ids(self, ijk:np.ndarray)->np.ndarray:
+        return (ijk[..., 0]*self.shape[1] + ijk[..., 1])*self.shape[2] + ijk[..., 2]
+
+    def query(self, x:np.ndarray, k:int = 1, chunk:int = 4096)->tuple[np.ndarray, np.ndarray]:
+        """Find the nearest points.
+
+        Args:
+            x (np.ndarray): (m, 3) query points.
+            k (int, optional): Number of neighbours. Defaults to 1.
+            chunk (int, optional): Number of points queried at once without scipy. Defaults to 4096.
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (m, k) distances and (m, k) indices of the neighbours, nearest first.
+        """
+        x = np.asarray(x, dtype=np.float64).reshape(-1, 3)
+        k = min(k, len(self.points))
+        if self.tree is not None:
+            dist, idx = self.tree.query(x, k)
+            return dist.reshape(len(x), k), idx.reshape(len(x), k)
+        dist = np.empty((len(x), k))
+        idx = np.empty((len(x), k), dtype=np.int64)
+        remaining = np.arange(len(x))
+        radius = 1
+        while len(remaining):
+            # Blocks of (2*radius + 1)**3 bins are searched, so fewer points are queried at once as they grow.
+            step = max(1, chunk*27//min((2*radius + 1)**3, int(np.prod(self.shape))))
+            exact = np.zeros(len(remaining), dtype=bool)
+            for start in range(0, len(remaining), step):
+                rows = remaining[start:start + step]
+                dist[rows], idx[rows], exact[start:start + step] = self.query_grid(x[rows], k, radius)
+            remaining = remaining[~exact]
+            radius *= 2
+        return dist, idx
+
+    def query_grid(self, x:np.ndarray, k:int, radius:int)->tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Search the block of bins within `radius` of the bin of each point (clipped to the grid).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Distances, indices, and whether the result is exact,
+                i.e. no point outside the block is closer than the k-th neighbour found.
+        """
+        m = len(x)
+        centre = np.clip(self.cell(x), 0, self.shape - 1)
+        ranges = [np.arange(-min(radius, n - 1), min(radius, n - 1) + 1) for n in self.shape]
+        offsets = np.stack(np.meshgrid(*ranges, indexing="ij"), axis=-1).reshape(-1, 3)
+        nb = centre[:, None, :] + offsets[None]
+        valid = np.all((nb >= 0) & (nb < self.shape), axis=2)
+        bins = np.where(valid, self.bin_ids(np.clip(nb, 0, self.shape - 1)), 0)
+        starts = self.bin_offsets[bins]
+        row_counts = np.where(valid, self.bin_offsets[bins + 1] - starts, 0)
+
+        # Gather the candidates of each query into a padded (m, max_candidates) matrix.
+        counts, starts = row_counts.ravel(), starts.ravel()
+        width = max(int(row_counts.sum(axis=1).max(initial=0)), k)
+        column_starts = (np.cumsum(row_counts, axis=1) - row_counts).ravel()
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(np.arange(m*len(offsets))//len(offsets), counts)
+        candidates = np.full((m, width), -1, dtype=np.int64)
+        candidates[rows, np.repeat(column_starts, counts) + within] = self.order[np.repeat(starts, counts) + within]
+
+        d2 = np.sum((self.points[candidates] - x[:, None, :])**2, axis=2)
+        d2[candidates < 0] = np.inf
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k] if k < width else np.broadcast_to(np.arange(width), (m, width))
+        d2_k = np.take_along_axis(d2, nearest, axis=1)
+        order = np.argsort(d2_k, axis=1)
+        nearest, d2_k = np.take_along_axis(nearest, order, axis=1), np.take_along_axis(d2_k, order, axis=1)
+        dist = np.sqrt(d2_k)
+
+        # Points outside the block are at least as far as the nearest block face inside the grid.
+        lower, upper = np.maximum(centre - radius, 0), np.minimum(centre + radius, self.shape - 1)
+        to_lower = np.where(lower > 0, x - (self.lo + lower*self.h), np.inf)
+        to_upper = np.where(upper < self.shape - 1, self.lo + (upper + 1)*self.h - x, np.inf)
+        clearance = np.minimum(to_lower, to_upper).min(axis=1)
+        return dist, np.take_along_axis(candidates, nearest, axis=1), dist[:, -1] <= clearance
+
+
+class fieldMapper:
+    """Interpolate the fields of a finished case onto the cells of another mesh, without mapFields.
+
+    Values at the target cell centres are the inverse-distance weighted average of the `k` nearest
+    source cells (`k` = 1 is nearest-neighbour mapping). Only the internalField is mapped: the boundary
+    conditions of the target case, including its patch values, are kept as they are.
+
+    Attributes:
+        source_dir (str): Directory of the source case.
+        time (float): Time of the mapped fields.
+        k (int): Number of source cells averaged per target cell.
+        power (float): Exponent of the inverse-distance weights.
+    """
+    def __init__(self, source_dir:str, time:float = None, k:int = 4, power:float = 2.0)->None:
+        self.source_dir = source_dir
+        series = timeSeries(source_dir)
+        if len(series) == 0:
+            raise FileNotFoundError(f"No time directory in {source_dir}.")
+        self.directory = series.latest() if time is None else series.at(time)
+        self.time = self.directory.time
+        self.k = k
+        self.power = power
+        self.index = pointIndex(polyMesh(source_dir).cell_centres)
+        self.weights = None
+
+    def __contains__(self, name:str)->bool:
+        return name in self.directory
+
+    def interpolation(self, points:np.ndarray)->tuple[np.ndarray, np.ndarray]:
+        """(m, k) source cells and normalized weights of the target points, reused for the same points."""
+        if self.weights is not None and np.array_equal(self.weights[0], points):
+            return self.weights[1:]
+        dist, idx = self.index.query(points, self.k)
+        exact = dist[:, :1] == 0.0
+        w = np.where(exact, dist == 0.0, 1.0/np.maximum(dist, 1e-300)**self.power)
+        w /= w.sum(axis=1, keepdims=True)
+        self.weights = (np.array(points), idx, w)
+        return idx, w
+
+    def values(self, name:str, points:np.ndarray)->np.ndarray:
+        """Interpolate a field.
+
+        Args:
+            name (str): Name of the field, e.g. "U".
+            points (np.ndarray): (m, 3) target points, usually cell centres.
+        Returns:
+            np.ndarray: (m,) or (m, n_components) values.
+        """
+        field = self.directory[name]
+        value = np.asarray(field["internalField"])
+        n_cells = len(self.index.points)
+        n_comp = 1 if "Scalar" in str(field.get("FoamFile", {}).get("class", "")) else value.shape[-1]
+        source = field_values(value, n_cells, n_comp)
+        idx, w = self.interpolation(points)
+        if source.ndim == 1:
+            return np.sum(source[idx]*w, axis=1)
+        return np.einsum("mk,mkc->mc", w, source[idx])
+
+    def initial_value(self, name:str)->callable:
+        """Initial value for `coreFoam.phys_values_init`: a function of the target cell centres."""
+        return lambda cell_centres: self.values(name, cell_centres)
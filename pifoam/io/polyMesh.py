@@ -0,0 +1,221 @@
+import re
+from functools import cached_property
+import numpy as np
+from pifoam.io.foamFile import open_foamFile, read_foamFile
+
+_small = 1e-300
+_n_cells_re = re.compile(rb"nCells:\s*(\d+)")
+
+
+class polyMesh:
+    """Mesh of an OpenFOAM case (constant/polyMesh) with vectorized geometry.
+
+    Faces are stored in CSR layout: the point labels of face i are `face_points[face_offsets[i]:face_offsets[i+1]]`.
+    Geometry is computed on first access with the same decompositions as OpenFOAM
+    (triangle fans for faces, pyramids for cells).
+
+    Attributes:
+        points (np.ndarray): (n_points, 3) point coordinates.
+        face_offsets (np.ndarray): (n_faces+1,) offsets into `face_points`.
+        face_points (np.ndarray): Flat point labels of all faces.
+        owner (np.ndarray): (n_faces,) owner cell of each face.
+        neighbour (np.ndarray): (n_internal_faces,) neighbour cell of each internal face.
+        boundary (dict[str, dict]): Patches with their "type", "nFaces" and "startFace".
+    """
+    def __init__(self, case_dir:str, mesh_dir:str = "constant/polyMesh")->None:
+        path = f"{case_dir}/{mesh_dir}"
+        self.points = read_foamFile(f"{path}/points")[None][0]
+        faces = read_foamFile(f"{path}/faces")[None]
+        if len(faces) == 2:
+            # Binary faceCompactList: offsets and flat labels.
+            self.face_offsets, self.face_points = faces
+        else:
+            self.face_offsets, self.face_points = faces[0]
+        self.owner = read_foamFile(f"{path}/owner")[None][0]
+        self.neighbour = read_foamFile(f"{path}/neighbour")[None][0]
+        self.boundary = read_foamFile(f"{path}/boundary")[None][0]
+
+    @property
+    def n_points(self)->int:
+        return len(self.points)
+
+    @property
+    def n_faces(self)->int:
+        return len(self.face_offsets) - 1
+
+    @property
+    def n_internal_faces(self)->int:
+        return len(self.neighbour)
+
+    @cached_property
+    def n_cells(self)->int:
+        return int(max(self.owner.max(initial=-1), self.neighbour.max(initial=-1))) + 1
+
+    @cached_property
+    def face_sizes(self)->np.ndarray:
+        """np.ndarray: Number of points of each face."""
+        return np.diff(self.face_offsets)
+
+    def patch_faces(self, name:str)->slice:
+        """Faces of a patch.
+
+        Args:
+            name (str): Name of the patch.
+        Returns:
+            slice: Slice of the face arrays belonging to the patch.
+        """
+        patch = self.boundary[name]
+        return slice(patch["startFace"], patch["startFace"] + patch["nFaces"])
+
+    def _face_sum(self, values:np.ndarray, face_ids:np.ndarray)->np.ndarray:
+        return np.stack([np.bincount(face_ids, weights=values[:, i], minlength=self.n_faces) for i in range(values.shape[1])], axis=1)
+
+    def _cell_sum(self, face_values:np.ndarray, neighbour_values:np.ndarray = None)->np.ndarray:
+        """Sum values over the faces of each cell (owner side plus neighbour side)."""
+        nei_values = face_values[:self.n_internal_faces] if neighbour_values is None else neighbour_values
+        if face_values.ndim == 1:
+            return np.bincount(self.owner, weights=face_values, minlength=self.n_cells) + np.bincount(self.neighbour, weights=nei_values, minlength=self.n_cells)
+        return np.stack([self._cell_sum(face_values[:, i], nei_values[:, i]) for i in range(face_values.shape[1])], axis=1)
+
+    @cached_property
+    def _face_geometry(self)->tuple[np.ndarray, np.ndarray]:
+        face_ids = np.repeat(np.arange(self.n_faces), self.face_sizes)
+        p = self.points[self.face_points]
+        nxt = np.arange(1, len(self.face_points) + 1)
+        nxt[self.face_offsets[1:] - 1] = self.face_offsets[:-1]
+        p_next = self.points[self.face_points[nxt]]
+
+        centre_estimate = self._face_sum(p, face_ids)/self.face_sizes[:, None]
+        fc = centre_estimate[face_ids]
+        c = p + p_next + fc
+        n = np.cross(p_next - p, fc - p)
+        a = np.linalg.norm(n, axis=1)
+        sum_n = self._face_sum(n, face_ids)
+        sum_a = np.bincount(face_ids, weights=a, minlength=self.n_faces)
+        sum_ac = self._face_sum(a[:, None]*c, face_ids)
+
+        degenerate = sum_a < _small
+        centres = np.where(degenerate[:, None], centre_estimate, sum_ac/np.where(degenerate, 1.0, 3.0*sum_a)[:, None])
+        return centres, 0.5*sum_n
+
+    @property
+    def face_centres(self)->np.ndarray:
+        """np.ndarray: (n_faces, 3) face centres."""
+        return self._face_geometry[0]
+
+    @property
+    def face_areas(self)->np.ndarray:
+        """np.ndarray: (n_faces, 3) face area vectors, pointing out of the owner cell."""
+        return self._face_geometry[1]
+
+    @cached_property
+    def face_area_magnitudes(self)->np.ndarray:
+        return np.linalg.norm(self.face_areas, axis=1)
+
+    @cached_property
+    def _cell_geometry(self)->tuple[np.ndarray, np.ndarray]:
+        nif = self.n_internal_faces
+        fc, sf = self.face_centres, self.face_areas
+        n_cell_faces = np.bincount(self.owner, minlength=self.n_cells) + np.bincount(self.neighbour, minlength=self.n_cells)
+        c_est = self._cell_sum(fc)/np.maximum(n_cell_faces, 1)[:, None]
+
+        pyr3_own = np.einsum("ij,ij->i", sf, fc - c_est[self.owner])
+        pyr3_nei = np.einsum("ij,ij->i", sf[:nif], c_est[self.neighbour] - fc[:nif])
+        pc_own = 0.75*fc + 0.25*c_est[self.owner]
+        pc_nei = 0.75*fc[:nif] + 0.25*c_est[self.neighbour]
+
+        volumes = self._cell_sum(pyr3_own, pyr3_nei)
+        centres = self._cell_sum(pyr3_own[:, None]*pc_own, pyr3_nei[:, None]*pc_nei)
+        small = np.abs(volumes) < _small
+        centres = np.where(small[:, None], c_est, centres/np.where(small, 1.0, volumes)[:, None])
+        return centres, volumes/3.0
+
+    @property
+    def cell_centres(self)->np.ndarray:
+        """np.ndarray: (n_cells, 3) cell centres."""
+        return self._cell_geometry[0]
+
+    @property
+    def cell_volumes(self)->np.ndarray:
+        """np.ndarray: (n_cells,) cell volumes."""
+        return self._cell_geometry[1]
+
+    @cached_property
+    def non_orthogonality(self)->np.ndarray:
+        """np.ndarray: (n_internal_faces,) angle in degrees between the owner-neighbour vector and the face normal."""
+        nif = self.n_internal_faces
+        d = self.cell_centres[self.neighbour] - self.cell_centres[self.owner[:nif]]
+        cos = np.einsum("ij,ij->i", d, self.face_areas[:nif])/(np.linalg.norm(d, axis=1)*self.face_area_magnitudes[:nif] + _small)
+        return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+    @cached_property
+    def skewness(self)->np.ndarray:
+        """np.ndarray: (n_faces,) face skewness as computed by checkMesh.
+
+        The skewness vector goes from the point where the line joining the cell centres crosses the plane of
+        the face to the face centre. Its length is divided by the extent of the face in its direction, or by
+        0.2 times the length of the line if larger. On boundary faces the line is the normal through the
+        owner centre.
+        """
+        nif = self.n_internal_faces
+        fc, sf = self.face_centres, self.face_areas
+        c_own = self.cell_centres[self.owner]
+        cpf = fc - c_own
+        d = np.empty_like(cpf)
+        d[:nif] = self.cell_centres[self.neighbour] - c_own[:nif]
+        normal = sf[nif:]/(self.face_area_magnitudes[nif:, None] + _small)
+        d[nif:] = normal*np.einsum("ij,ij->i", normal, cpf[nif:])[:, None]
+
+        sv = cpf - (np.einsum("ij,ij->i", sf, cpf)/(np.einsum("ij,ij->i", sf, d) + _small))[:, None]*d
+        sv_mag = np.linalg.norm(sv, axis=1)
+        sv_hat = sv/(sv_mag[:, None] + _small)
+        face_ids = np.repeat(np.arange(self.n_faces), self.face_sizes)
+        extent = np.abs(np.einsum("ij,ij->i", sv_hat[face_ids], self.points[self.face_points] - fc[face_ids]))
+        fd = np.maximum(0.2*np.linalg.norm(d, axis=1) + _small, np.maximum.reduceat(extent, self.face_offsets[:-1]))
+        return sv_mag/fd
+
+    def check(self, non_orthogonality_threshold:float = 70.0, skewness_threshold:float = 4.0)->dict[str, any]:
+        """Mesh statistics similar to those of checkMesh.
+
+        Args:
+            non_orthogonality_threshold (float, optional): Limit in degrees for severely non-orthogonal faces. Defaults to 70.0.
+            skewness_threshold (float, optional): Limit for highly skewed faces. Defaults to 4.0.
+        Returns:
+            dict[str, any]: Counts, volume range, non-orthogonality and skewness statistics.
+        """
+        non_orth = self.non_orthogonality
+        return {
+            "n_points": self.n_points,
+            "n_faces": self.n_faces,
+            "n_internal_faces": self.n_internal_faces,
+            "n_cells": self.n_cells,
+            "min_volume": float(self.cell_volumes.min(initial=np.inf)),
+            "max_volume": float(self.cell_volumes.max(initial=-np.inf)),
+            "total_volume": float(self.cell_volumes.sum()),
+            "n_negative_volumes": int((self.cell_volumes <= 0).sum()),
+            "max_non_orthogonality": float(non_orth.max(initial=0.0)),
+            "mean_non_orthogonality": float(non_orth.mean()) if len(non_orth) else 0.0,
+            "n_severely_non_orthogonal": int((non_orth > non_orthogonality_threshold).sum()),
+            "max_skewness": float(self.skewness.max(initial=0.0)),
+            "n_highly_skewed": int((self.skewness > skewness_threshold).sum()),
+        }
+
+
+def read_n_cells(case_dir:str, mesh_dir:str = "constant/polyMesh")->int:
+    """Number of cells of a mesh, without reading its points and faces.
+
+    The count is read from the note OpenFOAM writes in the header of the owner file. Without it, the largest
+    owner label is used, since every cell owns at least one face.
+
+    Args:
+        case_dir (str): The directory of the OpenFOAM case.
+        mesh_dir (str, optional): The mesh directory relative to the case. Defaults to "constant/polyMesh".
+    Returns:
+        int: The number of cells.
+    """
+    path = f"{case_dir}/{mesh_dir}/owner"
+    buf = open_foamFile(path)
+    m = _n_cells_re.search(bytes(buf[:max(buf.find(b"}"), 0)]))
+    if m is not None:
+        return int(m.group(1))
+    return int(read_foamFile(path)[None][0].max(initial=-1)) + 1
@@ -0,0 +1,152 @@
+import io
+import os
+import numpy as np
+
+
+class postProcessingTable:
+    """Incremental reader of the tables written by function objects (probes, forces, forceCoeffs, ...)
+    under postProcessing/<name>/<startTime>/<file>.dat.
+
+    Every `read` parses only the lines appended since the previous one, in a single `np.loadtxt` call, so
+    the table can be tailed while the solver runs. Vector and tensor entries such as "(1 2 3)" are flattened into columns. Restarted
+    runs write into a new <startTime> directory; the tables are concatenated in time order and the rows
+    overlapping a later restart are dropped.
+
+    Attributes:
+        directory (str): postProcessing/<name> directory of the function object.
+        file (str): Name of the table, e.g. "p" for probes or "force.dat" for forces.
+        columns (list[str]): Column names from the last header comment, if any.
+    """
+    def __init__(self, case_dir:str, name:str, file:str)->None:
+        self.directory = f"{case_dir}/postProcessing/{name}"
+        self.file = file
+        self.columns = []
+        self.offsets = {}
+        self.blocks = {}
+        self.partial = {}
+        self.table = None
+
+    def start_times(self)->list[str]:
+        """Names of the <startTime> directories holding the table, in time order."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = []
+        for name in os.listdir(self.directory):
+            try:
+                float(name)
+            except ValueError:
+                continue
+            if os.path.isfile(f"{self.directory}/{name}/{self.file}"):
+                names.append(name)
+        return sorted(names, key=float)
+
+    def read_new(self, start_time:str)->None:
+        path = f"{self.directory}/{start_time}/{self.file}"
+        with open(path, "rb") as file:
+            file.seek(self.offsets.get(start_time, 0))
+            data = file.read()
+        self.offsets[start_time] = self.offsets.get(start_time, 0) + len(data)
+        data = self.partial.pop(start_time, b"") + data
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # Keep the line being written for the next read.
+            self.partial[start_time] = data[end:]
+        text = data[:end]
+        if b"#" in text:
+            lines = []
+            for line in text.splitlines(keepends=True):
+                if line.lstrip().startswith(b"#"):
+                    header = line.lstrip()[1:].decode(errors="replace").split()
+                    if header and header[0] == "Time":
+                        self.columns = header
+                else:
+                    lines.append(line)
+            text = b"".join(lines)
+        if not text.strip():
+            return
+        # Values that were not computed at a time step (e.g. residuals of unsolved fields) are "N/A".
+        text = text.replace(b"(", b" ").replace(b")", b" ").replace(b"N/A", b"nan")
+        blocks = self.blocks.setdefault(start_time, [])
+        width = blocks[0].shape[1] if blocks else None
+        try:
+            block = np.loadtxt(io.BytesIO(text), dtype=np.float64, ndmin=2)
+        except ValueError:
+            block = None
+        if block is None or (width is not None and block.shape[1] != width):
+            # Lines cut by a crash or with another layout: keep the rows as wide as the first one.
+            block = self.parse_lines(text, width)
+        if block.shape[0] > 0:
+            blocks.append(block)
+            self.table = None
+
+    def parse_lines(self, text:bytes, width:int = None)->np.ndarray:
+        """Parse the rows one by one, skipping the malformed ones and those not `width` wide."""
+        rows = []
+        for line in text.decode(errors="replace").splitlines():
+            try:
+                row = [float(v) for v in line.split()]
+            except ValueError:
+                continue
+            if not row:
+                continue
+            if width is None:
+                width = len(row)
+            if len(row) == width:
+                rows.append(row)
+        return np.array(rows, dtype=np.float64).reshape(len(rows), width or 0)
+
+    def read(self)->np.ndarray:
+        """Parse the lines written since the last call.
+
+        Returns:
+            np.ndarray: (n_rows, n_columns) table of every row read so far. The first column is the time.
+        """
+        for start_time in self.start_times():
+            self.read_new(start_time)
+        return self.data
+
+    @property
+    def data(self)->np.ndarray:
+        """np.ndarray: Every row read so far."""
+        if self.table is None:
+            tables = []
+            for t in sorted(self.blocks, key=float):
+                if len(self.blocks[t]) > 1:
+                    self.blocks[t] = [np.concatenate(self.blocks[t])]
+                tables += self.blocks[t]
+            if not tables:
+                return np.empty((0, 0))
+            # Columns may change between restarts (e.g. new probes); only the latest layout is returned then.
+            tables = [t for t in tables if t.shape[1] == tables[-1].shape[1]]
+            for i in range(len(tables) - 1):
+                tables[i] = tables[i][tables[i][:, 0] < tables[i + 1][0, 0]]
+            self.table = np.concatenate(tables)
+        return self.table
+
+    def named(self)->dict[str, np.ndarray]:
+        """Columns of the table keyed on the names of the header, with "Time" as "time".
+
+        Returns:
+            dict[str, np.ndarray]: One array per column. Columns are named by index when the header does not match.
+        """
+        data = self.read()
+        if data.shape[0] == 0:
+            return {}
+        if data.shape[1] == len(self.columns):
+            names = ["time"] + self.columns[1:]
+        else:
+            names = ["time"] + [str(i) for i in range(1, data.shape[1])]
+        return {name: data[:, i] for i, name in enumerate(names)}
+
+
+def read_postProcessing(case_dir:str, name:str, file:str)->np.ndarray:
+    """Read a function object table.
+
+    Args:
+        case_dir (str): The directory of the OpenFOAM case.
+        name (str): Name of the function object.
+        file (str): Name of the table, e.g. "p" for probes or "force.dat" for forces.
+    Returns:
+        np.ndarray: (n_rows, n_columns) table. The first column is the time.
+    """
+    return postProcessingTable(case_dir, name, file).read()
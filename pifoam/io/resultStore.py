@@ -0,0 +1,310 @@
+import io
+import json
+import os
+import shutil
+import threading
+import zlib
+import numpy as np
+from pifoam.io.field import field_values, timeSeries
+from pifoam.io.polyMesh import polyMesh
+
+
+class resultStore:
+    """Chunked on-disk store of the cell values of fields over time.
+
+    Each field is stored as a (time, cell, component) array split along time into chunks of `chunk_size`
+    time steps, one .npy file per chunk under `<path>/<field>/`. Uncompressed chunks are read through
+    memory maps, so a time slice or a subset of cells only touches the pages it needs. With `compression`,
+    full chunks are deflated with zlib and a chunk is decompressed once when it is read.
+    Values of times at which a field was not written are NaN.
+
+    Attributes:
+        path (str): Directory of the store.
+        chunk_size (int): Number of time steps per chunk.
+        dtype (np.dtype): Data type of the stored values.
+        compression (str): None or "zlib".
+        fields (dict[str, dict]): "n_cells" and "n_components" of each field.
+        times (np.ndarray): Stored time values.
+    """
+    def __init__(self, path:str, chunk_size:int = 64, dtype:str = "float64", compression:str = None)->None:
+        self.path = path
+        meta_path = f"{path}/store.json"
+        if os.path.isfile(meta_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+            chunk_size, dtype, compression = meta["chunk_size"], meta["dtype"], meta["compression"]
+            self.fields = meta["fields"]
+            self.times = np.load(f"{path}/times.npy")[:meta["n_times"]]
+        else:
+            self.fields = {}
+            self.times = np.empty(0)
+        if compression not in (None, "zlib"):
+            raise ValueError(f"Unknown compression '{compression}'.")
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+        self.compression = compression
+        self.lock = threading.Lock()
+        self.cache = {}
+
+    def __len__(self)->int:
+        return len(self.times)
+
+    def chunk_path(self, name:str, k:int)->str:
+        return f"{self.path}/{name}/chunk_{k:06d}.npy"
+
+    def save_meta(self)->None:
+        os.makedirs(self.path, exist_ok=True)
+        np.save(f"{self.path}/times.tmp.npy", self.times)
+        os.replace(f"{self.path}/times.tmp.npy", f"{self.path}/times.npy")
+        meta = {"chunk_size": self.chunk_size, "dtype": self.dtype.str, "compression": self.compression,
+                "n_times": len(self.times), "fields": self.fields}
+        with open(f"{self.path}/store.json.tmp", "w") as file:
+            json.dump(meta, file, indent=1)
+        os.replace(f"{self.path}/store.json.tmp", f"{self.path}/store.json")
+
+    def append(self, time:float, fields:dict[str, np.ndarray])->None:
+        """Append the values of one time step.
+
+        Args:
+            time (float): The time value. It must be larger than the last stored time.
+            fields (dict[str, np.ndarray]): (n_cells,) or (n_cells, n_components) values of each field.
+        """
+        with self.lock:
+            if len(self.times) and time <= self.times[-1]:
+                raise ValueError(f"Time {time} is not after the last stored time {self.times[-1]}.")
+            index = len(self.times)
+            k, row = divmod(index, self.chunk_size)
+            for name, values in fields.items():
+                values = np.asarray(values)
+                values = values.reshape(len(values), -1)
+                if name not in self.fields:
+                    self.fields[name] = {"n_cells": values.shape[0], "n_components": values.shape[1]}
+                shape = (self.fields[name]["n_cells"], self.fields[name]["n_components"])
+                if values.shape != shape:
+                    raise ValueError(f"Field '{name}' has shape {values.shape} but {shape} is stored.")
+                path = self.chunk_path(name, k)
+                if not os.path.isfile(path) and os.path.isfile(f"{path}.z"):
+                    # Sealed by an append which was interrupted before it was recorded.
+                    self.unseal(name, k)
+                if os.path.isfile(path):
+                    chunk = np.load(path, mmap_mode="r+")
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    chunk = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(self.chunk_size,) + shape)
+                    chunk[:] = np.nan
+                chunk[row] = values
+                chunk.flush()
+                del chunk
+                if row == self.chunk_size - 1:
+                    self.seal(name, k)
+            self.times = np.append(self.times, time)
+            self.save_meta()
+
+    def seal(self, name:str, k:int)->None:
+        """Compress a full chunk if the store is compressed."""
+        if self.compression is None:
+            return
+        path = self.chunk_path(name, k)
+        with open(path, "rb") as file:
+            data = zlib.compress(file.read(), 1)
+        with open(f"{path}.z.tmp", "wb") as file:
+            file.write(data)
+        os.replace(f"{path}.z.tmp", f"{path}.z")
+        os.remove(path)
+
+    def unseal(self, name:str, k:int)->None:
+        path = self.chunk_path(name, k)
+        with open(f"{path}.z", "rb") as file:
+            data = zlib.decompress(file.read())
+        with open(path, "wb") as file:
+            file.write(data)
+        os.remove(f"{path}.z")
+        self.cache = {}
+
+    def chunk(self, name:str, k:int)->np.ndarray|None:
+        """(chunk_size, n_cells, n_components) values of a chunk, None if the field has no values in it."""
+        path = self.chunk_path(name, k)
+        if os.path.isfile(path):
+            return np.load(path, mmap_mode="r")
+        if not os.path.isfile(f"{path}.z"):
+            return None
+        if (name, k) not in self.cache:
+            with open(f"{path}.z", "rb") as file:
+                buffer = zlib.decompress(file.read())
+            # Only the last decompressed chunk is kept.
+            self.cache = {(name, k): np.load(io.BytesIO(buffer))}
+        return self.cache[(name, k)]
+
+    def read(self, name:str, times:int|slice|np.ndarray = slice(None), cells:slice|np.ndarray = slice(None))->np.ndarray:
+        """Read the values of a field.
+
+        Args:
+            name (str): Name of the field.
+            times (int|slice|np.ndarray, optional): Indices into `times`. Defaults to all times.
+            cells (slice|np.ndarray, optional): Cells to read. Defaults to all cells.
+        Returns:
+            np.ndarray: (n_times, n_cells) for scalar fields or (n_times, n_cells, n_components) values,
+                without the time axis if `times` is an integer.
+        """
+        if name not in self.fields:
+            raise KeyError(f"No field '{name}' in {self.path}.")
+        indices = np.arange(len(self.times))[times]
+        single = indices.ndim == 0
+        indices = np.atleast_1d(indices)
+        n_comp = self.fields[name]["n_components"]
+        n_cells = len(np.arange(self.fields[name]["n_cells"])[cells])
+        out = np.full((len(indices), n_cells, n_comp), np.nan, dtype=self.dtype)
+        chunks = indices//self.chunk_size
+        for k in np.unique(chunks):
+            data = self.chunk(name, int(k))
+            if data is None:
+                continue
+            mask = chunks == k
+            rows = indices[mask] % self.chunk_size
+            out[mask] = data[rows, cells] if isinstance(cells, slice) else data[np.ix_(rows, np.asarray(cells))]
+        if n_comp == 1:
+            out = out[..., 0]
+        return out[0] if single else out
+
+    def time_index(self, time:float)->int:
+        """Index of the stored time closest to `time`."""
+        return int(np.argmin(np.abs(self.times - time)))
+
+    def size(self)->int:
+        """int: Size of the store on disk in bytes."""
+        total = 0
+        for root, _, files in os.walk(self.path):
+            total += sum(os.stat(os.path.join(root, f)).st_size for f in files)
+        return total
+
+
+class resultWatcher:
+    """Ingest the time directories of a running case into a `resultStore`.
+
+    A time directory is complete once the solver has started writing a later one, and every remaining
+    directory is complete when the watcher stops, so it is used as a context manager around the run:
+
+        with resultWatcher(case.case_dir, f"{case.case_dir}/results", purge=True):
+            case.run()
+
+    Only the internalField of volume fields is stored. Parallel runs are ingested after reconstructPar.
+
+    Attributes:
+        case_dir (str): Directory of the case.
+        store (resultStore): The store the fields are appended to.
+        fields (list[str]): Names of the fields to store. None stores every volume field.
+        purge (bool): Whether to delete time directories once they are stored. The initial and the
+            latest time directories are kept so the case can be restarted.
+        interval (float): Seconds between two scans of the case directory.
+        ingested (list[str]): Names of the time directories stored so far.
+    """
+    def __init__(self,
+                case_dir:str,
+                store:resultStore|str,
+                fields:list[str] = None,
+                purge:bool = False,
+                interval:float = 1.0,
+                )->None:
+        self.case_dir = case_dir
+        self.store = resultStore(store) if isinstance(store, str) else store
+        self.fields = fields
+        self.purge = purge
+        self.interval = interval
+        self.ingested = []
+        self.error = None
+        self.n_cells = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def cell_count(self)->int:
+        if self.n_cells is None:
+            self.n_cells = polyMesh(self.case_dir).n_cells
+        return self.n_cells
+
+    def ingest(self, directory)->None:
+        """Append the fields of a time directory to the store."""
+        values = {}
+        for name in directory.fields if self.fields is None else self.fields:
+            if name not in directory:
+                continue
+            field = directory[name]
+            field_class = str(field.get("FoamFile", {}).get("class", ""))
+            if not field_class.startswith("vol"):
+                continue
+            value = np.asarray(field["internalField"])
+            n_comp = 1 if "Scalar" in field_class else value.shape[-1]
+            if value.ndim == (0 if n_comp == 1 else 1):
+                value = field_values(value, self.cell_count(), n_comp)
+            values[name] = value
+        directory.release()
+        if values:
+            self.store.append(directory.time, values)
+
+    def poll(self, final:bool = False)->list[str]:
+        """Store the complete time directories which are not stored yet.
+
+        Args:
+            final (bool, optional): Whether the solver has finished, so the latest directory is complete too. Defaults to False.
+        Returns:
+            list[str]: Names of the directories stored.
+        """
+        series = timeSeries(self.case_dir)
+        last = self.store.times[-1] if len(self.store) else -np.inf
+        n = len(series) if final else len(series) - 1
+        new = []
+        for i in range(n):
+            if series.times[i] <= last:
+                continue
+            directory = series[i]
+            self.ingest(directory)
+            new.append(directory.name)
+            self.ingested.append(directory.name)
+            last = series.times[i]
+        if self.purge and len(series):
+            # Every stored directory is purged, including those left by a poll which failed part way.
+            keep = {series.names[0], series.names[-1]}
+            for i in range(n):
+                if series.times[i] <= last and series.names[i] not in keep:
+                    shutil.rmtree(f"{self.case_dir}/{series.names[i]}", ignore_errors=True)
+        return new
+
+    def watch(self)->None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except OSError:
+                # e.g. a directory removed or replaced while it was read; retried at the next scan.
+                continue
+            except Exception as e:
+                self.error = e
+                return
+
+    def start(self)->None:
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def stop(self)->None:
+        """Stop watching and store the remaining time directories.
+
+        Raises:
+            Exception: The error which stopped the background ingestion, if any. It is raised after the
+                remaining directories are stored.
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        error, self.error = self.error, None
+        try:
+            self.poll(final=True)
+        finally:
+            if error is not None:
+                raise error
+
+    def __enter__(self)->"resultWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback)->None:
+        self.stop()
@@ -0,0 +1,176 @@
+import re
+import numpy as np
+import _io
+
+class growableArray:
+    """Append-only NumPy array with amortized O(1) appends.
+
+    Attributes:
+        size (int): Number of stored values.
+    """
+    def __init__(self, dtype:type = np.float64, capacity:int = 256)->None:
+        self.buffer = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value:any)->None:
+        if self.size == len(self.buffer):
+            buffer = np.empty(2*len(self.buffer), dtype=self.buffer.dtype)
+            buffer[:self.size] = self.buffer
+            self.buffer = buffer
+        self.buffer[self.size] = value
+        self.size += 1
+
+    def fill(self, value:any, size:int)->None:
+        """Append `value` until the array holds `size` values."""
+        while self.size < size:
+            self.append(value)
+
+    @property
+    def values(self)->np.ndarray:
+        """np.ndarray: View of the stored values."""
+        return self.buffer[:self.size]
+
+    def __len__(self)->int:
+        return self.size
+
+
+_float = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|-?nan|-?inf)"
+_time_re = re.compile(rf"^Time = {_float}s?\s*$")
+_courant_re = re.compile(rf"^Courant Number mean: {_float} max: {_float}")
+_solving_re = re.compile(rf"Solving for (\w+), Initial residual = {_float}, Final residual = {_float}, No Iterations (\d+)")
+_continuity_re = re.compile(rf"^time step continuity errors : sum local = {_float}, global = {_float}, cumulative = {_float}")
+_execution_re = re.compile(rf"^ExecutionTime = {_float} s\s+ClockTime = {_float} s")
+
+
+class solverLog:
+    """Streaming parser for the stdout of OpenFOAM solvers.
+
+    Lines are parsed as they are fed, so the log is never held in memory. Per time step it records
+    the time, Courant numbers, initial/final residuals and iteration counts of every solved field,
+    continuity errors and ExecutionTime/ClockTime. When a field is solved several times in a step
+    (e.g. p with PISO correctors), the initial residual of the first solve, the final residual of
+    the last solve and the total number of iterations are kept.
+
+    Attributes:
+        n_steps (int): Number of completed time steps.
+        callbacks (list[callable]): Functions `callback(log, step)` called after each time step.
+            `step` is a dictionary with the values of that step.
+    """
+    columns = ("time", "courant_mean", "courant_max", "continuity_local", "continuity_global", "continuity_cumulative", "execution_time", "clock_time")
+
+    def __init__(self, callbacks:list[callable] = None)->None:
+        self.callbacks = [] if callbacks is None else list(callbacks)
+        self.n_steps = 0
+        self.data = {c:growableArray() for c in self.columns}
+        self.fields = {}
+        self.step = None
+
+    def __call__(self, line:str)->None:
+        self.feed(line)
+
+    def feed(self, line:str)->None:
+        """Parse one line of the log.
+
+        Args:
+            line (str): The line to parse.
+        """
+        if line.startswith("Time = "):
+            m = _time_re.match(line)
+            if m is not None:
+                self.finish_step()
+                self.step = {"time":float(m.group(1)), "fields":{}}
+            return
+        if self.step is None:
+            return
+        if "Solving for" in line:
+            m = _solving_re.search(line)
+            if m is not None:
+                name = m.group(1)
+                initial, final, iterations = float(m.group(2)), float(m.group(3)), int(m.group(4))
+                if name in self.step["fields"]:
+                    res = self.step["fields"][name]
+                    res["final"] = final
+                    res["iterations"] += iterations
+                else:
+                    self.step["fields"][name] = {"initial":initial, "final":final, "iterations":iterations}
+        elif line.startswith("Courant Number"):
+            m = _courant_re.match(line)
+            if m is not None:
+                self.step["courant_mean"], self.step["courant_max"] = float(m.group(1)), float(m.group(2))
+        elif line.startswith("time step continuity"):
+            m = _continuity_re.match(line)
+            if m is not None:
+                # The last correction of the step is kept.
+                self.step["continuity_local"], self.step["continuity_global"], self.step["continuity_cumulative"] = map(float, m.groups())
+        elif line.startswith("ExecutionTime"):
+            m = _execution_re.match(line)
+            if m is not None:
+                self.step["execution_time"], self.step["clock_time"] = float(m.group(1)), float(m.group(2))
+                self.finish_step()
+
+    def finish_step(self)->None:
+        """Store the current time step and call the callbacks.
+        """
+        step = self.step
+        if step is None:
+            return
+        self.step = None
+        for c in self.columns:
+            self.data[c].append(step.get(c, np.nan))
+        for name, res in step["fields"].items():
+            if name not in self.fields:
+                self.fields[name] = {"initial":growableArray(), "final":growableArray(), "iterations":growableArray(np.int64)}
+                for key, arr in self.fields[name].items():
+                    arr.fill(-1 if key == "iterations" else np.nan, self.n_steps)
+            for key, arr in self.fields[name].items():
+                arr.append(res[key])
+        self.n_steps += 1
+        for name, arrays in self.fields.items():
+            if name not in step["fields"]:
+                for key, arr in arrays.items():
+                    arr.fill(-1 if key == "iterations" else np.nan, self.n_steps)
+        for callback in self.callbacks:
+            callback(self, step)
+
+    def parse(self, stream:_io.TextIOWrapper)->"solverLog":
+        """Parse a whole stream, e.g. an open log file.
+
+        Args:
+            stream (_io.TextIOWrapper): The stream to read line by line.
+        Returns:
+            solverLog: self
+        """
+        for line in stream:
+            self.feed(line)
+        self.finish_step()
+        return self
+
+    def __getitem__(self, column:str)->np.ndarray:
+        return self.data[column].values
+
+    def residuals(self, field:str)->dict[str, np.ndarray]:
+        """Residual history of a field.
+
+        Args:
+            field (str): Name of the solved field, e.g. "Ux" or "p".
+        Returns:
+            dict[str, np.ndarray]: Arrays "initial", "final" and "iterations". Steps where the field
+                was not solved hold NaN (-1 for iterations).
+        """
+        return {key:arr.values for key, arr in self.fields[field].items()}
+
+    def execution_time_per_step(self)->np.ndarray:
+        """np.ndarray: ExecutionTime spent in each time step."""
+        return np.diff(self["execution_time"], prepend=0.0)
+
+
+def read_log(path:str)->solverLog:
+    """Parse a solver log file.
+
+    Args:
+        path (str): Path to the log file.
+    Returns:
+        solverLog: The parsed log.
+    """
+    with open(path) as file:
+        return solverLog().parse(file)
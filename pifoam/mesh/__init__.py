@@ -1 +1,3 @@
-from pifoam.mesh.snappyHexMesh import snappyHexMesh
\ No newline at end of file
+from pifoam.mesh.snappyHexMesh import snappyHexMesh
+from pifoam.mesh.stl import stlSurface, read_stl
+from pifoam.mesh.costModel import costModel
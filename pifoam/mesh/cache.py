@@ -0,0 +1,117 @@
+import hashlib
+import os
+import shutil
+import uuid
+from pifoam import utils
+
+class meshCache:
+    """Content-addressed cache of constant/polyMesh shared across cases.
+
+    Entries are keyed on a hash of the files written by the mesher (the STL and every dictionary).
+    A hit hardlinks (or copies) the cached polyMesh into the case instead of meshing again.
+    The least recently used entries are evicted when the cache grows beyond `max_bytes`.
+
+    Attributes:
+        cache_dir (str): Directory holding the cache entries.
+        max_bytes (int): Size limit of the cache in bytes. None means unlimited.
+        hits (int): Number of cache hits.
+        misses (int): Number of cache misses.
+    """
+    def __init__(self, cache_dir:str, max_bytes:int = None)->None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, files:dict[str, str|bytes])->str:
+        """Compute the cache key of a case.
+
+        Args:
+            files (dict[str, str|bytes]): Content of the mesher input files, keyed on their path in the case.
+        Returns:
+            str: The hex digest of the mesher inputs.
+        """
+        h = hashlib.sha256()
+        for path in sorted(files):
+            content = files[path]
+            h.update(path.encode())
+            h.update(b"\0")
+            h.update(content.encode() if isinstance(content, str) else content)
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def contains(self, key:str)->bool:
+        return os.path.isdir(f"{self.cache_dir}/{key}/polyMesh")
+
+    def fetch(self, key:str, case_dir:str)->bool:
+        """Place the cached polyMesh into the case if it exists.
+
+        Args:
+            key (str): The cache key.
+            case_dir (str): The directory of the OpenFOAM case.
+        Returns:
+            bool: True on a cache hit.
+        """
+        entry = f"{self.cache_dir}/{key}"
+        if not os.path.isdir(f"{entry}/polyMesh"):
+            self.misses += 1
+            return False
+        shutil.rmtree(f"{case_dir}/constant/polyMesh", ignore_errors=True)
+        utils.link_tree(f"{entry}/polyMesh", f"{case_dir}/constant/polyMesh")
+        os.utime(entry)
+        self.hits += 1
+        return True
+
+    def store(self, key:str, case_dir:str)->None:
+        """Add the polyMesh of a case to the cache and evict old entries.
+
+        Args:
+            key (str): The cache key.
+            case_dir (str): The directory of the OpenFOAM case.
+        """
+        entry = f"{self.cache_dir}/{key}"
+        if os.path.isdir(entry) or not os.path.isdir(f"{case_dir}/constant/polyMesh"):
+            return
+        tmp = f"{self.cache_dir}/.tmp-{uuid.uuid4().hex}"
+        utils.link_tree(f"{case_dir}/constant/polyMesh", f"{tmp}/polyMesh")
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process stored the same mesh first.
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def entries(self)->list[tuple[str, float, int]]:
+        """List the cache entries.
+
+        Returns:
+            list[tuple[str, float, int]]: (key, last access time, size in bytes) ordered from the least recently used.
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry = f"{self.cache_dir}/{key}"
+            if key.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = 0
+            for root, _, files in os.walk(entry):
+                size += sum(os.stat(os.path.join(root, f)).st_size for f in files)
+            entries.append((key, os.stat(entry).st_mtime, size))
+        return sorted(entries, key=lambda e: e[1])
+
+    def evict(self)->None:
+        """Remove the least recently used entries until the cache fits in `max_bytes`.
+        """
+        if self.max_bytes is None:
+            return
+        entries = self.entries()
+        total = sum(e[2] for e in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(f"{self.cache_dir}/{key}", ignore_errors=True)
+            total -= size
+
+    def clear(self)->None:
+        for key, _, _ in self.entries():
+            shutil.rmtree(f"{self.cache_dir}/{key}", ignore_errors=True)
@@ -1,9 +1,15 @@
+from pifoam import utils
+
 class coreMesher:
     def __init__(self, boundary_types:dict[str, str]) -> None:
         self.boundary_types = boundary_types
+    def case_files(self)->dict[str, str|bytes]:
+        raise NotImplementedError("This method should be implemented in subclasses.")
     def write(self, case_dir:str)->None:
+        utils.write_files(case_dir, self.case_files())
+    def run(self, case_dir:str)->int:
         raise NotImplementedError("This method should be implemented in subclasses.")
-    def run(self, case_dir:str)->None:
+    async def run_async(self, case_dir:str)->int:
         raise NotImplementedError("This method should be implemented in subclasses.")
     def clean(self, case_dir:str)->None:
         raise NotImplementedError("This method should be implemented in subclasses.")
\ No newline at end of file
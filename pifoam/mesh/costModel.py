@@ -0,0 +1,276 @@
+import json
+import math
+import os
+import re
+import numpy as np
+from pifoam import trace
+from pifoam.mesh.stl import read_stl, stlSurface
+
+_level_re = re.compile(r"\(\s*(\d+)\s+(\d+)\s*\)")
+
+
+def node_memory()->int:
+    """Physical memory of the node in bytes."""
+    return os.sysconf("SC_PAGE_SIZE")*os.sysconf("SC_PHYS_PAGES")
+
+
+def surface_level(level:str)->int:
+    """Maximum level of a refinement level entry such as "(1 3)"."""
+    m = _level_re.search(str(level))
+    return 0 if m is None else int(m.group(2))
+
+
+def clipped_areas(surface:stlSurface, blockmesh_props:dict[str, any])->dict[str, float]:
+    """Area of each region of the surface inside the background block.
+
+    Each triangle contributes its area times the overlap of its bounding box with the block, which is
+    exact for triangles inside or outside the block and approximate for the ones crossing it.
+
+    Args:
+        surface (stlSurface): The surface.
+        blockmesh_props (dict[str, any]): The background block.
+    Returns:
+        dict[str, float]: Area of each region.
+    """
+    t = surface.triangles
+    lo, hi = t.min(axis=1), t.max(axis=1)
+    fraction = np.ones(len(t))
+    for axis, name in enumerate("xyz"):
+        start, end = (blockmesh_props["scale"]*v for v in blockmesh_props[f"{name}_range"])
+        width = hi[:, axis] - lo[:, axis]
+        overlap = np.clip(np.minimum(hi[:, axis], end) - np.maximum(lo[:, axis], start), 0.0, None)
+        inside = (lo[:, axis] >= start) & (lo[:, axis] <= end)
+        fraction *= np.where(width > 0, overlap/np.where(width > 0, width, 1.0), inside)
+    areas = surface.areas()*fraction
+    return {name: float(areas[s].sum()) for name, s in surface.regions.items()}
+
+
+class costModel:
+    """Estimate of the cell count, memory and run time of a snappyHexMesh case, calibrated from past runs.
+
+    The background block gives the base cell count. Around the STL, the cells of each refinement level l
+    fill a band of `nCellsBetweenLevels` cells of size h/2^l, where h is the background cell size, so the
+    count grows with the STL area inside the block and the maximum level of its regions. The volume of
+    a closed STL inside the block is removed. refinementRegions are not modeled.
+
+    Calibration (`record` and `calibrate`) scales the geometric estimate by the observed ratio of actual to
+    estimated cells and fits the memory per cell and the time per cell and time step.
+
+    Attributes:
+        path (str): JSON file where the records of past runs are kept. None keeps them in memory.
+        records (list[dict]): Past runs with "estimated_cells", "n_cells", "n_procs", "mesh_rss_bytes"
+            (peak per process) and "seconds_per_step" (wall time per time step).
+        cell_factor (float): Ratio of actual to estimated cell counts.
+        mesh_bytes_per_cell (float): Peak snappyHexMesh memory per cell, over all processes.
+        solver_bytes_per_cell (float): Solver memory per cell, over all processes.
+        process_bytes (float): Memory of each process independent of the cells.
+        seconds_per_cell_step (float): Wall time per cell and time step on one processor.
+        seconds_per_step (float): Wall time per time step independent of the cells (I/O, communication).
+    """
+    def __init__(self,
+                path:str = None,
+                mesh_bytes_per_cell:float = 2000.0,
+                solver_bytes_per_cell:float = 1000.0,
+                process_bytes:float = 200e6,
+                seconds_per_cell_step:float = 2e-6,
+                )->None:
+        self.path = path
+        self.records = []
+        self.cell_factor = 1.0
+        self.mesh_bytes_per_cell = mesh_bytes_per_cell
+        self.solver_bytes_per_cell = solver_bytes_per_cell
+        self.process_bytes = process_bytes
+        self.seconds_per_cell_step = seconds_per_cell_step
+        self.seconds_per_step = 0.0
+        if self.path is not None and os.path.isfile(self.path):
+            with open(self.path) as file:
+                self.records = json.load(file)
+            self.calibrate()
+
+    def geometric_cells(self, mesher:any, surface:stlSurface = None)->dict[str, float]:
+        """Uncalibrated cell counts of a snappyHexMesh mesher.
+
+        Args:
+            mesher (snappyHexMesh): The mesher.
+            surface (stlSurface, optional): The STL of the mesher. Defaults to reading `mesher.stlFile`.
+        Returns:
+            dict[str, float]: "background_cells", "refined_cells" (added by refinement), "removed_cells"
+                (inside the STL) and "n_cells".
+        """
+        props = mesher.blockmesh_props
+        controls = mesher.castellatedMeshControls_props
+        surface = read_stl(mesher.stlFile) if surface is None else surface
+        nums = np.array([props[f"{n}_num"] for n in "xyz"], dtype=np.float64)
+        extents = np.array([props["scale"]*(props[f"{n}_range"][1] - props[f"{n}_range"][0]) for n in "xyz"])
+        background = float(nums.prod())
+        h = float(np.prod(extents/nums))**(1/3)
+        domain_volume = float(extents.prod())
+
+        lo, hi = surface.bounds()
+        body_volume = 0.0
+        if surface.is_closed():
+            box = np.array([min(hi[i], props["scale"]*props[f"{n}_range"][1]) - max(lo[i], props["scale"]*props[f"{n}_range"][0])
+                            for i, n in enumerate("xyz")])
+            body_volume = surface.volume()*float(np.clip(box, 0.0, None).prod()/max(np.prod(hi - lo), 1e-300))
+        fluid_volume = max(domain_volume - body_volume, 0.0)
+
+        n_between = controls.get("nCellsBetweenLevels", 1)
+        entry = controls.get("refinementSurfaces", {}).get(mesher.stlName, {})
+        default_level = surface_level(entry.get("level", "(0 0)"))
+        region_levels = {name: surface_level(r.get("level", "(0 0)")) for name, r in entry.get("regions", {}).items()}
+        refined = 0.0
+        for region, area in clipped_areas(surface, props).items():
+            level = region_levels.get(region, default_level)
+            # Distance from the surface below which cells are at least at level l.
+            distances = np.cumsum([n_between*h/2**l for l in range(level, 0, -1)])[::-1]
+            for l in range(1, level + 1):
+                band = min(area*distances[l - 1], fluid_volume)
+                # Splitting the band of level l-1 cells into level l cells adds 7 cells per cell.
+                refined += 7*band/(h/2**(l - 1))**3
+        removed = body_volume/h**3
+        return {"background_cells": background, "refined_cells": float(refined), "removed_cells": removed,
+                "n_cells": float(max(background + refined - removed, 1.0))}
+
+    def estimate(self, mesher:any, n_procs:int = None, surface:stlSurface = None)->dict[str, float]:
+        """Calibrated estimate of a snappyHexMesh mesher.
+
+        Args:
+            mesher (snappyHexMesh): The mesher.
+            n_procs (int, optional): Number of processors. Defaults to `mesher.n_procs`.
+            surface (stlSurface, optional): The STL of the mesher. Defaults to reading `mesher.stlFile`.
+        Returns:
+            dict[str, float]: "n_cells", "estimated_cells" (uncalibrated), "mesh_memory_bytes",
+                "solver_memory_bytes" and "seconds_per_step" for `n_procs` processors.
+        """
+        n_procs = mesher.n_procs if n_procs is None else n_procs
+        estimated = self.geometric_cells(mesher, surface)["n_cells"]
+        n_cells = self.cell_factor*estimated
+        return {
+            "n_cells": n_cells,
+            "estimated_cells": estimated,
+            "n_procs": n_procs,
+            "mesh_memory_bytes": self.mesh_bytes_per_cell*n_cells + self.process_bytes*n_procs,
+            "solver_memory_bytes": self.solver_bytes_per_cell*n_cells + self.process_bytes*n_procs,
+            "seconds_per_step": self.seconds_per_cell_step*n_cells/n_procs + self.seconds_per_step,
+        }
+
+    def choose_procs(self, n_cells:float, cells_per_proc:int = 50_000, max_procs:int = None)->int:
+        """Largest processor count keeping at least `cells_per_proc` cells per processor.
+
+        Args:
+            n_cells (float): Number of cells.
+            cells_per_proc (int, optional): Minimum number of cells per processor. Defaults to 50_000.
+            max_procs (int, optional): Maximum number of processors. Defaults to os.cpu_count().
+        Returns:
+            int: The number of processors.
+        """
+        max_procs = os.cpu_count() if max_procs is None else max_procs
+        return int(min(max(n_cells//cells_per_proc, 1), max_procs))
+
+    def apply(self, case:any, cells_per_proc:int = 50_000, max_procs:int = None, memory_bytes:int = None, headroom:float = 2.0)->dict[str, float]:
+        """Set the processor counts of a case and the cell limits of its snappyHexMesh from the estimate.
+
+        `maxGlobalCells` is the estimate times `headroom`, bounded by the memory of the node, and
+        `maxLocalCells` its share per processor.
+
+        Args:
+            case (coreFoam): The application, whose mesher is a snappyHexMesh.
+            cells_per_proc (int, optional): Minimum number of cells per processor. Defaults to 50_000.
+            max_procs (int, optional): Maximum number of processors. Defaults to os.cpu_count().
+            memory_bytes (int, optional): Memory available to the case. Defaults to the physical memory of the node.
+            headroom (float, optional): Ratio of maxGlobalCells to the estimated cell count. Defaults to 2.0.
+        Returns:
+            dict[str, float]: The estimate for the chosen processor count, with "maxGlobalCells" and "maxLocalCells".
+        Raises:
+            ValueError: If the meshing or the solver is not expected to fit in `memory_bytes`.
+        """
+        memory_bytes = node_memory() if memory_bytes is None else memory_bytes
+        surface = read_stl(case.mesher.stlFile)
+        n_cells = self.estimate(case.mesher, 1, surface)["n_cells"]
+        n_procs = self.choose_procs(n_cells, cells_per_proc, max_procs)
+        estimate = self.estimate(case.mesher, n_procs, surface)
+        peak = max(estimate["mesh_memory_bytes"], estimate["solver_memory_bytes"])
+        if peak > memory_bytes:
+            raise ValueError(f"The case needs about {peak/2**30:.1f} GiB for {n_cells:.3g} cells, "
+                            f"more than the {memory_bytes/2**30:.1f} GiB available.")
+        max_global = min(headroom*n_cells, (memory_bytes - self.process_bytes*n_procs)/self.mesh_bytes_per_cell)
+        max_global = int(max(max_global, n_cells))
+        controls = case.mesher.castellatedMeshControls_props
+        controls["maxGlobalCells"] = max_global
+        controls["maxLocalCells"] = math.ceil(max_global/n_procs)
+        case.mesher.n_procs = n_procs
+        case.n_procs = n_procs
+        estimate.update({"maxGlobalCells": controls["maxGlobalCells"], "maxLocalCells": controls["maxLocalCells"]})
+        return estimate
+
+    def record(self, case:any, log:any = None, mesh_rss_bytes:float = None, seconds_per_step:float = None)->dict[str, any]:
+        """Add a finished run to the records and recalibrate.
+
+        Args:
+            case (coreFoam): The meshed (and possibly solved) application.
+            log (solverLog, optional): Log of the solver run, giving the wall time per time step. Defaults to None.
+            mesh_rss_bytes (float, optional): Peak memory of a snappyHexMesh process. Defaults to the
+                largest one traced for the case (see pifoam.trace), if any.
+            seconds_per_step (float, optional): Wall time per time step, overriding `log`. Defaults to None.
+        Returns:
+            dict[str, any]: The record.
+        """
+        from pifoam.io.polyMesh import polyMesh
+        if mesh_rss_bytes is None:
+            traced = [e["args"].get("max_rss_kb", 0) for e in trace.events
+                    if e["cat"] == "process" and "snappyHexMesh" in e["args"].get("command", "")
+                    and trace.case_of(e["args"]["command"].split()) == case.case_dir]
+            mesh_rss_bytes = 1024.0*max(traced) if traced else None
+        if seconds_per_step is None and log is not None and log.n_steps >= 2:
+            # ClockTime is printed in whole seconds: short runs are timed by the ExecutionTime of their steps.
+            # The first step is left out, since it also holds the start-up of the solver.
+            clock = log["clock_time"]
+            if clock[-1] - clock[0] >= 10.0:
+                seconds_per_step = float(clock[-1] - clock[0])/(len(clock) - 1)
+            else:
+                seconds_per_step = float(np.nanmean(log.execution_time_per_step()[1:]))
+        record = {
+            "case_dir": case.case_dir,
+            "estimated_cells": self.geometric_cells(case.mesher)["n_cells"],
+            "n_cells": polyMesh(case.case_dir).n_cells,
+            "n_procs": case.n_procs,
+            "mesh_procs": case.mesher.n_procs,
+            "mesh_rss_bytes": mesh_rss_bytes,
+            "seconds_per_step": seconds_per_step,
+        }
+        self.records.append(record)
+        self.calibrate()
+        self.save()
+        return record
+
+    def save(self)->None:
+        if self.path is None:
+            return
+        with open(f"{self.path}.pifoam-tmp", "w") as file:
+            json.dump(self.records, file, indent=1)
+        os.replace(f"{self.path}.pifoam-tmp", self.path)
+
+    def calibrate(self)->None:
+        """Fit the coefficients of the model to the records.
+
+        The cell factor is the geometric mean of the actual to estimated ratios. The memory per cell is the
+        largest observed one, so that the limits stay conservative. The time per step is fitted as
+        `seconds_per_cell_step*n_cells/n_procs + seconds_per_step` by least squares.
+        """
+        cells = [r for r in self.records if r["n_cells"] > 0 and r["estimated_cells"] > 0]
+        if cells:
+            self.cell_factor = float(np.exp(np.mean([np.log(r["n_cells"]/r["estimated_cells"]) for r in cells])))
+        memory = [r for r in cells if r.get("mesh_rss_bytes")]
+        if memory:
+            self.mesh_bytes_per_cell = max(max(r["mesh_rss_bytes"] - self.process_bytes, 0.0)*r["mesh_procs"]/r["n_cells"] for r in memory) or self.mesh_bytes_per_cell
+        timed = [r for r in cells if r.get("seconds_per_step")]
+        if not timed:
+            return
+        x = np.array([r["n_cells"]/r["n_procs"] for r in timed])
+        y = np.array([r["seconds_per_step"] for r in timed])
+        if len(np.unique(x)) >= 2:
+            slope, intercept = np.polyfit(x, y, 1)
+            if slope > 0 and intercept >= 0:
+                self.seconds_per_cell_step, self.seconds_per_step = float(slope), float(intercept)
+                return
+        self.seconds_per_cell_step, self.seconds_per_step = float(np.median(y/x)), 0.0
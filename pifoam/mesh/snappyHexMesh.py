@@ -1,11 +1,15 @@
 from pifoam.mesh.core import coreMesher
+from pifoam.mesh.cache import meshCache
+from pifoam.mesh.stl import read_stl
+import asyncio
+import hashlib
 import os
 import shutil
-from pifoam.system.blockMeshDict import run_blockMesh, write_blockMeshDict
-from pifoam.system.meshQualityDict import write_meshQualityDict
+from pifoam.system.blockMeshDict import run_blockMesh, run_blockMesh_async, render_blockMeshDict
+from pifoam.system.meshQualityDict import render_meshQualityDict
+from pifoam.system.decomposeParDict import write_decomposeParDict, parallel_command, run_decomposePar, run_decomposePar_async, run_reconstructParMesh, run_reconstructParMesh_async
 import sys
-from pifoam import utils
-import subprocess
+from pifoam import utils, trace
 
 class snappyHexMesh(coreMesher):
     """Mesh generator using snappyHexMesh.
@@ -21,6 +25,11 @@ class snappyHexMesh(coreMesher):
             x_num (int): Number of cells in the X direction for blockMesh.
             y_num (int): Number of cells in the Y direction for blockMesh.
             z_num (int): Number of cells in the Z direction for blockMesh.
+        n_procs (int): Number of processors. snappyHexMesh runs under mpirun when it is larger than 1.
+        decompose_method (str): Decomposition method for decomposePar.
+        cache (meshCache): Mesh cache shared across cases. None disables caching.
+        feature_angle (float): Feature angle in degrees of the edges extracted from the STL into
+            constant/triSurface/<stlName>.eMesh for explicit feature snapping. None disables features.
     """
     def __init__(self,
                 boundary_types:dict[str,str],
@@ -31,12 +40,21 @@ class snappyHexMesh(coreMesher):
                 castellatedMeshControls_props:dict = None,
                 snapControls_prop:dict = None,
                 addLayersControls_prop:dict = None,
+                n_procs:int = 1,
+                decompose_method:str = "scotch",
+                cache:meshCache = None,
+                feature_angle:float = None,
                 )->None:
         super().__init__(boundary_types)
+        self.n_procs = n_procs
+        self.decompose_method = decompose_method
+        self.cache = cache
         self.stlFile = stlFile
         self.stlName = self.stlFile.split("/")[-1][:-4]
         self.blockmesh_props = blockmesh_props
         self.stage_tag = stage_tag
+        self.feature_angle = feature_angle
+        self.eMesh = None
 
         self.stl_surfacename = [key for key in self.boundary_types.keys() if key not in ("top", "bottom", "east", "west", "north", "south")]
         self.castellatedMeshControls_props = self.default_castellatedMeshControls(locationInMesh) if castellatedMeshControls_props is None else castellatedMeshControls_props
@@ -85,7 +103,7 @@ class snappyHexMesh(coreMesher):
             "minRefinementCells" : 10,
             "maxLoadUnbalance" : 0.10,
             "nCellsBetweenLevels" : 2,
-            "features" : " ( )", #Hard coding. Assuming no features.
+            "features" : " ( )" if self.feature_angle is None else f' ( {{ file "{self.stlName}.eMesh"; level 0; }} )',
             "refinementSurfaces":{
                 self.stlName:{
                     "level":"(0 0)",
@@ -100,48 +118,190 @@ class snappyHexMesh(coreMesher):
                     }
                 }
             },
-            "resolveFeatureAngle" : 30.0,
+            "resolveFeatureAngle" : 30.0 if self.feature_angle is None else self.feature_angle,
             "refinementRegions" : {},
             "allowFreeStandingZoneFaces" : "true",
             "locationInMesh" : utils.tupleToDict(locationInMesh),
         }
 
-    def write(self, case_dir:str)->None:
-        os.makedirs(f"{case_dir}/constant/triSurface", exist_ok=False)
-        shutil.copy2(self.stlFile, f"{case_dir}/constant/triSurface")
+    @classmethod
+    def from_stl(cls,
+                boundary_types:dict[str,str],
+                stlFile:str,
+                cell_size:float,
+                padding:tuple[float, ...] = (5.0, 15.0, 5.0, 5.0, 5.0, 5.0),
+                empty_axis:int = None,
+                empty_range:tuple[float, float] = None,
+                feature_angle:float = 30.0,
+                **kwargs,
+                )->"snappyHexMesh":
+        """Mesher whose background block and locationInMesh are derived from the STL.
+
+        Args:
+            boundary_types (dict[str,str]): Dictionary defining the boundary types.
+            stlFile (str): Path to the STL file.
+            cell_size (float): Edge length of the background cells.
+            padding (tuple[float, ...], optional): Distance between the STL and the domain boundary at
+                (x_min, x_max, y_min, y_max, z_min, z_max), in multiples of the largest extent of the STL.
+                Defaults to (5.0, 15.0, 5.0, 5.0, 5.0, 5.0).
+            empty_axis (int, optional): Axis with a single cell for 2D cases, e.g. 2 for z. Defaults to None.
+            empty_range (tuple[float, float], optional): Range along `empty_axis`. Defaults to one cell around the STL centre.
+            feature_angle (float, optional): Feature angle in degrees. None disables features. Defaults to 30.0.
+            **kwargs: Other arguments of `snappyHexMesh`.
+        Returns:
+            snappyHexMesh: The mesher.
+        """
+        surface = read_stl(stlFile)
+        blockmesh_props = surface.blockmesh_props(cell_size, padding, empty_axis, empty_range)
+        locationInMesh = surface.location_outside(blockmesh_props)
+        return cls(boundary_types, stlFile, locationInMesh, blockmesh_props, feature_angle=feature_angle, **kwargs)
+
+    def render_eMesh(self, stl:bytes)->str:
+        """Feature edges of the STL, reused while the STL and the feature angle are unchanged."""
+        key = (hashlib.sha1(stl).hexdigest(), self.feature_angle)
+        if self.eMesh is None or self.eMesh[0] != key:
+            content = read_stl(self.stlFile).render_eMesh(f"{self.stlName}.eMesh", self.feature_angle)
+            self.eMesh = (key, content)
+        return self.eMesh[1]
+
+    def render_snappyHexMeshDict(self)->str:
+        buffer = [utils.foam_header("dictionary", "system", "snappyHexMeshDict")]
+        buffer.append(f"castellatedMesh\t{self.stage_tag['castellatedMesh']};\n")
+        buffer.append(f"snap\t{self.stage_tag['snap']};\n")
+        buffer.append(f"addLayers\t{self.stage_tag['addLayers']};\n")
+        buffer.append(utils.format_dict({f"{self.stlName}.stl": {"type": "triSurfaceMesh", "name":self.stlName}}, "geometry"))
+        buffer.append(utils.format_dict(self.castellatedMeshControls_props, "castellatedMeshControls"))
+        buffer.append(utils.format_dict(self.snapControls_prop, "snapControls"))
+        buffer.append(utils.format_dict(self.addLayersControls_prop, "addLayersControls"))
+        buffer.append("meshQualityControls\n{\n")
+        buffer.append("#include \"meshQualityDict\"\n")
+        buffer.append("nSmoothScale\t4;\n")
+        buffer.append("errorReduction\t0.75;\n")
+        buffer.append("}\n")
+        buffer.append("mergeTolerance\t1e-6;\n")
+        return "".join(buffer)
 
+    def case_files(self)->dict[str, str|bytes]:
+        """Build the content of every file written by the mesher in memory.
+
+        Returns:
+            dict[str, str|bytes]: Content of each file, keyed on the path relative to the case directory.
+        """
+        with open(self.stlFile, "rb") as file:
+            stl = file.read()
         boundary_types_blockMesh = {key:self.boundary_types[key] for key in ["top", "bottom", "north", "south", "east", "west"]}
-        write_blockMeshDict(case_dir,
-                            scale=self.blockmesh_props["scale"],
-                            x_range=self.blockmesh_props["x_range"],
-                            y_range=self.blockmesh_props["y_range"],
-                            z_range=self.blockmesh_props["z_range"],
-                            x_num=self.blockmesh_props["x_num"],
-                            y_num=self.blockmesh_props["y_num"],
-                            z_num=self.blockmesh_props["z_num"],
-                            boundary_types=boundary_types_blockMesh)
-
-        write_meshQualityDict(case_dir)
-        with open(f"{case_dir}/system/snappyHexMeshDict", "w") as file:
-            utils.write_format(file, {"version": 2.0, "format": "ascii", "class": "dictionary", "location": "system", "object": "snappyHexMeshDict"}, "FoamFile")
-            file.write(f"castellatedMesh\t{self.stage_tag['castellatedMesh']};\n")
-            file.write(f"snap\t{self.stage_tag['snap']};\n")
-            file.write(f"addLayers\t{self.stage_tag['addLayers']};\n")
-            utils.write_format(file, {f"{self.stlName}.stl": {"type": "triSurfaceMesh", "name":self.stlName}}, "geometry")
-            utils.write_format(file, self.castellatedMeshControls_props, "castellatedMeshControls")
-            utils.write_format(file, self.snapControls_prop, "snapControls")
-            utils.write_format(file, self.addLayersControls_prop, "addLayersControls")
-            file.write("meshQualityControls\n{\n")
-            file.write("#include \"meshQualityDict\"\n")
-            file.write("nSmoothScale\t4;\n")
-            file.write("errorReduction\t0.75;\n")
-            file.write("}\n")
-            file.write("mergeTolerance\t1e-6;\n")
-    
-    def run(self, case_dir:str)->None:
-        self.write(case_dir)
-        run_blockMesh(case_dir)
-        subprocess.run(["snappyHexMesh", "-case", case_dir, "-overwrite"], stdout=subprocess.DEVNULL)
+        files = {
+            f"constant/triSurface/{self.stlName}.stl": stl,
+            "system/blockMeshDict": render_blockMeshDict(
+                                scale=self.blockmesh_props["scale"],
+                                x_range=self.blockmesh_props["x_range"],
+                                y_range=self.blockmesh_props["y_range"],
+                                z_range=self.blockmesh_props["z_range"],
+                                x_num=self.blockmesh_props["x_num"],
+                                y_num=self.blockmesh_props["y_num"],
+                                z_num=self.blockmesh_props["z_num"],
+                                boundary_types=boundary_types_blockMesh),
+            "system/meshQualityDict": render_meshQualityDict(),
+            "system/snappyHexMeshDict": self.render_snappyHexMeshDict(),
+        }
+        if self.feature_angle is not None:
+            files[f"constant/triSurface/{self.stlName}.eMesh"] = self.render_eMesh(stl)
+        return files
+
+    def run(self, case_dir:str, reconstruct:bool = True)->int:
+        """Write the dictionaries and generate the mesh.
+
+        Args:
+            case_dir (str): The directory of the OpenFOAM case.
+            reconstruct (bool, optional): Whether to run reconstructParMesh after a parallel run. Defaults to True.
+        Returns:
+            int: The exit code of the first failing stage, or 0.
+        """
+        with trace.span("mesh", "stage", case_dir, mesher="snappyHexMesh", n_procs=self.n_procs) as s:
+            key = self.prepare(case_dir)
+            if key is not None and self.cache.fetch(key, case_dir):
+                if s is not None:
+                    s.args.update({"returncode": 0, "cache_hit": True})
+                return 0
+            returncode = self.run_mesh(case_dir, reconstruct)
+            self.finish(case_dir, key, returncode, reconstruct)
+            if s is not None:
+                s.args["returncode"] = returncode
+        return returncode
+
+    async def run_async(self, case_dir:str, reconstruct:bool = True, timeout:float = None)->int:
+        """Asynchronous version of `run`. Cancelling it kills the running OpenFOAM process tree.
+
+        Args:
+            case_dir (str): The directory of the OpenFOAM case.
+            reconstruct (bool, optional): Whether to run reconstructParMesh after a parallel run. Defaults to True.
+            timeout (float, optional): Time limit in seconds for the whole meshing. Defaults to None.
+        Returns:
+            int: The exit code of the first failing stage, or 0.
+        Raises:
+            asyncio.TimeoutError: If meshing did not finish within `timeout`.
+        """
+        with trace.span("mesh", "stage", case_dir, mesher="snappyHexMesh", n_procs=self.n_procs) as s:
+            key = self.prepare(case_dir)
+            if key is not None and self.cache.fetch(key, case_dir):
+                if s is not None:
+                    s.args.update({"returncode": 0, "cache_hit": True})
+                return 0
+            returncode = await asyncio.wait_for(self.run_mesh_async(case_dir, reconstruct), timeout)
+            self.finish(case_dir, key, returncode, reconstruct)
+            if s is not None:
+                s.args["returncode"] = returncode
+        return returncode
+
+    def prepare(self, case_dir:str)->str|None:
+        """Write the mesher files and remove the old mesh.
+
+        Returns:
+            str|None: The mesh cache key, or None without cache.
+        """
+        files = self.case_files()
+        utils.write_files(case_dir, files)
+        key = None if self.cache is None else self.cache.key(files)
+        if key is None or not self.cache.contains(key):
+            # Remove the old mesh so that files shared with the cache are never overwritten in place.
+            shutil.rmtree(f"{case_dir}/constant/polyMesh", ignore_errors=True)
+        return key
+
+    def finish(self, case_dir:str, key:str|None, returncode:int, reconstruct:bool)->None:
+        if returncode == 0 and key is not None and (self.n_procs == 1 or reconstruct):
+            self.cache.store(key, case_dir)
+
+    def run_mesh(self, case_dir:str, reconstruct:bool = True)->int:
+        returncode = run_blockMesh(case_dir)
+        if returncode != 0:
+            return returncode
+        if self.n_procs == 1:
+            return utils.run_command(["snappyHexMesh", "-case", case_dir, "-overwrite"])
+
+        write_decomposeParDict(case_dir, self.n_procs, self.decompose_method)
+        returncode = run_decomposePar(case_dir)
+        if returncode != 0:
+            return returncode
+        returncode = utils.run_command(parallel_command(["snappyHexMesh", "-case", case_dir, "-overwrite"], self.n_procs))
+        if returncode == 0 and reconstruct:
+            returncode = run_reconstructParMesh(case_dir)
+        return returncode
+
+    async def run_mesh_async(self, case_dir:str, reconstruct:bool = True)->int:
+        returncode = await run_blockMesh_async(case_dir)
+        if returncode != 0:
+            return returncode
+        if self.n_procs == 1:
+            return await utils.run_command_async(["snappyHexMesh", "-case", case_dir, "-overwrite"])
+
+        write_decomposeParDict(case_dir, self.n_procs, self.decompose_method)
+        returncode = await run_decomposePar_async(case_dir)
+        if returncode != 0:
+            return returncode
+        returncode = await utils.run_command_async(parallel_command(["snappyHexMesh", "-case", case_dir, "-overwrite"], self.n_procs))
+        if returncode == 0 and reconstruct:
+            returncode = await run_reconstructParMesh_async(case_dir)
+        return returncode
     
     def get_boundary_names(self)->list[str]:
         boundary_names = ["top", "bottom", "north", "south", "east", "west"]
@@ -0,0 +1,271 @@
+import math
+import re
+import numpy as np
+from pifoam import utils
+
+_solid_re = re.compile(rb"^[ \t]*solid[ \t]*([^\r\n]*)$(.*?)^[ \t]*endsolid[^\n]*$", re.MULTILINE | re.DOTALL)
+_vertex_re = re.compile(rb"vertex\s+(\S+\s+\S+\s+\S+)")
+
+
+class stlSurface:
+    """Triangulated surface read from an STL file, with vectorized geometry.
+
+    Attributes:
+        points (np.ndarray): (n_points, 3) unique vertices.
+        faces (np.ndarray): (n_triangles, 3) vertex labels of each triangle.
+        regions (dict[str, slice]): Triangles of each solid of the file.
+    """
+    def __init__(self, triangles:np.ndarray, regions:dict[str, slice] = None, merge_tolerance:float = 1e-9)->None:
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+        self.regions = {"surface": slice(0, len(triangles))} if regions is None else regions
+        # Merge coincident vertices so that neighbouring triangles share edges.
+        scale = max(float(np.abs(triangles).max(initial=0.0)), 1.0)*merge_tolerance
+        keys = np.round(triangles.reshape(-1, 3)/scale).astype(np.int64)
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        self.points = triangles.reshape(-1, 3)[first]
+        self.faces = inverse.reshape(-1, 3)
+
+    @property
+    def n_triangles(self)->int:
+        return len(self.faces)
+
+    @property
+    def triangles(self)->np.ndarray:
+        """np.ndarray: (n_triangles, 3, 3) vertex coordinates of each triangle."""
+        return self.points[self.faces]
+
+    def bounds(self)->tuple[np.ndarray, np.ndarray]:
+        """Lower and upper corners of the bounding box."""
+        return self.points.min(axis=0), self.points.max(axis=0)
+
+    def face_region(self)->np.ndarray:
+        """np.ndarray: Index into `regions` of each triangle."""
+        region = np.empty(self.n_triangles, dtype=np.int64)
+        for i, s in enumerate(self.regions.values()):
+            region[s] = i
+        return region
+
+    def normals(self)->np.ndarray:
+        """np.ndarray: (n_triangles, 3) unit normals, oriented by the vertex order."""
+        t = self.triangles
+        n = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0])
+        return n/np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-300)
+
+    def areas(self)->np.ndarray:
+        t = self.triangles
+        return 0.5*np.linalg.norm(np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0]), axis=1)
+
+    def volume(self)->float:
+        """Enclosed volume of a closed surface, by the divergence theorem."""
+        t = self.triangles
+        return abs(float(np.einsum("ij,ij->i", t[:, 0], np.cross(t[:, 1], t[:, 2])).sum()))/6.0
+
+    def edges(self)->tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Unique edges and the triangles using them.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: (n_edges, 2) point labels, CSR offsets (n_edges+1,)
+                and the flat labels of the triangles of each edge.
+        """
+        e = np.sort(np.stack([self.faces, np.roll(self.faces, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+        edges, inverse = np.unique(e, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind="stable")
+        offsets = np.zeros(len(edges) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(inverse, minlength=len(edges)), out=offsets[1:])
+        return edges, offsets, order//3
+
+    def feature_edges(self, angle:float = 30.0)->np.ndarray:
+        """Edges where the surface turns by more than `angle` degrees, plus open, non-manifold and region boundary edges.
+
+        Args:
+            angle (float, optional): Feature angle in degrees, like resolveFeatureAngle. Defaults to 30.0.
+        Returns:
+            np.ndarray: (n_features, 2) point labels of the feature edges.
+        """
+        edges, offsets, edge_faces = self.edges()
+        counts = np.diff(offsets)
+        manifold = counts == 2
+        f0 = edge_faces[offsets[:-1][manifold]]
+        f1 = edge_faces[offsets[:-1][manifold] + 1]
+        normals = self.normals()
+        cos = np.einsum("ij,ij->i", normals[f0], normals[f1])
+        region = self.face_region()
+        feature = ~manifold
+        feature[manifold] = (cos < math.cos(math.radians(angle))) | (region[f0] != region[f1])
+        return edges[feature]
+
+    def is_closed(self)->bool:
+        """Whether every edge is shared by exactly two triangles."""
+        _, offsets, _ = self.edges()
+        return bool(np.all(np.diff(offsets) == 2))
+
+    def render_eMesh(self, name:str, angle:float = 30.0)->str:
+        """Serialize the feature edges as an OpenFOAM featureEdgeMesh, like surfaceFeatureExtract.
+
+        Args:
+            name (str): File name, e.g. "cylinder.eMesh".
+            angle (float, optional): Feature angle in degrees. Defaults to 30.0.
+        Returns:
+            str: The content of the .eMesh file.
+        """
+        edges = self.feature_edges(angle)
+        used, edges = np.unique(edges, return_inverse=True)
+        edges = edges.reshape(-1, 2)
+        points = self.points[used]
+        buffer = [utils.foam_header("featureEdgeMesh", "constant/triSurface", name)]
+        buffer.append(f"{len(points)}\n(\n")
+        buffer.append(("(%.10g %.10g %.10g)\n"*len(points)) % tuple(points.ravel().tolist()))
+        buffer.append(f")\n\n{len(edges)}\n(\n")
+        buffer.append(("(%d %d)\n"*len(edges)) % tuple(edges.ravel().tolist()))
+        buffer.append(")\n")
+        return "".join(buffer)
+
+    def contains(self, x:np.ndarray)->np.ndarray:
+        """Whether points are inside the closed surface, by the parity of ray crossings.
+
+        Args:
+            x (np.ndarray): (m, 3) points.
+        Returns:
+            np.ndarray: (m,) booleans.
+        """
+        x = np.asarray(x, dtype=np.float64).reshape(-1, 3)
+        t = self.triangles
+        # An irrational direction avoids rays grazing edges and vertices of axis-aligned surfaces.
+        d = np.array([1.0, math.sqrt(2.0) - 1.0, math.pi - 3.0])
+        e1, e2 = t[:, 1] - t[:, 0], t[:, 2] - t[:, 0]
+        p = np.cross(d, e2)
+        det = np.einsum("ij,ij->i", e1, p)
+        valid = np.abs(det) > 1e-300
+        inv = np.where(valid, 1.0/np.where(valid, det, 1.0), 0.0)
+        inside = np.empty(len(x), dtype=bool)
+        for i, point in enumerate(x):
+            s = point - t[:, 0]
+            u = np.einsum("ij,ij->i", s, p)*inv
+            q = np.cross(s, e1)
+            v = (q @ d)*inv
+            dist = np.einsum("ij,ij->i", e2, q)*inv
+            hits = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (dist > 0)
+            inside[i] = hits.sum() % 2 == 1
+        return inside
+
+    def distance(self, x:np.ndarray)->np.ndarray:
+        """Lower bound of the distance from points to the surface: the distance to the nearest
+        triangle centroid minus the largest centroid-to-vertex distance of the triangles."""
+        x = np.asarray(x, dtype=np.float64).reshape(-1, 3)
+        t = self.triangles
+        centroids = t.mean(axis=1)
+        radius = np.linalg.norm(t - centroids[:, None, :], axis=2).max(initial=0.0)
+        d = np.array([np.sqrt(np.min(np.sum((centroids - point)**2, axis=1))) for point in x])
+        return np.maximum(d - radius, 0.0)
+
+    def blockmesh_props(self,
+                        cell_size:float,
+                        padding:tuple[float, ...] = (5.0, 15.0, 5.0, 5.0, 5.0, 5.0),
+                        empty_axis:int = None,
+                        empty_range:tuple[float, float] = None,
+                        )->dict[str, any]:
+        """Background block sized around the surface for a target cell size.
+
+        Args:
+            cell_size (float): Edge length of the background cells.
+            padding (tuple[float, ...], optional): Distance between the surface and the domain boundary at
+                (x_min, x_max, y_min, y_max, z_min, z_max), in multiples of the largest extent of the
+                surface outside `empty_axis`. Defaults to (5.0, 15.0, 5.0, 5.0, 5.0, 5.0).
+            empty_axis (int, optional): Axis with a single cell for 2D cases, e.g. 2 for z. Defaults to None.
+            empty_range (tuple[float, float], optional): Range along `empty_axis`. Defaults to one cell around the centre of the surface.
+        Returns:
+            dict[str, any]: blockmesh_props for `snappyHexMesh`. Ranges are widened so that they hold a whole number of cells.
+        """
+        lo, hi = self.bounds()
+        extent = np.delete(hi - lo, [] if empty_axis is None else [empty_axis])
+        size = float(extent.max())
+        props = {"scale": 1.0}
+        for axis, name in enumerate("xyz"):
+            if axis == empty_axis:
+                centre = 0.5*(lo[axis] + hi[axis])
+                r = (centre - 0.5*cell_size, centre + 0.5*cell_size) if empty_range is None else tuple(empty_range)
+                props[f"{name}_range"] = (float(r[0]), float(r[1]))
+                props[f"{name}_num"] = 1
+                continue
+            start = lo[axis] - padding[2*axis]*size
+            end = hi[axis] + padding[2*axis + 1]*size
+            n = max(1, math.ceil((end - start)/cell_size - 1e-9))
+            extra = 0.5*(n*cell_size - (end - start))
+            props[f"{name}_range"] = (float(start - extra), float(end + extra))
+            props[f"{name}_num"] = n
+        return props
+
+    def location_outside(self, blockmesh_props:dict[str, any], clearance:float = 2.0)->tuple[float, float, float]:
+        """A point of the background block which is outside the surface, away from it and off the cell faces.
+
+        Candidates are placed on a lattice of the background cells, shifted off the cell faces (snappyHexMesh
+        fails when locationInMesh lies on a face). Points outside the bounding box of the surface are
+        preferred; the candidate farthest from the surface and the domain boundary is returned.
+
+        Args:
+            blockmesh_props (dict[str, any]): The background block.
+            clearance (float, optional): Minimum distance to the surface and the domain boundary, in background cells. Defaults to 2.0.
+        Returns:
+            tuple[float, float, float]: The point, for `locationInMesh`.
+        Raises:
+            ValueError: If no point of the block is outside the surface.
+        """
+        ranges = [blockmesh_props[f"{n}_range"] for n in "xyz"]
+        nums = [blockmesh_props[f"{n}_num"] for n in "xyz"]
+        widths = np.array([(r[1] - r[0])/n for r, n in zip(ranges, nums)])
+        # Fractions that are not simple ratios keep the candidates off the faces of refined cells too.
+        fraction = np.array([0.5 + 1/7, 0.5 - 1/11, 0.5 + 1/13])
+        axes = []
+        for r, n, w, f in zip(ranges, nums, widths, fraction):
+            idx = np.unique(np.linspace(0, n - 1, min(n, 16)).round().astype(np.int64))
+            axes.append(r[0] + (idx + f)*w)
+        candidates = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+        lo, hi = self.bounds()
+        wall = np.stack([candidates - [r[0] for r in ranges], [r[1] for r in ranges] - candidates]).min(axis=0)
+        # Walls of single-cell directions (2D cases) do not constrain the point.
+        wall = np.where(np.array(nums) > 1, wall/widths, np.inf).min(axis=1)
+        gap = np.maximum(np.maximum(lo - candidates, candidates - hi), 0.0)
+        box_distance = np.linalg.norm(gap, axis=1)
+        outside_box = box_distance > 0
+        score = np.minimum(np.where(outside_box, box_distance, 0.0)/widths.max(), wall)
+        for keep in (outside_box & (wall >= clearance), wall >= clearance, np.ones(len(candidates), dtype=bool)):
+            order = np.flatnonzero(keep)[np.argsort(-score[keep], kind="stable")]
+            for i in order[:256]:
+                point = candidates[i]
+                if outside_box[i] or (not self.contains(point)[0] and self.distance(point)[0] >= clearance*widths.min()):
+                    return tuple(float(v) for v in point)
+        raise ValueError("No point of the background block is outside the surface.")
+
+
+def read_stl(path:str, merge_tolerance:float = 1e-9)->stlSurface:
+    """Read an ascii or binary STL file.
+
+    Ascii files may hold several solids, which become the regions of the surface.
+
+    Args:
+        path (str): Path to the STL file.
+        merge_tolerance (float, optional): Relative distance under which vertices are merged. Defaults to 1e-9.
+    Returns:
+        stlSurface: The surface.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) >= 84:
+        n = int(np.frombuffer(data, dtype="<u4", count=1, offset=80)[0])
+        if len(data) == 84 + 50*n:
+            record = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+            triangles = np.frombuffer(data, dtype=record, count=n, offset=84)["vertices"].astype(np.float64)
+            return stlSurface(triangles, None, merge_tolerance)
+    blocks, regions, start = [], {}, 0
+    for i, m in enumerate(_solid_re.finditer(data)):
+        vertices = np.fromstring(b" ".join(_vertex_re.findall(m.group(2))), dtype=np.float64, sep=" ")
+        name = m.group(1).decode().strip() or f"solid{i}"
+        n = len(vertices)//9
+        blocks.append(vertices[:9*n])
+        regions[name] = slice(start, start + n)
+        start += n
+    if not blocks:
+        raise ValueError(f"{path} is not an STL file.")
+    return stlSurface(np.concatenate(blocks), regions, merge_tolerance)
@@ -0,0 +1,69 @@
+from pifoam import utils
+
+mpirun_command = ["mpirun", "-np", "{n_procs}"]
+"""list[str]: Command hook used to launch MPI programs. "{n_procs}" is replaced by the number of processors.
+Replace it (e.g. with a stand-in script) to change how parallel programs are launched."""
+
+def render_decomposeParDict(n_procs:int, method:str = "scotch", coeffs:dict = None)->str:
+    """Serialize the decomposeParDict file for the OpenFOAM case.
+
+    Args:
+        n_procs (int): The number of subdomains.
+        method (str, optional): Decomposition method, "scotch", "simple" or "hierarchical". Defaults to "scotch".
+        coeffs (dict, optional): Coefficients for "simple" and "hierarchical" methods. If None,
+            the subdomains are split along the x direction.
+    Returns:
+        str: The content of the decomposeParDict file.
+    """
+    assert method in ("scotch", "simple", "hierarchical"), f"Unknown decomposition method '{method}'."
+    buffer = [utils.foam_header("dictionary", "system", "decomposeParDict")]
+    buffer.append(f"numberOfSubdomains\t{n_procs};\n")
+    buffer.append(f"method\t{method};\n")
+    if method in ("simple", "hierarchical"):
+        if coeffs is None:
+            coeffs = {"n": utils.tupleToDict((n_procs, 1, 1))}
+            if method == "hierarchical":
+                coeffs["order"] = "xyz"
+        buffer.append(utils.format_dict(coeffs, f"{method}Coeffs"))
+    return "".join(buffer)
+
+def write_decomposeParDict(case_dir:str, n_procs:int, method:str = "scotch", coeffs:dict = None)->None:
+    """Write the decomposeParDict file for the OpenFOAM case.
+
+    Args:
+        case_dir (str): The directory of the OpenFOAM case.
+        n_procs (int): The number of subdomains.
+        method (str, optional): Decomposition method, "scotch", "simple" or "hierarchical". Defaults to "scotch".
+        coeffs (dict, optional): Coefficients for "simple" and "hierarchical" methods. If None,
+            the subdomains are split along the x direction.
+    """
+    utils.write_files(case_dir, {"system/decomposeParDict": render_decomposeParDict(n_procs, method, coeffs)})
+
+def parallel_command(args:list[str], n_procs:int)->list[str]:
+    """Wrap a command so that it runs in parallel through `mpirun_command`.
+
+    Args:
+        args (list[str]): The command and its arguments.
+        n_procs (int): The number of processors.
+    Returns:
+        list[str]: The command to launch.
+    """
+    return [arg.format(n_procs=n_procs) for arg in mpirun_command] + args + ["-parallel"]
+
+def run_decomposePar(case_dir:str)->int:
+    return utils.run_command(["decomposePar", "-case", case_dir, "-force"])
+
+def run_reconstructPar(case_dir:str)->int:
+    return utils.run_command(["reconstructPar", "-case", case_dir])
+
+def run_reconstructParMesh(case_dir:str)->int:
+    return utils.run_command(["reconstructParMesh", "-case", case_dir, "-constant"])
+
+async def run_decomposePar_async(case_dir:str)->int:
+    return await utils.run_command_async(["decomposePar", "-case", case_dir, "-force"])
+
+async def run_reconstructPar_async(case_dir:str)->int:
+    return await utils.run_command_async(["reconstructPar", "-case", case_dir])
+
+async def run_reconstructParMesh_async(case_dir:str)->int:
+    return await utils.run_command_async(["reconstructParMesh", "-case", case_dir, "-constant"])
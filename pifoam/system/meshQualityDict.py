@@ -1,7 +1,9 @@
 from pifoam import utils
 
+def render_meshQualityDict(minFaceWeight:float = 0.02) -> str:
+    return (utils.foam_header("dictionary", "system", "meshQualityDict")
+            + "#includeEtc \"caseDicts/meshQualityDict\"\n"
+            + f"minFaceWeight\t{minFaceWeight};\n")
+
 def write_meshQualityDict(case_dir:str, minFaceWeight:float = 0.02) -> None:
-    with open(f"{case_dir}/system/meshQualityDict", "w") as file:
-        utils.write_format(file, {"version": 2.0, "format": "ascii", "class": "dictionary", "location": "system", "object": "meshQualityDict"}, "FoamFile")
-        file.write("#includeEtc \"caseDicts/meshQualityDict\"\n")
-        file.write(f"minFaceWeight\t{minFaceWeight};\n")
\ No newline at end of file
+    utils.write_files(case_dir, {"system/meshQualityDict": render_meshQualityDict(minFaceWeight)})
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""Timeline of the stages, external processes and file writes of pifoam.
+
+Tracing is off by default; `span` then returns a shared no-op context manager, so instrumented code
+pays one function call. Enable it with `enable()` or the environment variable PIFOAM_TRACE=1:
+
+    from pifoam import trace
+    trace.enable()
+    case.setup(); case.create_mesh(); case.run()
+    trace.write_chrome("trace.json")    # open in chrome://tracing or https://ui.perfetto.dev
+    print(trace.format_summary())
+"""
+import contextlib
+import contextvars
+import json
+import os
+import resource
+import threading
+import time
+
+enabled = os.environ.get("PIFOAM_TRACE", "") not in ("", "0")
+"""bool: Whether spans are recorded."""
+
+events = []
+"""list[dict]: Recorded spans with "name", "cat", "start", "wall", "cpu", "pid", "tid" and "args"."""
+
+_lock = threading.Lock()
+_null = contextlib.nullcontext()
+_parent = contextvars.ContextVar("pifoam_trace_parent", default=None)
+
+
+def enable()->None:
+    global enabled
+    enabled = True
+
+
+def disable()->None:
+    global enabled
+    enabled = False
+
+
+def clear()->None:
+    with _lock:
+        events.clear()
+
+
+def case_of(args:list[str])->str|None:
+    """Case directory of an OpenFOAM command line, i.e. the argument of -case."""
+    return args[args.index("-case") + 1] if "-case" in args[:-1] else None
+
+
+def bytes_written(case_dir:str, since_ns:int)->int:
+    """Total size of the files of a case modified since `since_ns` (time.time_ns())."""
+    total = 0
+    for root, _, files in os.walk(case_dir):
+        for f in files:
+            try:
+                stat = os.stat(os.path.join(root, f))
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime_ns >= since_ns:
+                total += stat.st_size
+    return total
+
+
+class traceSpan:
+    """A timed region. Values added to `args` are stored with the span.
+
+    The processes run inside a span (e.g. icoFoam inside the "solve" stage) are aggregated into it: its CPU
+    time adds theirs to the CPU time of the calling thread, and its "max_rss_kb" is the peak memory of the
+    largest of them. The usage of the Python process itself is kept apart as "python_cpu" and
+    "python_max_rss_kb", so stages compare by the work of the OpenFOAM processes they ran.
+
+    Attributes:
+        name (str): Name of the span, e.g. "blockMesh".
+        category (str): "stage", "process" or "write".
+        case_dir (str): Case directory whose written bytes are counted. None skips counting.
+        args (dict): Values recorded with the span, e.g. "returncode".
+        cpu (float): CPU time in seconds, set for process spans. Defaults to the CPU time of the calling
+            thread plus that of the processes run inside the span.
+    """
+    def __init__(self, name:str, category:str, case_dir:str = None, args:dict = None)->None:
+        self.name = name
+        self.category = category
+        self.case_dir = case_dir
+        self.args = {} if args is None else args
+        self.cpu = None
+        self.child_cpu = 0.0
+        self.child_rss_kb = None
+
+    def __enter__(self)->"traceSpan":
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.thread_cpu = time.thread_time()
+        # Context variables follow asyncio tasks, so concurrent cases in one thread do not mix their spans.
+        self.parent = _parent.get()
+        self.token = _parent.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback)->None:
+        wall = time.perf_counter() - self.start
+        try:
+            _parent.reset(self.token)
+        except ValueError:
+            # Exited in another context than it was entered.
+            pass
+        python_cpu = time.thread_time() - self.thread_cpu
+        if self.cpu is None:
+            self.args.setdefault("python_cpu", python_cpu)
+            self.args.setdefault("python_max_rss_kb", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+            cpu = python_cpu + self.child_cpu
+            if self.child_rss_kb is not None:
+                self.args.setdefault("max_rss_kb", self.child_rss_kb)
+        else:
+            cpu = self.cpu
+        if self.parent is not None:
+            self.parent.child_cpu += cpu if self.cpu is not None else self.child_cpu
+            rss = self.args.get("max_rss_kb") if self.cpu is not None else self.child_rss_kb
+            if rss is not None:
+                self.parent.child_rss_kb = max(self.parent.child_rss_kb or 0, rss)
+        if self.case_dir is not None and os.path.isdir(self.case_dir):
+            self.args.setdefault("bytes_written", bytes_written(self.case_dir, self.start_ns))
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        event = {"name": self.name, "cat": self.category, "start": self.start_ns/1e9, "wall": wall, "cpu": cpu,
+                "pid": os.getpid(), "tid": threading.get_ident(), "args": self.args}
+        with _lock:
+            events.append(event)
+
+
+def span(name:str, category:str = "stage", case_dir:str = None, **args)->traceSpan|contextlib.nullcontext:
+    """Context manager recording a span if tracing is enabled.
+
+    Args:
+        name (str): Name of the span.
+        category (str, optional): "stage", "process" or "write". Defaults to "stage".
+        case_dir (str, optional): Case directory whose written bytes are counted. Defaults to None.
+        **args: Values recorded with the span.
+    Returns:
+        traceSpan|contextlib.nullcontext: The span, or a no-op context manager yielding None when tracing is off.
+    """
+    if not enabled:
+        return _null
+    return traceSpan(name, category, case_dir, args)
+
+
+def set_rusage(s:traceSpan|None, rusage:resource.struct_rusage, returncode:int)->None:
+    """Store the resource usage of a finished child process in a process span."""
+    if s is None:
+        return
+    s.cpu = rusage.ru_utime + rusage.ru_stime
+    s.args.update({"returncode": returncode, "cpu_user": rusage.ru_utime, "cpu_system": rusage.ru_stime,
+                "max_rss_kb": rusage.ru_maxrss, "read_blocks": rusage.ru_inblock, "write_blocks": rusage.ru_oublock})
+
+
+def chrome_trace()->dict:
+    """Recorded spans in the Chrome trace event format."""
+    with _lock:
+        recorded = list(events)
+    origin = min((e["start"] for e in recorded), default=0.0)
+    trace_events = []
+    for e in recorded:
+        trace_events.append({"name": e["name"], "cat": e["cat"], "ph": "X", "ts": (e["start"] - origin)*1e6,
+                            "dur": e["wall"]*1e6, "pid": e["pid"], "tid": e["tid"], "args": {"cpu": e["cpu"], **e["args"]}})
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def write_chrome(path:str)->None:
+    """Write the timeline as a Chrome trace (chrome://tracing, Perfetto)."""
+    with open(path, "w") as file:
+        json.dump(chrome_trace(), file, default=str)
+
+
+def summary()->list[dict]:
+    """Totals per category and name.
+
+    Returns:
+        list[dict]: Rows with "category", "name", "count", "wall", "cpu", "max_rss_kb", "bytes_written"
+            and "failures", ordered by total wall time.
+    """
+    rows = {}
+    with _lock:
+        recorded = list(events)
+    for e in recorded:
+        row = rows.setdefault((e["cat"], e["name"]), {"category": e["cat"], "name": e["name"], "count": 0, "wall": 0.0,
+                                                    "cpu": 0.0, "max_rss_kb": 0, "bytes_written": 0, "failures": 0})
+        row["count"] += 1
+        row["wall"] += e["wall"]
+        row["cpu"] += e["cpu"]
+        row["max_rss_kb"] = max(row["max_rss_kb"], e["args"].get("max_rss_kb", 0))
+        row["bytes_written"] += e["args"].get("bytes_written", 0)
+        row["failures"] += int(e["args"].get("returncode", 0) not in (0, None) or "error" in e["args"])
+    return sorted(rows.values(), key=lambda r: -r["wall"])
+
+
+def format_summary()->str:
+    """The summary as a text table."""
+    lines = [f"{'category':9s} {'name':24s} {'count':>6s} {'wall [s]':>10s} {'cpu [s]':>10s} {'peak RSS [MB]':>14s} {'written [MB]':>13s} {'failed':>7s}"]
+    for r in summary():
+        lines.append(f"{r['category']:9s} {r['name']:24s} {r['count']:6d} {r['wall']:10.3f} {r['cpu']:10.3f} "
+                    f"{r['max_rss_kb']/1024:14.1f} {r['bytes_written']/2**20:13.2f} {r['failures']:7d}")
+    return "\n".join(lines)
@@ -1,4 +1,43 @@
 import _io
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+from pifoam import trace
+
+def format_dict(data:dict, name:str, done:bool = True)->str:
+    """Serialize a (nested) dictionary into an OpenFOAM dictionary block.
+
+    All the pieces are appended to a single buffer which is joined once.
+
+    Args:
+        data (dict): The data to serialize.
+        name (str): The name of the data block.
+        done (bool, optional): Whether this is the last block. Defaults to True.
+    Returns:
+        str: The serialized block.
+    """
+    buffer = []
+    stack = [(name, iter(data.items()))]
+    buffer.append(f"{name}{{")
+    while stack:
+        for key, value in stack[-1][1]:
+            if isinstance(value, dict):
+                buffer.append(f"{key}{{")
+                stack.append((key, iter(value.items())))
+                break
+            buffer.append(f"{key} {value};")
+        else:
+            buffer.append("}")
+            stack.pop()
+    if done:
+        buffer.append("\n")
+    return "".join(buffer)
 
 def write_format(file:_io.TextIOWrapper, data:dict, name:str, done:bool = True)->None:
     """Writes the formatted data to the given file.
@@ -9,15 +48,7 @@ def write_format(file:_io.TextIOWrapper, data:dict, name:str, done:bool = True)-
         name (str): The name of the data block.
         done (bool, optional): Whether this is the last block. Defaults to True.
     """
-    file.write(f"{name}{{")
-    for key in data.keys():
-        if isinstance(data[key], dict):
-            write_format(file, data[key], key, done = False)
-        else:
-            file.write(f"{key} {data[key]};")
-    file.write("}")
-    if done:
-        file.write("\n")
+    file.write(format_dict(data, name, done))
 
 def tupleToDict(tup:tuple[int|float])->str:
     """Convert a tuple of integers or floats to a dictionary representation.
@@ -27,17 +58,279 @@ def tupleToDict(tup:tuple[int|float])->str:
     Returns:
         str: A string representation of the dictionary.
     """
-    s = "("
-    for t in tup:
-        s += f"{t} "
-    s = s[:-1]+")"
-    return s
+    return "(" + " ".join(f"{t}" for t in tup) + ")"
 
 
+def format_list(data:list[str], name:str)->str:
+    assert all(isinstance(d, str) for d in data), "All elements in the list must be strings."
+    return f"{name} ( {' '.join(data)} );\n"
+
 def write_list(file:_io.TextIOWrapper, data:list[str], name:str)->None:
-    s = name+" ( "
-    for d in data[:-1]:
-        assert isinstance(d, str), "All elements in the list must be strings."
-        s += f"{d} "
-    s += f"{data[-1]} );\n"
-    file.write(s)
\ No newline at end of file
+    file.write(format_list(data, name))
+
+def foam_header(cls:str, location:str, name:str, file_format:str = "ascii")->str:
+    """Serialize the FoamFile header of an OpenFOAM file.
+
+    Args:
+        cls (str): Class of the file, e.g. "dictionary".
+        location (str): Directory of the file relative to the case, e.g. "system".
+        name (str): Name of the file.
+        file_format (str, optional): "ascii" or "binary". Defaults to "ascii".
+    Returns:
+        str: The serialized header.
+    """
+    return format_dict({"version" : 2.0, "format" : file_format, "class" : cls, "location" : location, "object" : name}, "FoamFile")
+
+def read_manifest(case_dir:str)->dict[str, dict]:
+    """Read the record of the files written by `write_files`.
+
+    Args:
+        case_dir (str): The directory of the OpenFOAM case.
+    Returns:
+        dict[str, dict]: "sha256", "size" and "mtime_ns" of each file, keyed on the path relative to `case_dir`.
+    """
+    manifest_path = f"{case_dir}/.pifoam_manifest.json"
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path) as file:
+        return json.load(file)
+
+def manifest_matches(case_dir:str, path:str, entry:dict|None)->bool:
+    """Whether a file is unchanged since it was recorded in the manifest."""
+    target = f"{case_dir}/{path}"
+    if entry is None or not os.path.isfile(target):
+        return False
+    stat = os.stat(target)
+    return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+def write_files(case_dir:str, files:dict[str, str|bytes], link_from:str = None, shared:tuple[str] = ())->list[str]:
+    """Write the files of a case, skipping those whose content did not change.
+
+    The hash, size and modification time of every written file are recorded in `<case_dir>/.pifoam_manifest.json`,
+    so unchanged files are detected without reading them back. Files are replaced atomically, which also
+    breaks hardlinks shared with other cases instead of modifying them.
+
+    Args:
+        case_dir (str): The directory of the OpenFOAM case.
+        files (dict[str, str|bytes]): Content of each file, keyed on the path relative to `case_dir`.
+        link_from (str, optional): Case directory from which identical files are linked instead of written. Defaults to None.
+        shared (tuple[str], optional): Path prefixes of the files which may be linked from `link_from`. Defaults to ().
+    Returns:
+        list[str]: Paths of the files which were written or linked.
+    """
+    with trace.span("write_files", "write", n_files=len(files)) as s:
+        changed = _write_files(case_dir, files, link_from, shared)
+        if s is not None:
+            s.args["n_written"] = len(changed)
+            s.args["bytes_written"] = sum(len(files[path]) for path in changed)
+    return changed
+
+def _write_files(case_dir:str, files:dict[str, str|bytes], link_from:str, shared:tuple[str])->list[str]:
+    manifest = read_manifest(case_dir)
+    source_manifest = {} if link_from is None else read_manifest(link_from)
+
+    changed = []
+    for path, content in files.items():
+        if isinstance(content, str):
+            content = content.encode()
+        digest = hashlib.sha256(content).hexdigest()
+        target = f"{case_dir}/{path}"
+        entry = manifest.get(path)
+        if entry is not None and entry["sha256"] == digest and manifest_matches(case_dir, path, entry):
+            continue
+        if os.path.isfile(target) and os.path.getsize(target) == len(content):
+            with open(target, "rb") as file:
+                unchanged = hashlib.sha256(file.read()).hexdigest() == digest
+        else:
+            unchanged = False
+        if not unchanged:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            source = source_manifest.get(path)
+            if path.startswith(shared) and source is not None and source["sha256"] == digest and manifest_matches(link_from, path, source):
+                link_file(f"{link_from}/{path}", target, reflink=True)
+            else:
+                tmp = f"{target}.pifoam-tmp"
+                with open(tmp, "wb") as file:
+                    file.write(content)
+                os.replace(tmp, target)
+            changed.append(path)
+        stat = os.stat(target)
+        manifest[path] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    os.makedirs(case_dir, exist_ok=True)
+    manifest_path = f"{case_dir}/.pifoam_manifest.json"
+    with open(f"{manifest_path}.pifoam-tmp", "w") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(f"{manifest_path}.pifoam-tmp", manifest_path)
+    return changed
+
+def run_command(args:list[str], show_log:bool = False, line_callback:callable = None)->int:
+    """Run an external command and wait for it to finish.
+
+    Args:
+        args (list[str]): The command and its arguments.
+        show_log (bool, optional): Whether to forward stdout to the terminal. Defaults to False.
+        line_callback (callable, optional): Function called with every line of stdout as it is produced. Defaults to None.
+    Returns:
+        int: The exit code of the command.
+    """
+    with trace.span(os.path.basename(args[0]), "process", trace.case_of(args), command=" ".join(args)) as s:
+        if line_callback is not None:
+            stdout = subprocess.PIPE
+        else:
+            stdout = None if show_log else subprocess.DEVNULL
+        with subprocess.Popen(args, stdout=stdout, text=True, bufsize=1) as proc:
+            if line_callback is not None:
+                for line in proc.stdout:
+                    line_callback(line)
+                    if show_log:
+                        sys.stdout.write(line)
+                proc.stdout.close()
+            if s is None:
+                return proc.wait()
+            # Reap the child ourselves to get its resource usage (including the descendants it waited for).
+            _, status, rusage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            trace.set_rusage(s, rusage, proc.returncode)
+        return proc.returncode
+
+
+async def run_command_async(args:list[str], show_log:bool = False, line_callback:callable = None, kill_timeout:float = 5.0)->int:
+    """Asynchronous version of `run_command`.
+
+    The command runs in its own process group. If the awaiting task is cancelled (e.g. by `asyncio.wait_for`
+    on timeout), the whole process tree receives SIGTERM, then SIGKILL after `kill_timeout` seconds,
+    before the cancellation propagates.
+
+    Args:
+        args (list[str]): The command and its arguments.
+        show_log (bool, optional): Whether to forward stdout to the terminal. Defaults to False.
+        line_callback (callable, optional): Function called with every line of stdout as it is produced. Defaults to None.
+        kill_timeout (float, optional): Seconds between SIGTERM and SIGKILL on cancellation. Defaults to 5.0.
+    Returns:
+        int: The exit code of the command.
+    """
+    if line_callback is not None:
+        stdout = asyncio.subprocess.PIPE
+    else:
+        stdout = None if show_log else asyncio.subprocess.DEVNULL
+    with trace.span(os.path.basename(args[0]), "process", trace.case_of(args), command=" ".join(args)) as s:
+        # The event loop reaps the child, so only the usage of all children is available (approximate when
+        # commands run concurrently).
+        children = None if s is None else resource.getrusage(resource.RUSAGE_CHILDREN)
+        proc = await asyncio.create_subprocess_exec(*args, stdout=stdout, start_new_session=True)
+        try:
+            if line_callback is not None:
+                while True:
+                    line = await proc.stdout.readline()
+                    if not line:
+                        break
+                    line = line.decode(errors="replace")
+                    line_callback(line)
+                    if show_log:
+                        sys.stdout.write(line)
+            returncode = await proc.wait()
+        except asyncio.CancelledError:
+            await asyncio.shield(kill_process_group(proc, kill_timeout))
+            raise
+        if s is not None:
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            s.cpu = (after.ru_utime - children.ru_utime) + (after.ru_stime - children.ru_stime)
+            s.args.update({"returncode": returncode, "cpu_user": after.ru_utime - children.ru_utime,
+                        "cpu_system": after.ru_stime - children.ru_stime, "max_rss_kb": after.ru_maxrss})
+        return returncode
+
+
+async def kill_process_group(proc:asyncio.subprocess.Process, kill_timeout:float = 5.0)->None:
+    """Terminate the process group of a child process started with `start_new_session=True`.
+
+    The group receives SIGTERM, then SIGKILL once every process has exited or `kill_timeout` seconds have
+    passed, so members outliving the leader (e.g. mpirun ranks) are killed too.
+
+    Args:
+        proc (asyncio.subprocess.Process): The child process.
+        kill_timeout (float, optional): Seconds between SIGTERM and SIGKILL. Defaults to 5.0.
+    """
+    pgid = proc.pid
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + kill_timeout
+    try:
+        await asyncio.wait_for(proc.wait(), kill_timeout)
+    except asyncio.TimeoutError:
+        pass
+    while loop.time() < deadline:
+        try:
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            break
+        await asyncio.sleep(0.05)
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+FICLONE = 0x40049409
+"""int: ioctl request cloning a file on copy-on-write filesystems (Btrfs, XFS)."""
+
+def reflink_file(src:str, dst:str)->bool:
+    """Create `dst` as a copy-on-write clone of `src`.
+
+    Args:
+        src (str): The source file.
+        dst (str): The destination file. It must not exist.
+    Returns:
+        bool: False if the filesystem does not support reflinks, in which case nothing is created.
+    """
+    try:
+        import fcntl
+        with open(src, "rb") as s, open(dst, "xb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            except OSError:
+                failed = True
+            else:
+                failed = False
+        if failed:
+            os.remove(dst)
+        return not failed
+    except (ImportError, OSError):
+        return False
+
+
+def link_file(src:str, dst:str, reflink:bool = False)->None:
+    """Hardlink a file, falling back to a copy when hardlinks are not possible (e.g. across filesystems).
+
+    Args:
+        src (str): The source file.
+        dst (str): The destination file. It is replaced if it already exists.
+        reflink (bool, optional): Whether to try a copy-on-write clone before hardlinking. Defaults to False.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if reflink and reflink_file(src, dst):
+        return
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def link_tree(src:str, dst:str, reflink:bool = False)->None:
+    """Recreate a directory tree with `link_file` for every file.
+
+    Args:
+        src (str): The source directory.
+        dst (str): The destination directory.
+        reflink (bool, optional): Whether to try copy-on-write clones before hardlinking. Defaults to False.
+    """
+    for root, _, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target, exist_ok=True)
+        for f in files:
+            link_file(os.path.join(root, f), os.path.join(target, f), reflink)
@@ -0,0 +1,100 @@
+import json
+import os
+import numpy as np
+import pytest
+from pifoam.application.autotune import pressure_candidates, solverTuner
+from pifoam.io.solverLog import read_log
+
+logs_dir = os.path.join(os.path.dirname(__file__), "logs")
+
+
+class fakeCase:
+    application = "icoFoam"
+    n_procs = 1
+    case_dir = "case"
+
+    def __init__(self)->None:
+        self.fvSolution_props = {"solvers": {
+            "p": {"solver": "PCG", "preconditioner": "DIC", "tolerance": 1e-06, "relTol": 0.05},
+            "U": {"solver": "smoothSolver", "smoother": "symGaussSeidel", "tolerance": 1e-05, "relTol": 0},
+        }}
+
+
+def canned(tuner:solverTuner, name:str)->dict[str, any]:
+    """Result of a trial run from a recorded log."""
+    return tuner.result(0, read_log(os.path.join(logs_dir, f"tuner_{name}.log")))
+
+
+@pytest.fixture
+def tuner(monkeypatch)->solverTuner:
+    tuner = solverTuner(n_steps=4, warmup=1)
+    tuner.runs = []
+
+    def trial(case, case_dir, solvers):
+        name = os.path.basename(case_dir).split("-", 1)[1]
+        tuner.runs.append(name)
+        if name == "failed":
+            return {**canned(tuner, "PCG"), "returncode": 1, "seconds_per_step": float("inf")}
+        return canned(tuner, "PCG" if name == "reference" else name)
+
+    monkeypatch.setattr(tuner, "trial", trial)
+    return tuner
+
+
+def test_result(tuner):
+    result = canned(tuner, "GAMG")
+    # The median of the steps after the warmup.
+    assert result["seconds_per_step"] == pytest.approx(0.05)
+    assert sorted(result["residuals"]) == ["Ux", "Uy", "p"]
+    # The initial residual of the first corrector of each step.
+    np.testing.assert_allclose(result["residuals"]["p"], [1, 0.52, 0.31, 0.2])
+    # A run stopping before the end of the trial has no cost.
+    assert solverTuner(n_steps=5, warmup=1).result(0, read_log(os.path.join(logs_dir, "tuner_GAMG.log")))["seconds_per_step"] == np.inf
+
+
+def test_matches(tuner):
+    reference = canned(tuner, "PCG")
+    assert tuner.matches(reference, reference)
+    assert tuner.matches(canned(tuner, "GAMG"), reference)
+    assert tuner.matches(canned(tuner, "slow"), reference)
+    assert not tuner.matches(canned(tuner, "DIC"), reference)
+    # Missing fields or steps are not comparable.
+    partial = canned(tuner, "GAMG")
+    partial["residuals"]["p"] = partial["residuals"]["p"][:2]
+    assert not tuner.matches(partial, reference)
+    del partial["residuals"]["p"]
+    assert not tuner.matches(partial, reference)
+
+
+def test_select(tuner):
+    case = fakeCase()
+    candidates = {"slow": {"solver": "PCG", "preconditioner": "FDIC"}, "GAMG": {"solver": "GAMG", "smoother": "GaussSeidel"},
+                "DIC": {"solver": "GAMG", "smoother": "DIC"}, "failed": {"solver": "GAMG", "smoother": "DICGaussSeidel"},
+                "same": {"solver": "PCG", "preconditioner": "DIC"}}
+    trials = []
+    name, seconds = tuner.select(case, "scratch", "p", candidates, {}, trials)
+    # The fastest candidate is not kept since its residuals are too high.
+    assert (name, seconds) == ("GAMG", pytest.approx(0.05))
+    # The current solver is only run as the reference.
+    assert tuner.runs == ["reference", "slow", "GAMG", "DIC", "failed"]
+    assert [(t["name"], t["valid"]) for t in trials] == [("reference", True), ("slow", True), ("GAMG", True), ("DIC", False), ("failed", False)]
+
+    tuner.runs.clear()
+    assert tuner.select(case, "scratch", "p", {"slow": candidates["slow"]}, {}, []) == (None, pytest.approx(0.1))
+
+
+def test_with_solvers_keeps_tolerances():
+    props = solverTuner().with_solvers(fakeCase(), {"p": pressure_candidates(10000)["GAMG-GaussSeidel-10"]})
+    assert props["solvers"]["p"]["solver"] == "GAMG"
+    assert props["solvers"]["p"]["tolerance"] == 1e-06 and props["solvers"]["p"]["relTol"] == 0.05
+    assert "preconditioner" not in props["solvers"]["p"]
+
+
+def test_key_and_save(tmp_path):
+    tuner = solverTuner(str(tmp_path/"solvers.json"))
+    assert tuner.key(fakeCase(), 131072) == tuner.key(fakeCase(), 262143) == "icoFoam/np1/2^17"
+    tuner.winners["icoFoam/np1/2^17"] = {"p": {"solver": "GAMG"}, "seconds_per_step": 0.1, "n_cells": 200000}
+    tuner.save()
+    with open(tmp_path/"solvers.json") as file:
+        assert json.load(file) == tuner.winners
+    assert solverTuner(str(tmp_path/"solvers.json")).winners == tuner.winners
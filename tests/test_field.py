@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from pifoam.io.field import read_field, render_field
+
+boundary = {"walls": {"type": "zeroGradient"}}
+
+
+def render(tmp_path, field_class:str, internalField:any, write_format:str = "ascii")->dict:
+    path = tmp_path/"f"
+    with open(path, "wb") as file:
+        file.write(render_field("0", "f", field_class, "[0 0 0 0 0 0 0]", internalField, boundary, write_format))
+    return read_field(str(path))
+
+
+@pytest.mark.parametrize("write_format", ["ascii", "binary"])
+@pytest.mark.parametrize("internalField, expected", [
+    (0.5, 0.5),
+    (np.float64(2.0), 2.0),
+    # What initial_values returns for a function of the cell centres returning a constant.
+    (np.asarray(0.0), 0.0),
+    (np.asarray(3), 3),
+])
+def test_uniform_scalar(tmp_path, write_format, internalField, expected):
+    field = render(tmp_path, "volScalarField", internalField, write_format)
+    assert field["internalField"].shape == ()
+    assert field["internalField"] == expected
+
+
+@pytest.mark.parametrize("internalField", [(1, 0, 0), [1, 0, 0], np.array([1.0, 0.0, 0.0])])
+def test_uniform_vector(tmp_path, internalField):
+    np.testing.assert_array_equal(render(tmp_path, "volVectorField", internalField)["internalField"], [1, 0, 0])
+
+
+def test_nonuniform(tmp_path):
+    np.testing.assert_array_equal(render(tmp_path, "volScalarField", np.arange(4.0))["internalField"], np.arange(4.0))
+    values = np.arange(9.0).reshape(3, 3)
+    np.testing.assert_array_equal(render(tmp_path, "volVectorField", values, "binary")["internalField"], values)
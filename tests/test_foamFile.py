@@ -0,0 +1,89 @@
+import gzip
+import numpy as np
+import pytest
+from pifoam import utils
+from pifoam.io.field import read_field, render_field
+from pifoam.io.foamFile import read_foamFile
+
+
+def binary_header(cls:str, name:str)->bytes:
+    header = {"version": 2.0, "format": "binary", "class": cls, "arch": '"LSB;label=32;scalar=64"', "location": "constant/polyMesh", "object": name}
+    return utils.format_dict(header, "FoamFile").encode()
+
+
+def write(path, content:bytes|str)->str:
+    with open(path, "wb") as file:
+        file.write(content.encode() if isinstance(content, str) else content)
+    return str(path)
+
+
+def test_ascii_dictionary(tmp_path):
+    path = write(tmp_path/"fvSolution", utils.foam_header("dictionary", "system", "fvSolution") + """
+// comment
+solvers
+{
+    p { solver PCG; preconditioner DIC; tolerance 1e-06; relTol 0.05; }
+    "(U|k)" { solver smoothSolver; smoother symGaussSeidel; }
+}
+/* block
+   comment */
+PISO { nCorrectors 2; pRefPoint (0 0.5 1); }
+""")
+    d = read_foamFile(path)
+    assert d["FoamFile"]["class"] == "dictionary"
+    assert d["solvers"]["p"] == {"solver": "PCG", "preconditioner": "DIC", "tolerance": 1e-06, "relTol": 0.05}
+    assert d["solvers"]["(U|k)"]["smoother"] == "symGaussSeidel"
+    assert d["PISO"] == {"nCorrectors": 2, "pRefPoint": (0, 0.5, 1)}
+
+
+def test_faces_marker(tmp_path):
+    # Faces of mixed sizes, delimited by the -1 markers substituted for their closing parentheses.
+    path = write(tmp_path/"faces", utils.foam_header("faceList", "constant/polyMesh", "faces")
+                + "4\n(\n4(0 1 2 3)\n3(4 5 6)\n5(7 8 9 10 11)\n3(0 10 2)\n)\n")
+    offsets, labels = read_foamFile(path)[None][0]
+    np.testing.assert_array_equal(offsets, [0, 4, 7, 12, 15])
+    np.testing.assert_array_equal(labels, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 0, 10, 2])
+    bad = write(tmp_path/"bad", utils.foam_header("faceList", "constant/polyMesh", "faces") + "3\n(\n4(0 1 2 3)\n3(4 5 6)\n)\n")
+    with pytest.raises(ValueError):
+        read_foamFile(bad)
+
+
+def test_binary_lists(tmp_path):
+    # 41 is the byte of ")": binary values must not be scanned for delimiters.
+    owner = np.array([41, 0, 1, 40], dtype="<i4")
+    path = write(tmp_path/"owner", binary_header("labelList", "owner") + b"4\n(" + owner.tobytes() + b")\n")
+    np.testing.assert_array_equal(read_foamFile(path)[None][0], owner)
+
+    points = np.array([[0, 0, 0], [1, 2, 3], [41.0, -1.5, 1e-300]], dtype="<f8")
+    path = write(tmp_path/"points", binary_header("vectorField", "points") + b"3\n(" + points.tobytes() + b")\n")
+    np.testing.assert_array_equal(read_foamFile(path)[None][0], points)
+
+    offsets, labels = np.array([0, 4, 7], dtype="<i4"), np.array([0, 1, 2, 3, 41, 5, 6], dtype="<i4")
+    path = write(tmp_path/"faces", binary_header("faceCompactList", "faces")
+                + b"3\n(" + offsets.tobytes() + b")\n7\n(" + labels.tobytes() + b")\n")
+    read_offsets, read_labels = read_foamFile(path)[None]
+    np.testing.assert_array_equal(read_offsets, offsets)
+    np.testing.assert_array_equal(read_labels, labels)
+
+
+@pytest.mark.parametrize("write_format", ["ascii", "binary"])
+def test_field_round_trip(tmp_path, write_format):
+    values = np.random.default_rng(0).standard_normal((50, 3))
+    boundary = {"inlet": {"type": "fixedValue", "value": "uniform (1 0 0)"}, "walls": {"type": "noSlip"}}
+    content = render_field("0", "U", "volVectorField", "[0 1 -1 0 0 0 0]", values, boundary, write_format, precision=17)
+    field = read_field(write(tmp_path/"U", content))
+    assert field["internalField"].shape == (50, 3)
+    np.testing.assert_array_equal(field["internalField"], values)
+    np.testing.assert_array_equal(field["boundaryField"]["inlet"]["value"], [1, 0, 0])
+    assert field["boundaryField"]["walls"] == {"type": "noSlip"}
+
+
+def test_gz(tmp_path):
+    values = np.linspace(0.0, 1.0, 20)
+    content = render_field("0.5", "p", "volScalarField", "[0 2 -2 0 0 0 0]", values, {"outlet": {"type": "zeroGradient"}}, "binary")
+    with gzip.open(tmp_path/"p.gz", "wb") as file:
+        file.write(content)
+    # The compressed file is found from the uncompressed name.
+    field = read_field(str(tmp_path/"p"))
+    np.testing.assert_array_equal(field["internalField"], values)
+    np.testing.assert_array_equal(read_field(str(tmp_path/"p.gz"))["internalField"], values)
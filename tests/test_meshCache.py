@@ -0,0 +1,52 @@
+import os
+from pifoam import utils
+from pifoam.mesh.cache import meshCache
+
+
+def make_case(case_dir:str, points:str)->str:
+    utils.write_files(case_dir, {"constant/polyMesh/points": points, "constant/polyMesh/owner": "owner"})
+    return case_dir
+
+
+def test_key(tmp_path):
+    cache = meshCache(str(tmp_path/"cache"))
+    files = {"system/blockMeshDict": "blocks", "constant/triSurface/a.stl": b"solid a"}
+    assert cache.key(files) == cache.key(dict(reversed(files.items())))
+    assert cache.key(files) != cache.key({**files, "system/blockMeshDict": "other"})
+    # The path is part of the key, not only the content.
+    assert cache.key({"a": "xy"}) != cache.key({"ax": "y"})
+
+
+def test_hit_miss(tmp_path):
+    cache = meshCache(str(tmp_path/"cache"))
+    source = make_case(str(tmp_path/"source"), "points")
+    assert not cache.fetch("k", str(tmp_path/"target"))
+    cache.store("k", source)
+    assert cache.contains("k")
+    target = make_case(str(tmp_path/"target"), "stale points")
+    assert cache.fetch("k", target)
+    with open(f"{target}/constant/polyMesh/points") as file:
+        assert file.read() == "points"
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Storing the same key again keeps the first entry.
+    cache.store("k", make_case(str(tmp_path/"other"), "other points"))
+    assert [key for key, _, _ in cache.entries()] == ["k"]
+    assert not [name for name in os.listdir(cache.cache_dir) if name.startswith(".tmp")]
+
+
+def test_lru(tmp_path):
+    cache = meshCache(str(tmp_path/"cache"))
+    for i, key in enumerate("abc"):
+        cache.store(key, make_case(str(tmp_path/key), key*100))
+        os.utime(f"{cache.cache_dir}/{key}", (1000 + i, 1000 + i))
+    assert [key for key, _, _ in cache.entries()] == ["a", "b", "c"]
+    # A hit makes "a" the most recently used entry.
+    assert cache.fetch("a", str(tmp_path/"case"))
+    assert [key for key, _, _ in cache.entries()] == ["b", "c", "a"]
+    size = cache.entries()[0][2]
+    assert size == 100 + len("owner")
+    cache.max_bytes = 2*size
+    cache.evict()
+    assert sorted(key for key, _, _ in cache.entries()) == ["a", "c"]
+    cache.clear()
+    assert cache.entries() == []
@@ -0,0 +1,66 @@
+import sys
+import numpy as np
+import pytest
+from pifoam.io.mapFields import pointIndex
+
+
+@pytest.fixture
+def grid_index(monkeypatch)->type:
+    """pointIndex with its grid fallback, as without scipy."""
+    monkeypatch.setitem(sys.modules, "scipy.spatial", None)
+    return pointIndex
+
+
+def brute_force(points:np.ndarray, x:np.ndarray, k:int)->tuple[np.ndarray, np.ndarray]:
+    d = np.linalg.norm(x[:, None, :] - points[None], axis=2)
+    idx = np.argsort(d, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(d, idx, axis=1), idx
+
+
+@pytest.mark.parametrize("k", [1, 4])
+def test_grid_3d(grid_index, k):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0.0, 1.0, (2000, 3))*[4.0, 1.0, 2.0]
+    # Queries inside the domain, and outside it where the nearest points are many bins away.
+    x = np.concatenate([rng.uniform(0.0, 1.0, (500, 3))*[4.0, 1.0, 2.0], rng.uniform(-3.0, 6.0, (100, 3))])
+    index = grid_index(points)
+    assert index.tree is None
+    dist, idx = index.query(x, k, chunk=64)
+    expected_dist, expected_idx = brute_force(points, x, k)
+    np.testing.assert_allclose(dist, expected_dist)
+    np.testing.assert_array_equal(idx, expected_idx)
+
+
+def test_grid_2d(grid_index):
+    # Cell centres of a mesh one cell thick: the bins must not be sized by the thickness.
+    rng = np.random.default_rng(1)
+    points = np.column_stack([rng.uniform(-10.0, 40.0, 3000), rng.uniform(-10.0, 10.0, 3000), np.full(3000, 5.5)])
+    x = np.column_stack([rng.uniform(-12.0, 42.0, 400), rng.uniform(-12.0, 12.0, 400), rng.uniform(5.0, 6.0, 400)])
+    index = grid_index(points)
+    assert index.shape[2] == 1
+    dist, idx = index.query(x, 3)
+    expected_dist, expected_idx = brute_force(points, x, 3)
+    np.testing.assert_allclose(dist, expected_dist)
+    np.testing.assert_array_equal(idx, expected_idx)
+
+
+def test_more_neighbours_than_points(grid_index):
+    points = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 3.0, 0.0]])
+    dist, idx = grid_index(points).query([[0.9, 0.0, 0.0]], k=5)
+    np.testing.assert_array_equal(idx, [[1, 0, 2]])
+    np.testing.assert_allclose(dist, [[0.1, 0.9, np.hypot(0.9, 3.0)]])
+
+
+def test_grid_matches_scipy():
+    pytest.importorskip("scipy.spatial")
+    rng = np.random.default_rng(2)
+    points = rng.normal(size=(1000, 3))
+    x = rng.normal(scale=2.0, size=(300, 3))
+    tree = pointIndex(points)
+    assert tree.tree is not None
+    grid = pointIndex.__new__(pointIndex)
+    grid.points, grid.tree = tree.points, None
+    grid.build_grid(2.0)
+    for (d0, i0), (d1, i1) in [(tree.query(x, k), grid.query(x, k)) for k in (1, 6)]:
+        np.testing.assert_allclose(d0, d1)
+        np.testing.assert_array_equal(i0, i1)
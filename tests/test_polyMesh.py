@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from pifoam import utils
+from pifoam.io.polyMesh import polyMesh, read_n_cells
+
+# Two hexahedra: the unit cube and, on its +x side, a parallelepiped whose far face is shifted by 1 in y.
+points = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1),
+        (2, 1, 0), (2, 2, 0), (2, 2, 1), (2, 1, 1)]
+faces = [(1, 2, 6, 5),
+        (0, 4, 7, 3), (0, 1, 5, 4), (3, 7, 6, 2), (0, 3, 2, 1), (4, 5, 6, 7),
+        (8, 9, 10, 11), (1, 8, 11, 5), (2, 6, 10, 9), (1, 2, 9, 8), (5, 11, 10, 6)]
+owner = [0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+neighbour = [1]
+
+
+def write_mesh(case_dir:str)->None:
+    def foam_list(cls:str, name:str, items:list[str])->str:
+        return utils.foam_header(cls, "constant/polyMesh", name) + f"{len(items)}\n(\n" + "\n".join(items) + "\n)\n"
+
+    boundary = utils.foam_header("polyBoundaryMesh", "constant/polyMesh", "boundary") \
+        + "1\n(\n    walls\n    {\n        type wall;\n        nFaces 10;\n        startFace 1;\n    }\n)\n"
+    utils.write_files(case_dir, {
+        "constant/polyMesh/points": foam_list("vectorField", "points", [f"({x} {y} {z})" for x, y, z in points]),
+        "constant/polyMesh/faces": foam_list("faceList", "faces", [f"4({' '.join(map(str, f))})" for f in faces]),
+        "constant/polyMesh/owner": foam_list("labelList", "owner", [str(c) for c in owner]),
+        "constant/polyMesh/neighbour": foam_list("labelList", "neighbour", [str(c) for c in neighbour]),
+        "constant/polyMesh/boundary": boundary,
+    })
+
+
+@pytest.fixture
+def mesh(tmp_path)->polyMesh:
+    write_mesh(str(tmp_path))
+    return polyMesh(str(tmp_path))
+
+
+def test_geometry(mesh):
+    assert mesh.n_cells == 2 and mesh.n_internal_faces == 1
+    np.testing.assert_allclose(mesh.cell_volumes, [1, 1])
+    np.testing.assert_allclose(mesh.cell_centres, [(0.5, 0.5, 0.5), (1.5, 1, 0.5)])
+    np.testing.assert_allclose(mesh.non_orthogonality, [np.degrees(np.arctan(0.5))])
+
+
+def test_skewness(mesh):
+    # The line between the centres crosses the shared face 0.25 below its centre, the face extends 0.5 that way.
+    # The owner normal through the shifted far face misses its centre by 0.5, and by 0.25*sqrt(2) on the slanted faces.
+    np.testing.assert_allclose(mesh.skewness, [0.5, 0, 0, 0, 0, 0, 1, 0.5, 0.5, 0, 0], atol=1e-12)
+    check = mesh.check(skewness_threshold=0.75)
+    assert check["max_skewness"] == pytest.approx(1)
+    assert check["n_highly_skewed"] == 1
+
+
+def test_read_n_cells(tmp_path, mesh):
+    # Without the note of the owner header, from the owner labels.
+    assert read_n_cells(str(tmp_path)) == mesh.n_cells == 2
+    header = {"version": 2.0, "format": "ascii", "class": "labelList", "note": '"nPoints:12 nCells:2 nFaces:11 nInternalFaces:1"',
+            "location": "constant/polyMesh", "object": "owner"}
+    # The labels are not read when the note is there.
+    utils.write_files(str(tmp_path), {"constant/polyMesh/owner": utils.format_dict(header, "FoamFile") + "11\n(\n" + "0\n"*11 + ")\n"})
+    assert read_n_cells(str(tmp_path)) == 2
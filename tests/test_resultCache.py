@@ -0,0 +1,138 @@
+import hashlib
+import os
+import shutil
+import pytest
+from pifoam.application.cache import resultCache
+
+system = {"system/controlDict": "controlDict", "system/fvSchemes": "fvSchemes", "system/fvSolution": "fvSolution"}
+
+
+class fakeCase:
+    """The parts of a coreFoam used by resultCache, with the results of a finished run on disk."""
+    application = "icoFoam"
+    n_procs = 1
+
+    def __init__(self, case_dir:str, U:str = "U", start_from:str = "startTime")->None:
+        self.case_dir = case_dir
+        self.control_props = {"startFrom": start_from}
+        self.U = U
+        files = {**system, "0/U": "initial", "0.1/U": U, "0.1/p": "shared", "postProcessing/probes/0/p": "0.1 1\n"}
+        for path, content in files.items():
+            os.makedirs(os.path.dirname(f"{case_dir}/{path}"), exist_ok=True)
+            with open(f"{case_dir}/{path}", "w") as file:
+                file.write(content)
+
+    def case_files(self)->dict[str, str]:
+        return {**system, "0/U": "initial", ":U": self.U}
+
+    def render_controlDict(self)->str:
+        return system["system/controlDict"]
+
+    def render_fvSchemes(self)->str:
+        return system["system/fvSchemes"]
+
+    def render_fvSolution(self)->str:
+        return system["system/fvSolution"]
+
+
+def read(path:str)->str:
+    with open(path) as file:
+        return file.read()
+
+
+def test_key(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    a, b = fakeCase(str(tmp_path/"a"), "A"), fakeCase(str(tmp_path/"b"), "B")
+    assert cache.key(a) == cache.key(fakeCase(str(tmp_path/"c"), "A"))
+    assert cache.key(a) != cache.key(b)
+    # A restart depends on the results already in the case.
+    restart = fakeCase(str(tmp_path/"d"), "A", start_from="latestTime")
+    assert cache.key(restart) is None
+    # Without results yet, latestTime starts from the initial conditions.
+    shutil.rmtree(f"{restart.case_dir}/0.1")
+    assert cache.key(restart) == cache.key(a)
+    a.n_procs = 4
+    assert cache.key(a, reconstruct=False) is None
+    assert cache.key(a) is not None
+
+
+def test_store_fetch(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    case = fakeCase(str(tmp_path/"a"), "A")
+    key = cache.key(case)
+    assert not cache.fetch(key, case.case_dir)
+    assert cache.store(key, case, "Time = 0.1\nEnd\n")
+    assert cache.contains(key)
+
+    target = fakeCase(str(tmp_path/"b"), "stale")
+    os.makedirs(f"{target.case_dir}/0.2")
+    lines = []
+    assert cache.fetch(key, target.case_dir, log=lines.append)
+    assert read(f"{target.case_dir}/0.1/U") == "A"
+    assert read(f"{target.case_dir}/postProcessing/probes/0/p") == "0.1 1\n"
+    assert read(f"{target.case_dir}/0/U") == "initial"
+    # Later times of another run are not mixed with the restored ones.
+    assert not os.path.exists(f"{target.case_dir}/0.2")
+    assert lines == ["Time = 0.1\n", "End\n"]
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not [name for name in os.listdir(target.case_dir) if name.startswith(".pifoam-restore")]
+
+
+def test_modified_dictionaries_not_stored(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    case = fakeCase(str(tmp_path/"a"))
+    with open(f"{case.case_dir}/system/controlDict", "w") as file:
+        file.write("stopAt writeNow")
+    assert not cache.store(cache.key(case), case)
+    assert cache.entries() == []
+
+
+def test_shared_blobs(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    a, b = fakeCase(str(tmp_path/"a"), "A"), fakeCase(str(tmp_path/"b"), "B")
+    cache.store("a", a)
+    cache.store("b", b)
+    shared = cache.blob_path(hashlib.sha256(b"shared").hexdigest())
+    cache.remove("a")
+    # The p file is still used by the other entry.
+    assert os.path.isfile(shared)
+    assert not os.path.isfile(cache.blob_path(hashlib.sha256(b"A").hexdigest()))
+    cache.remove("b")
+    assert not os.path.isfile(shared)
+    assert cache.size() == 0
+
+
+def test_verify(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    a, b = fakeCase(str(tmp_path/"a"), "A"), fakeCase(str(tmp_path/"b"), "B")
+    cache.store("a", a)
+    cache.store("b", b)
+    with open(cache.blob_path(hashlib.sha256(b"A").hexdigest()), "w") as file:
+        file.write("damaged")
+    assert cache.verify() == ["a"]
+    assert [key for key, _, _ in cache.entries()] == ["b"]
+    # A damaged entry found while restoring is a miss.
+    os.remove(cache.blob_path(hashlib.sha256(b"B").hexdigest()))
+    assert not cache.fetch("b", str(tmp_path/"c"))
+    assert cache.entries() == [] and cache.misses == 1
+
+
+def test_evict(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    cases = [fakeCase(str(tmp_path/name), name*100) for name in "abc"]
+    for case in cases[:2]:
+        cache.store(case.U, case)
+    # Using the first entry makes the second one the least recently used.
+    assert cache.fetch(cases[0].U, str(tmp_path/"d"))
+    cache.max_bytes = cache.size() + 50
+    cache.store(cases[2].U, cases[2])
+    assert sorted(key for key, _, _ in cache.entries()) == sorted([cases[0].U, cases[2].U])
+    assert cache.size() <= cache.max_bytes
+    cache.clear()
+    assert cache.entries() == [] and cache.size() == 0
+
+
+def test_damaged_content_rejected(tmp_path):
+    cache = resultCache(str(tmp_path/"cache"))
+    with pytest.raises(ValueError):
+        cache.put_bytes(b"content", hashlib.sha256(b"other").hexdigest())
@@ -0,0 +1,93 @@
+import os
+import numpy as np
+import pytest
+from pifoam.io.field import render_field
+from pifoam.io.resultStore import resultStore, resultWatcher
+
+n_cells = 5
+
+
+def values(t:float)->dict[str, np.ndarray]:
+    cells = np.arange(n_cells)
+    return {"p": t + cells, "U": np.stack([t*cells, -t*cells, np.full(n_cells, t)], axis=1)}
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_round_trip(tmp_path, compression):
+    store = resultStore(str(tmp_path/"store"), chunk_size=4, compression=compression)
+    times = np.arange(1, 11)*0.1
+    for t in times:
+        store.append(t, values(t))
+    names = sorted(os.listdir(f"{store.path}/p"))
+    if compression is None:
+        assert names == ["chunk_000000.npy", "chunk_000001.npy", "chunk_000002.npy"]
+    else:
+        # Full chunks are sealed, the one being filled is not.
+        assert names == ["chunk_000000.npy.z", "chunk_000001.npy.z", "chunk_000002.npy"]
+
+    # Reopened from its metadata, across chunk boundaries.
+    store = resultStore(str(tmp_path/"store"))
+    assert store.compression == compression and store.chunk_size == 4
+    np.testing.assert_allclose(store.times, times)
+    np.testing.assert_allclose(store.read("p"), [values(t)["p"] for t in times])
+    np.testing.assert_allclose(store.read("U", 7), values(times[7])["U"])
+    np.testing.assert_allclose(store.read("U", slice(2, 9), [4, 1])[:, :, 0], np.stack([4*times[2:9], times[2:9]], axis=1))
+    np.testing.assert_allclose(store.read("p", np.array([9, 0]), slice(1, 3)), [[times[9] + 1, times[9] + 2], [1.1, 2.1]])
+    assert store.time_index(0.52) == 4
+
+
+def test_missing_values(tmp_path):
+    store = resultStore(str(tmp_path/"store"), chunk_size=2)
+    store.append(0.1, values(0.1))
+    store.append(0.2, {"p": values(0.2)["p"]})
+    assert np.isnan(store.read("U", 1)).all()
+    with pytest.raises(ValueError):
+        store.append(0.2, values(0.2))
+    with pytest.raises(ValueError):
+        store.append(0.3, {"p": np.zeros(n_cells + 1)})
+    with pytest.raises(KeyError):
+        store.read("T")
+
+
+def test_unseal_interrupted_append(tmp_path):
+    store = resultStore(str(tmp_path/"store"), chunk_size=2, compression="zlib")
+    store.append(0.1, values(0.1))
+    store.append(0.2, values(0.2))
+    # The chunk was sealed but the second time step was never recorded.
+    store.times = store.times[:1]
+    store.save_meta()
+    store = resultStore(str(tmp_path/"store"))
+    store.append(0.15, values(0.15))
+    assert os.path.isfile(store.chunk_path("p", 0) + ".z") and not os.path.isfile(store.chunk_path("p", 0))
+    np.testing.assert_allclose(store.times, [0.1, 0.15])
+    np.testing.assert_allclose(store.read("p"), [values(0.1)["p"], values(0.15)["p"]])
+
+
+def write_time(case_dir:str, t:str)->None:
+    os.makedirs(f"{case_dir}/{t}")
+    v = values(float(t))
+    for name, cls in (("p", "volScalarField"), ("U", "volVectorField")):
+        with open(f"{case_dir}/{t}/{name}", "wb") as file:
+            file.write(render_field(t, name, cls, "[0 1 -1 0 0 0 0]", v[name], {"walls": {"type": "zeroGradient"}}, "binary"))
+    with open(f"{case_dir}/{t}/phi", "wb") as file:
+        file.write(render_field(t, "phi", "surfaceScalarField", "[0 3 -1 0 0 0 0]", np.zeros(3), {}))
+
+
+def test_watcher_purge(tmp_path):
+    case_dir = str(tmp_path/"case")
+    for t in ("0", "0.1", "0.2", "0.3"):
+        write_time(case_dir, t)
+    watcher = resultWatcher(case_dir, str(tmp_path/"store"), purge=True)
+    # The latest directory may still be written.
+    assert watcher.poll() == ["0", "0.1", "0.2"]
+    assert sorted(os.listdir(case_dir)) == ["0", "0.3"]
+    write_time(case_dir, "0.4")
+    with watcher:
+        pass
+    assert watcher.ingested == ["0", "0.1", "0.2", "0.3", "0.4"]
+    # The initial and the latest directories are kept for a restart.
+    assert sorted(os.listdir(case_dir)) == ["0", "0.4"]
+    store = watcher.store
+    assert sorted(store.fields) == ["U", "p"]
+    np.testing.assert_allclose(store.times, [0, 0.1, 0.2, 0.3, 0.4])
+    np.testing.assert_allclose(store.read("U", 3), values(0.3)["U"])
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pytest
+from pifoam.io.solverLog import solverLog
+
+logs_dir = os.path.join(os.path.dirname(__file__), "logs")
+
+
+def stream(name:str, callbacks:list[callable] = None)->solverLog:
+    """Feed a recorded log line by line, as `run_command` does while the solver runs."""
+    log = solverLog(callbacks)
+    with open(os.path.join(logs_dir, name)) as file:
+        for line in file:
+            log.feed(line)
+    return log
+
+
+def test_serial():
+    steps = []
+    log = stream("icoFoam_serial.log", [lambda log, step: steps.append(step["time"])])
+    assert log.n_steps == 3
+    assert steps == [0.005, 0.01, 0.015]
+    np.testing.assert_allclose(log["time"], [0.005, 0.01, 0.015])
+    np.testing.assert_allclose(log["courant_mean"], [0, 0.0976825, 0.149915])
+    np.testing.assert_allclose(log["courant_max"], [0, 0.585607, 0.691531])
+    np.testing.assert_allclose(log["execution_time"], [0.01, 0.02, 0.03])
+    np.testing.assert_allclose(log["clock_time"], [0, 0, 0])
+    np.testing.assert_allclose(log.execution_time_per_step(), [0.01, 0.01, 0.01])
+    # The last PISO correction gives the continuity errors of the step.
+    np.testing.assert_allclose(log["continuity_local"], [2.74685e-09, 6.06428e-09, 1.31521e-08])
+    np.testing.assert_allclose(log["continuity_global"], [-2.6445e-19, -2.76713e-19, 1.41961e-19])
+    np.testing.assert_allclose(log["continuity_cumulative"], [-4.44444e-19, -5.17327e-19, -9.001e-19])
+    assert sorted(log.fields) == ["Ux", "Uy", "p"]
+    ux = log.residuals("Ux")
+    np.testing.assert_allclose(ux["initial"], [1, 0.160686, 0.0618813])
+    np.testing.assert_allclose(ux["final"], [8.90511e-06, 6.83031e-06, 9.25672e-06])
+    np.testing.assert_array_equal(ux["iterations"], [19, 19, 17])
+    np.testing.assert_allclose(log.residuals("Uy")["initial"], [0, 0.260828, 0.0810097])
+    # p is solved once per corrector: first initial, last final and total iterations.
+    p = log.residuals("p")
+    np.testing.assert_allclose(p["initial"], [1, 0.428925, 0.087169])
+    np.testing.assert_allclose(p["final"], [2.65225e-07, 5.26569e-07, 9.59598e-07])
+    np.testing.assert_array_equal(p["iterations"], [47, 55, 49])
+
+
+def test_mpirun():
+    steps = []
+    log = stream("icoFoam_mpirun.log", [lambda log, step: steps.append(step["time"])])
+    assert steps == [0.1, 0.2]
+    np.testing.assert_allclose(log["time"], [0.1, 0.2])
+    np.testing.assert_allclose(log["courant_mean"], [0.0212345, 0.0423456])
+    np.testing.assert_allclose(log["courant_max"], [0.512345, 0.623456])
+    np.testing.assert_allclose(log["execution_time"], [0.35, 0.62])
+    np.testing.assert_allclose(log["clock_time"], [1, 1])
+    np.testing.assert_allclose(log["continuity_local"], [3.5e-09, 1.2e-09])
+    np.testing.assert_allclose(log["continuity_cumulative"], [1.3e-18, 1.2e-18])
+    p = log.residuals("p")
+    np.testing.assert_allclose(p["initial"], [0.8, 0.3])
+    np.testing.assert_allclose(p["final"], [8e-07, 6e-07])
+    np.testing.assert_array_equal(p["iterations"], [101, 97])
+    np.testing.assert_allclose(log.residuals("Uy")["final"], [3.5e-06, 5.5e-06])
+
+
+def test_vector_components():
+    log = stream("icoFoam_3d.log")
+    assert log.n_steps == 2
+    assert sorted(log.fields) == ["Ux", "Uy", "Uz", "p"]
+    for field, initial, final, iterations in (("Ux", [1, 0.2], [9e-06, 6e-06], [12, 9]),
+                                            ("Uy", [0.5, 0.1], [8e-06, 5e-06], [11, 8]),
+                                            ("Uz", [0.25, 0.05], [7e-06, 4e-06], [10, 7])):
+        res = log.residuals(field)
+        np.testing.assert_allclose(res["initial"], initial)
+        np.testing.assert_allclose(res["final"], final)
+        np.testing.assert_array_equal(res["iterations"], iterations)
+    np.testing.assert_allclose(log["courant_max"], [0.9, 0.95])
+    np.testing.assert_allclose(log.execution_time_per_step(), [1.5, 1.25])
+
+
+def test_truncated_last_step():
+    steps = []
+    log = stream("icoFoam_truncated.log", [lambda log, step: steps.append(step["time"])])
+    # The step without ExecutionTime is still being written.
+    assert log.n_steps == 1
+    assert steps == [0.005]
+    log.finish_step()
+    assert log.n_steps == 2
+    assert steps == [0.005, 0.01]
+    np.testing.assert_allclose(log["time"], [0.005, 0.01])
+    np.testing.assert_allclose(log["courant_max"], [0, 0.585607])
+    assert np.isnan(log["execution_time"][1])
+    np.testing.assert_allclose(log["continuity_local"], [2.74685e-09, 0.000110788])
+    # The cut line of the last p solve is ignored.
+    p = log.residuals("p")
+    np.testing.assert_allclose(p["initial"], [1, 0.428925])
+    np.testing.assert_allclose(p["final"], [2.65225e-07, 0.0103739])
+    np.testing.assert_array_equal(p["iterations"], [47, 22])
+    log.finish_step()
+    assert log.n_steps == 2
+
+
+def test_fields_appearing_later():
+    lines = ["Time = 1\n", "smoothSolver:  Solving for Ux, Initial residual = 0.5, Final residual = 1e-06, No Iterations 3\n",
+            "ExecutionTime = 1 s  ClockTime = 1 s\n", "Time = 2\n",
+            "smoothSolver:  Solving for Ux, Initial residual = 0.25, Final residual = 1e-06, No Iterations 2\n",
+            "DICPCG:  Solving for p, Initial residual = 0.1, Final residual = 1e-07, No Iterations 9\n",
+            "ExecutionTime = 2 s  ClockTime = 2 s\n"]
+    log = solverLog()
+    for line in lines:
+        log.feed(line)
+    p = log.residuals("p")
+    assert np.isnan(p["initial"][0]) and p["initial"][1] == pytest.approx(0.1)
+    np.testing.assert_array_equal(p["iterations"], [-1, 9])
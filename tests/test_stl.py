@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from pifoam.mesh.stl import read_stl
+
+corners = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)], dtype=np.float64)
+# Sides of the unit cube, counter-clockwise seen from outside. The bottom (z = 0) comes first.
+quads = [(0, 3, 2, 1), (0, 4, 7, 3), (1, 2, 6, 5), (0, 1, 5, 4), (3, 7, 6, 2), (4, 5, 6, 7)]
+triangles = corners[[t for a, b, c, d in quads for t in ((a, b, c), (a, c, d))]]
+
+
+def write_ascii(path, solids:dict[str, np.ndarray])->str:
+    with open(path, "w") as file:
+        for name, tris in solids.items():
+            file.write(f"solid {name}\n")
+            for t in tris:
+                n = np.cross(t[1] - t[0], t[2] - t[0])
+                file.write(f"  facet normal {n[0]:g} {n[1]:g} {n[2]:g}\n    outer loop\n")
+                for v in t:
+                    file.write(f"      vertex {v[0]:.9g} {v[1]:.9g} {v[2]:.9g}\n")
+                file.write("    endloop\n  endfacet\n")
+            file.write(f"endsolid {name}\n")
+    return str(path)
+
+
+def write_binary(path, tris:np.ndarray)->str:
+    record = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    data = np.zeros(len(tris), dtype=record)
+    data["vertices"] = tris
+    with open(path, "wb") as file:
+        # The header of a binary file may start with "solid" too.
+        file.write(b"solid binary".ljust(80, b" "))
+        file.write(np.uint32(len(tris)).tobytes())
+        file.write(data.tobytes())
+    return str(path)
+
+
+def check_cube(surface)->None:
+    assert surface.n_triangles == 12
+    # Vertices shared by neighbouring triangles are merged.
+    assert len(surface.points) == 8
+    assert surface.is_closed()
+    assert surface.volume() == pytest.approx(1.0)
+    assert surface.areas().sum() == pytest.approx(6.0)
+    lo, hi = surface.bounds()
+    np.testing.assert_allclose(lo, [0, 0, 0])
+    np.testing.assert_allclose(hi, [1, 1, 1])
+    np.testing.assert_allclose(surface.normals()[:2], [[0, 0, -1], [0, 0, -1]])
+
+
+def test_ascii(tmp_path):
+    surface = read_stl(write_ascii(tmp_path/"cube.stl", {"bottom": triangles[:2], "sides": triangles[2:]}))
+    check_cube(surface)
+    assert surface.regions == {"bottom": slice(0, 2), "sides": slice(2, 12)}
+    np.testing.assert_array_equal(surface.face_region(), [0, 0] + [1]*10)
+    # Only the cube edges: the diagonals are flat and the regions meet along cube edges.
+    assert len(surface.feature_edges()) == 12
+    assert len(read_stl(write_ascii(tmp_path/"one.stl", {"cube": triangles})).feature_edges()) == 12
+
+
+def test_binary(tmp_path):
+    surface = read_stl(write_binary(tmp_path/"cube.stl", triangles))
+    check_cube(surface)
+    assert list(surface.regions) == ["surface"]
+    np.testing.assert_allclose(surface.triangles, triangles)
+
+
+def test_open_surface(tmp_path):
+    surface = read_stl(write_ascii(tmp_path/"open.stl", {"open": triangles[2:]}))
+    assert not surface.is_closed()
+    with open(tmp_path/"empty.stl", "w") as file:
+        file.write("not an stl\n")
+    with pytest.raises(ValueError):
+        read_stl(str(tmp_path/"empty.stl"))
+
+
+def test_contains(tmp_path):
+    surface = read_stl(write_binary(tmp_path/"cube.stl", triangles))
+    inside = [(0.5, 0.5, 0.5), (0.01, 0.99, 0.5), (0.5, 0.5, 0.999)]
+    outside = [(1.5, 0.5, 0.5), (-0.5, 0.5, 0.5), (0.5, 0.5, -0.01), (2.0, 2.0, 2.0), (0.5, 1.0001, 0.5)]
+    np.testing.assert_array_equal(surface.contains(inside + outside), [True]*3 + [False]*5)
+    # A lower bound of the distance.
+    assert 0.0 < surface.distance(outside[3:4])[0] <= np.sqrt(3.0)
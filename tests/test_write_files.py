@@ -0,0 +1,63 @@
+import hashlib
+import os
+from pifoam import utils
+
+
+def read(path)->bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_manifest(tmp_path):
+    case_dir = str(tmp_path/"case")
+    files = {"system/controlDict": "application icoFoam;\n", "0/U": b"\x00binary\x01"}
+    assert sorted(utils.write_files(case_dir, files)) == ["0/U", "system/controlDict"]
+    manifest = utils.read_manifest(case_dir)
+    for path, content in files.items():
+        content = content.encode() if isinstance(content, str) else content
+        assert read(f"{case_dir}/{path}") == content
+        assert manifest[path]["sha256"] == hashlib.sha256(content).hexdigest()
+        assert manifest[path]["size"] == len(content)
+        assert manifest[path]["mtime_ns"] == os.stat(f"{case_dir}/{path}").st_mtime_ns
+    assert not [f for root, _, names in os.walk(case_dir) for f in names if f.endswith(".pifoam-tmp")]
+
+
+def test_unchanged_files_skipped(tmp_path):
+    case_dir = str(tmp_path/"case")
+    utils.write_files(case_dir, {"a": "1", "b": "2"})
+    mtime = os.stat(f"{case_dir}/a").st_mtime_ns
+    assert utils.write_files(case_dir, {"a": "1", "b": "3"}) == ["b"]
+    assert os.stat(f"{case_dir}/a").st_mtime_ns == mtime
+    assert read(f"{case_dir}/b") == b"3"
+    # A file modified behind the manifest's back is rewritten.
+    with open(f"{case_dir}/a", "w") as file:
+        file.write("modified")
+    assert utils.write_files(case_dir, {"a": "1"}) == ["a"]
+    assert read(f"{case_dir}/a") == b"1"
+    # Without a manifest, identical files are detected from their content.
+    os.remove(f"{case_dir}/.pifoam_manifest.json")
+    assert utils.write_files(case_dir, {"a": "1", "b": "3"}) == []
+
+
+def test_atomic_replace_breaks_hardlinks(tmp_path):
+    base, clone = str(tmp_path/"base"), str(tmp_path/"clone")
+    utils.write_files(base, {"constant/polyMesh/points": "points", "system/controlDict": "base"})
+    utils.link_tree(base, clone)
+    assert os.path.samefile(f"{base}/system/controlDict", f"{clone}/system/controlDict")
+    assert utils.write_files(clone, {"system/controlDict": "clone"}) == ["system/controlDict"]
+    # The clone got a new file: the base case is untouched.
+    assert read(f"{base}/system/controlDict") == b"base"
+    assert read(f"{clone}/system/controlDict") == b"clone"
+    assert not os.path.samefile(f"{base}/system/controlDict", f"{clone}/system/controlDict")
+
+
+def test_link_from(tmp_path):
+    base, case = str(tmp_path/"base"), str(tmp_path/"case")
+    utils.write_files(base, {"constant/polyMesh/points": "points", "system/controlDict": "base"})
+    written = utils.write_files(case, {"constant/polyMesh/points": "points", "system/controlDict": "base"},
+                                link_from=base, shared=("constant/",))
+    assert sorted(written) == ["constant/polyMesh/points", "system/controlDict"]
+    assert read(f"{case}/constant/polyMesh/points") == b"points"
+    # Only the shared prefixes are linked.
+    assert not os.path.samefile(f"{base}/system/controlDict", f"{case}/system/controlDict")
+    assert utils.read_manifest(case)["constant/polyMesh/points"]["sha256"] == hashlib.sha256(b"points").hexdigest()